@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = "api"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from api import checks, signals  # noqa: F401
+        from api.instrumentation import install_query_recorder
+
+        # Record the queries of the sampled requests, See `api.middleware.RequestMetricsMiddleware`
+        connection_created.connect(install_query_recorder, dispatch_uid="install_query_recorder")
@@ -0,0 +1,161 @@
+"""
+Authentication classes used by the API.
+
+Each class keeps the regular sync `authenticate` method (used by the sync views) and adds an
+`aauthenticate` coroutine, Which is used by the async views so that the authentication does not
+have to hop into the thread sensitive executor on every request.
+"""
+
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import authentication
+from rest_framework_simplejwt import authentication as jwt_authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from api.cache import USER_CACHE, get_user_key
+
+
+class JWTAuthentication(jwt_authentication.JWTAuthentication):
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        # Token validation is pure CPU work, So it can safely run on the event loop
+        validated_token = self.get_validated_token(raw_token)
+
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        """
+        Async counterpart of `get_user`, Which loads the user via the async ORM.
+        """
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which does not load the user from the DB on every request.
+
+    The user is built from the user ID claim of the token and the auth state of the user (username, active flag &
+    password hash), Which is kept in the user cache. So the user is only loaded once per `USER_CACHE_TIMEOUT`
+    seconds, The user is not a full DB row though i.e. Only the ID, username & active flag are set on it.
+
+    Revocation: Saving or deleting a user drops its cached state (see `api.signals`), So a deactivated user or a
+    changed password (when `CHECK_REVOKE_TOKEN` is on) is rejected by the next request of any worker which shares
+    the cache. A worker with its own cache, Or a write which skips the signals (e.g. `QuerySet.update`), Rejects it
+    once the cached state expires. Set `JWT_STATELESS_AUTHENTICATION=false` to check the user on every request.
+    """
+
+    state_fields = ("username", "is_active", "password")
+
+    def get_user_id(self, validated_token):
+        try:
+            return self.user_model._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def to_user_state(self, values: dict | None) -> dict | None:
+        if values is None:
+            return None
+
+        # Only the hash of the password is cached, Which is all that the revoke check needs
+        password = values.pop("password")
+        return {**values, "password_hash": get_md5_hash_password(password)}
+
+    def get_user_from_state(self, user_id, state: dict | None, validated_token):
+        """
+        Return the user with the given ID & cached state, Raise `AuthenticationFailed` if the user is revoked.
+        """
+
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != state["password_hash"]:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        user = self.user_model(
+            **{api_settings.USER_ID_FIELD: user_id},
+            username=state["username"],
+            is_active=state["is_active"],
+        )
+        # The user exists in the DB, Even though it has not been fetched
+        user._state.adding = False
+
+        return user
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = get_user_key(user_id)
+
+        state = caches[USER_CACHE].get(key)
+        if state is None:
+            users = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            state = self.to_user_state(users.values(*self.state_fields).first())
+
+            if state is not None:
+                caches[USER_CACHE].add(key, state)
+
+        return self.get_user_from_state(user_id, state, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = get_user_key(user_id)
+
+        state = await caches[USER_CACHE].aget(key)
+        if state is None:
+            users = self.user_model.objects.filter(**{api_settings.USER_ID_FIELD: user_id})
+            state = self.to_user_state(await users.values(*self.state_fields).afirst())
+
+            # The state is only added, So that it does not overwrite a newer state which is already cached
+            if state is not None:
+                await caches[USER_CACHE].aadd(key, state)
+
+        return self.get_user_from_state(user_id, state, validated_token)
+
+
+class SessionAuthentication(authentication.SessionAuthentication):
+    async def aauthenticate(self, request):
+        # Get the session-based user from the underlying HttpRequest object
+        auser = getattr(request._request, "auser", None)
+        if auser is None:
+            return None
+
+        user = await auser()
+
+        # Unauthenticated, CSRF validation not required
+        if not user or not user.is_active:
+            return None
+
+        self.enforce_csrf(request)
+
+        # CSRF passed with authenticated user
+        return (user, None)
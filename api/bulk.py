@@ -0,0 +1,147 @@
+"""
+Helpers to create & update the notes in bulk.
+
+A batch is written in chunks of `NOTE_BULK_CHUNK_SIZE` notes, Each chunk in its own transaction with a fixed
+number of queries: The notes to update are locked & fetched at once, Then the notes are written via `bulk_update`
+& `bulk_create` and the version history (or outbox) records of the updates via a single `bulk_create`.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+import strings
+from api import history
+from api.models import Note
+from api.serializers import NoteSerializer
+
+
+def validate_items(items: list, context: dict) -> tuple[dict, dict]:
+    """
+    Return the validated data & the errors of the given items, Both keyed by the index of the item.
+
+    An item which has an `id` updates the note with that ID, Otherwise a new note is created.
+    """
+
+    validated_data, errors = dict(), dict()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors[index] = {"non_field_errors": ["Invalid data. Expected a dictionary."]}
+            continue
+
+        serializer = NoteSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            errors[index] = serializer.errors
+            continue
+
+        data = dict(serializer.validated_data)
+
+        if item.get("id") is not None:
+            try:
+                data["id"] = uuid.UUID(str(item["id"]))
+            except ValueError:
+                errors[index] = {"id": [strings.INVALID_NOTE_ID]}
+                continue
+
+        validated_data[index] = data
+
+    return validated_data, errors
+
+
+def save_chunk(user: User, validated_data: dict, errors: dict):
+    """
+    Create & update the notes of the given validated data in a single transaction.
+
+    Return the saved notes keyed by the index of the item, The items which cannot be updated are added to `errors`.
+    """
+
+    updates = {index: data for index, data in validated_data.items() if "id" in data}
+    creates = {index: data for index, data in validated_data.items() if "id" not in data}
+
+    with transaction.atomic():
+        # Lock the notes in a fixed order, So that concurrent batches which update the same notes cannot deadlock
+        notes = {
+            note.id: note
+            for note in (
+                Note.objects
+                .with_access(user.id)
+                .select_for_update()
+                .filter(id__in={data["id"] for data in updates.values()})
+                .order_by("id")
+            )
+        }
+
+        saved_notes, updated_notes = dict(), set()
+        changes, records = list(), list()
+        write_behind = settings.VERSION_HISTORY_WRITE_BEHIND
+        modified_at = timezone.now()
+
+        # Updates are applied in the order of the items, So that the same note can be updated more than once
+        for index, data in updates.items():
+            note = notes.get(data["id"])
+
+            if note is None:
+                errors[index] = {"id": [strings.INVALID_NOTE_ID]}
+                continue
+
+            if not note.can_update:
+                errors[index] = {"id": [strings.NOTE_PERMISSION_ERROR]}
+                continue
+
+            saved_notes[index] = note
+
+            # An update which does not change the description is neither written nor recorded in the version history
+            if note.description == data["description"]:
+                continue
+
+            old_description = note.description
+
+            note.description = data["description"]
+            note.version += 1
+            note.modified_at = modified_at
+            updated_notes.add(note)
+
+            if write_behind:
+                records.append(history.build_outbox_record(note, user, old_description, note.description))
+            else:
+                changes.append(history.Change(note, user, old_description, note.description))
+
+        # `bulk_update` does not set the `auto_now` fields, Hence `modified_at` is set above
+        Note.objects.bulk_update(updated_notes, ("description", "version", "modified_at"))
+
+        created_notes = Note.objects.bulk_create([Note(owner=user, **data) for data in creates.values()])
+        saved_notes.update(zip(creates.keys(), created_notes))
+
+        history.create_versions(changes)
+        history.enqueue_versions(records)
+
+    return saved_notes
+
+
+def save_notes(user: User, items: list, chunk_size: int, context: dict) -> list[dict]:
+    """
+    Create & update the given notes in chunks of `chunk_size`, Return the result of each item in the given order.
+
+    Each result is either the saved note or the errors of the item, Along with the index of the item. Since each
+    chunk is committed on its own, A failure of a chunk does not roll back the chunks which are already saved.
+    """
+
+    results = list()
+
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+
+        validated_data, errors = validate_items(chunk, context)
+        saved_notes = save_chunk(user, validated_data, errors)
+
+        for index in range(len(chunk)):
+            if index in errors:
+                results.append({"index": start + index, "errors": errors[index]})
+            else:
+                results.append({"index": start + index, **NoteSerializer(saved_notes[index]).data})
+
+    return results
@@ -0,0 +1,142 @@
+"""
+Caches used by the API.
+
+The caches are regular Django cache aliases (see `CACHES` in the settings), So each of them can either be
+kept in the process memory or moved to a shared backend without changing the code.
+"""
+
+from django.core.cache import caches
+from django.core.cache.backends import dummy, locmem
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+NOTE_ACCESS_CACHE = "note-access"
+RESPONSE_CACHE = "responses"
+USER_CACHE = "users"
+
+
+class LocMemCache(locmem.LocMemCache):
+    """
+    Per-process LRU cache with TTL.
+
+    Same as the Django's local memory cache, Except that the async methods are served directly on the event loop.
+    The default implementation hops to the thread sensitive executor, Which is not needed for in-memory operations.
+    """
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.add(key, value, timeout, version)
+
+    async def aget(self, key, default=None, version=None):
+        return self.get(key, default, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.set(key, value, timeout, version)
+
+    async def atouch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.touch(key, timeout, version)
+
+    async def adelete(self, key, version=None):
+        return self.delete(key, version)
+
+    async def ahas_key(self, key, version=None):
+        return self.has_key(key, version)
+
+    async def aincr(self, key, delta=1, version=None):
+        return self.incr(key, delta, version)
+
+    async def aclear(self):
+        return self.clear()
+
+
+class DummyCache(dummy.DummyCache):
+    """
+    Cache which does not store anything, i.e. Caching is disabled. The async methods are served directly on the
+    event loop, The same as `LocMemCache`.
+    """
+
+    async def aadd(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.add(key, value, timeout, version)
+
+    async def aget(self, key, default=None, version=None):
+        return self.get(key, default, version)
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.set(key, value, timeout, version)
+
+    async def adelete(self, key, version=None):
+        return self.delete(key, version)
+
+    async def adelete_many(self, keys, version=None):
+        return self.delete_many(keys, version)
+
+
+def is_process_local(alias: str) -> bool:
+    """
+    Return True if the given cache is kept in the process memory, i.e. A write is not seen by the other processes.
+    """
+
+    return isinstance(caches[alias], locmem.LocMemCache)
+
+
+def is_disabled(alias: str) -> bool:
+    """
+    Return True if the given cache does not store anything, See `DummyCache`.
+    """
+
+    return isinstance(caches[alias], dummy.DummyCache)
+
+
+def get_note_access_key(note_id, user_id) -> str:
+    return f"{note_id}:{user_id}"
+
+
+def invalidate_note_access(note_id, user_ids):
+    """
+    Remove the cached access of the given users to the note, Should be called whenever the note share changes.
+    """
+
+    caches[NOTE_ACCESS_CACHE].delete_many([get_note_access_key(note_id, user_id) for user_id in user_ids])
+
+
+async def ainvalidate_note_access(note_id, user_ids):
+    await caches[NOTE_ACCESS_CACHE].adelete_many([get_note_access_key(note_id, user_id) for user_id in user_ids])
+
+
+def get_note_state_key(note_id) -> str:
+    return f"note:{note_id}"
+
+
+def set_note_states(notes):
+    """
+    Write the (owner, version) state of the notes through to the response cache, Which makes the cached
+    responses of the previous states unreachable. Should be called once the writes of the notes are committed.
+    """
+
+    caches[RESPONSE_CACHE].set_many({get_note_state_key(note.id): (note.owner_id, note.version) for note in notes})
+
+
+def invalidate_note_responses(note_ids):
+    """
+    Remove the cached state of the given notes, So that their cached responses are not served anymore.
+    """
+
+    caches[RESPONSE_CACHE].delete_many([get_note_state_key(note_id) for note_id in note_ids])
+
+
+async def ainvalidate_note_responses(note_ids):
+    await caches[RESPONSE_CACHE].adelete_many([get_note_state_key(note_id) for note_id in note_ids])
+
+
+def get_user_key(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def invalidate_users(user_ids):
+    """
+    Remove the cached auth state of the given users, Should be called whenever a user is updated or deleted.
+    """
+
+    caches[USER_CACHE].delete_many([get_user_key(user_id) for user_id in user_ids])
+
+
+async def ainvalidate_users(user_ids):
+    await caches[USER_CACHE].adelete_many([get_user_key(user_id) for user_id in user_ids])
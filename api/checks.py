@@ -0,0 +1,50 @@
+"""
+System checks of the settings which the API depends on.
+"""
+
+from django.conf import settings
+from django.core import checks
+
+from api.cache import NOTE_ACCESS_CACHE, RESPONSE_CACHE, is_disabled, is_process_local
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs) -> list:
+    """
+    The cached responses of a note are dropped by the process which writes the note, So the response cache must
+    be shared by all the processes which serve or write the notes. The version history which is written behind is
+    dropped by the outbox consumer, Which may run in any process.
+
+    A cached response is served to a user other than the owner if its access to the note is cached, So a shared
+    response cache needs a shared note access cache as well. Else an unshare only drops the cached access in the
+    process which has served it.
+    """
+
+    if not is_disabled(RESPONSE_CACHE) and not is_process_local(RESPONSE_CACHE) and is_process_local(NOTE_ACCESS_CACHE):
+        return [
+            checks.Error(
+                "The response cache is shared, But the note access cache is kept in the process memory.",
+                hint="Set NOTE_ACCESS_CACHE_BACKEND to a shared cache (e.g. redis) as well.",
+                id="api.E002",
+            )
+        ]
+
+    if is_process_local(RESPONSE_CACHE) and settings.WORKERS > 1:
+        return [
+            checks.Error(
+                "The response cache is kept in the process memory, But there are more than one worker.",
+                hint="Set RESPONSE_CACHE_BACKEND to a shared cache (e.g. redis), Or run a single worker (WORKERS=1).",
+                id="api.E001",
+            )
+        ]
+
+    if is_process_local(RESPONSE_CACHE) and settings.VERSION_HISTORY_WRITE_BEHIND:
+        return [
+            checks.Warning(
+                "The version history is written behind, So its responses are not cached in the process memory.",
+                hint="Set RESPONSE_CACHE_BACKEND to a shared cache (e.g. redis) to cache them.",
+                id="api.W001",
+            )
+        ]
+
+    return []
@@ -0,0 +1,234 @@
+"""
+Codec of the compact version history format.
+
+A description change is stored as an edit script of the old description. Each operation of the script is
+either a positive integer (copy that many characters of the old description), a negative integer (skip that
+many characters of the old description) or a string (insert it). The script is serialized as JSON & deflated.
+
+This module must not depend on the models, Since it is also used by the data migrations.
+"""
+
+import difflib
+import json
+import re
+import zlib
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def compress(text: str) -> bytes:
+    # Raw deflate stream, The zlib header & checksum would double the size of a small delta
+    compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(text.encode()) + compressor.flush()
+
+
+def decompress(data: bytes) -> str:
+    return zlib.decompress(bytes(data), -zlib.MAX_WBITS).decode()
+
+
+def get_edit_script(old: str, new: str) -> list:
+    """
+    Return the edit script which turns the old text into the new text.
+    """
+
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old, new, autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+
+        if tag in ("delete", "replace"):
+            ops.append(i1 - i2)
+
+        if tag in ("insert", "replace"):
+            ops.append(new[j1:j2])
+
+    return ops
+
+
+def encode_script(ops: list) -> bytes:
+    return compress(json.dumps(ops, separators=(",", ":")))
+
+
+def decode_script(data: bytes) -> list:
+    return json.loads(decompress(data))
+
+
+def encode_delta(old: str, new: str) -> bytes:
+    """
+    Return the compressed edit script which turns the old text into the new text.
+    """
+
+    return encode_script(get_edit_script(old, new))
+
+
+def get_inserted_words(new: str, ops: list) -> str:
+    """
+    Return the words of the new text which are written or changed by the given edit script, Separated by a space.
+
+    An insertion can be a part of a word (e.g. "cat" -> "cart"), So the whole words around each insertion are taken.
+    """
+
+    ranges = []
+    position = 0
+
+    for op in ops:
+        if isinstance(op, str):
+            ranges.append((position, position + len(op)))
+            position += len(op)
+        elif op >= 0:
+            position += op
+
+    words = []
+    for match in WORD_PATTERN.finditer(new):
+        if any(start < match.end() and match.start() < end for start, end in ranges):
+            words.append(match.group())
+
+    return " ".join(words)
+
+
+def apply_delta(old: str, delta: bytes) -> str:
+    """
+    Apply the compressed edit script on the old text and return the new text.
+    """
+
+    position = 0
+    parts = []
+
+    for op in decode_script(delta):
+        if isinstance(op, str):
+            parts.append(op)
+        elif op >= 0:
+            parts.append(old[position:position + op])
+            position += op
+        else:
+            position -= op
+
+    return "".join(parts)
+
+
+def apply_script(old: str, ops: list) -> str:
+    """
+    Apply the edit script on the old text and return the new text, Else raise ValueError if the script does not
+    cover the old text exactly. i.e. It copies or skips past the end of the old text, Or leaves a part of it out.
+    """
+
+    position = 0
+    parts = []
+
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+            continue
+
+        if position + abs(op) > len(old):
+            raise ValueError("The edit script goes past the end of the text")
+
+        if op >= 0:
+            parts.append(old[position:position + op])
+        position += abs(op)
+
+    if position != len(old):
+        raise ValueError("The edit script does not cover the whole text")
+
+    return "".join(parts)
+
+
+def normalize_script(ops) -> list:
+    """
+    Return the given edit script with the empty operations dropped and the adjacent ones of the same kind merged,
+    Else raise ValueError if it is not an edit script.
+    """
+
+    if not isinstance(ops, list):
+        raise ValueError("The edit script must be a list")
+
+    normalized = []
+    for op in ops:
+        if isinstance(op, bool) or not isinstance(op, (int, str)):
+            raise ValueError("The operations must be either integers or strings")
+
+        if op not in (0, ""):
+            append_op(normalized, op)
+
+    return normalized
+
+
+def append_op(ops: list, op):
+    # Adjacent operations of the same kind are merged, So that the script stays as short as a computed one
+    if ops and isinstance(op, str) and isinstance(ops[-1], str):
+        ops[-1] += op
+    elif ops and isinstance(op, int) and isinstance(ops[-1], int) and (op >= 0) == (ops[-1] >= 0):
+        ops[-1] += op
+    else:
+        ops.append(op)
+
+
+def compose_scripts(first: list, second: list) -> list:
+    """
+    Return the edit script which has the same effect as applying the first edit script and then the second one.
+
+    Only the scripts are needed, Not the texts. Each character of the intermediate text is either copied from
+    the old text or inserted by the first script, So the second script is mapped back onto the old text.
+    """
+
+    # Pieces of the intermediate text, Either a (position, length) range of the old text or an inserted string
+    pieces = []
+    position = 0
+
+    for op in first:
+        if isinstance(op, str):
+            pieces.append(op)
+        elif op >= 0:
+            pieces.append((position, op))
+            position += op
+        else:
+            position -= op
+
+    ops = []
+    # Position of the old text up to which the composed script has consumed it
+    position = 0
+    pieces.reverse()
+
+    def take(length: int):
+        """
+        Pop the next `length` characters of the intermediate text, Split across the pieces.
+        """
+
+        while length > 0 and pieces:
+            piece = pieces.pop()
+            size = len(piece) if isinstance(piece, str) else piece[1]
+
+            if size > length:
+                if isinstance(piece, str):
+                    pieces.append(piece[length:])
+                    piece = piece[:length]
+                else:
+                    pieces.append((piece[0] + length, piece[1] - length))
+                    piece = (piece[0], length)
+                size = length
+
+            length -= size
+            yield piece
+
+    for op in second:
+        if isinstance(op, str):
+            append_op(ops, op)
+        elif op >= 0:
+            for piece in take(op):
+                if isinstance(piece, str):
+                    append_op(ops, piece)
+                    continue
+
+                start, length = piece
+                if start > position:
+                    append_op(ops, position - start)
+                append_op(ops, length)
+                position = start + length
+        else:
+            for _ in take(-op):
+                pass
+
+    return ops
@@ -0,0 +1,321 @@
+"""
+Push of the note changes to the connected clients as server-sent events, See `NoteEvents`.
+
+An event is published along with the transaction which writes the change and delivered once it is committed. Each
+worker process receives all the events via the broker and fans them out to its own subscriptions, The broker is
+chosen via `NOTE_EVENTS_BROKER`:
+
+- `PostgresBroker` publishes via NOTIFY, So the events reach the subscriptions of every worker process. Each process
+  holds a single LISTEN connection, Regardless of the number of its subscriptions.
+- `InMemoryBroker` only reaches the subscriptions of the current process, e.g. for the tests or a single worker.
+
+A subscription receives the events of the notes it has subscribed to, Along with the notes which are shared with or
+unshared from its user. The events are delivered at most once, A client which is told to resync (e.g. it has fallen
+behind) catches up via the incremental sync (see `api.sync`) and subscribes again.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+from collections import defaultdict, deque
+from dataclasses import asdict, dataclass, field
+from functools import cache, cached_property, partial
+
+import psycopg2
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+from api.metrics import NOTE_EVENTS_DELIVERED, NOTE_EVENTS_SUBSCRIPTIONS
+
+logger = logging.getLogger(__name__)
+
+NOTE_UPDATED = "note.updated"
+NOTE_SHARED = "note.shared"
+NOTE_UNSHARED = "note.unshared"
+# Sent to a subscription which has missed events, The stream is closed afterwards
+RESYNC = "resync"
+
+# NOTIFY payloads are limited to 8000 bytes, So the users of a share event are split across many events
+MAX_EVENT_USERS = 500
+
+
+@dataclass
+class Event:
+    type: str
+    note_id: str
+    # Sent to the clients
+    data: dict = field(default_factory=dict)
+    # Users which the note is shared with (resp. unshared from), Their subscriptions receive the event regardless
+    # of their notes
+    user_ids: list = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "Event":
+        return cls(**json.loads(payload))
+
+    @cached_property
+    def sse(self) -> str:
+        # Formatted once, Although the event is sent to every subscription of the process
+        data = json.dumps({"note_id": self.note_id, **self.data}, separators=(",", ":"))
+        return f"event: {self.type}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """
+    Events of a single client, Which are delivered on the event loop that has subscribed.
+    """
+
+    def __init__(self, broker: "Broker", user_id, note_ids: set[str], max_pending: int):
+        self.broker = broker
+        self.user_id = user_id
+        self.note_ids = note_ids
+        self.max_pending = max_pending
+        self.loop = asyncio.get_running_loop()
+        self.pending = deque()
+        self.ready = asyncio.Event()
+        # Set once the subscription has missed events, Either it has fallen behind or the broker has reconnected
+        self.missed = False
+
+    def deliver(self, event: Event | None):
+        if event is None or len(self.pending) >= self.max_pending:
+            self.missed = True
+        else:
+            self.pending.append(event)
+
+        self.ready.set()
+
+    async def get(self, timeout: float) -> list[Event]:
+        """
+        Return the pending events, Else an empty list once the timeout has passed without any event.
+        """
+
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+
+        self.ready.clear()
+        events = list(self.pending)
+        self.pending.clear()
+
+        return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """
+    Fans out the events to the subscriptions of the current process, The subclasses deliver the published events
+    to `dispatch` of each process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.note_subscriptions = defaultdict(set)
+        self.user_subscriptions = defaultdict(set)
+
+    def publish(self, event: Event):
+        raise NotImplementedError
+
+    def subscribe(self, user_id, note_ids: set[str], max_pending: int) -> Subscription:
+        subscription = Subscription(self, user_id, note_ids, max_pending)
+
+        with self.lock:
+            self.user_subscriptions[user_id].add(subscription)
+            for note_id in note_ids:
+                self.note_subscriptions[note_id].add(subscription)
+
+        NOTE_EVENTS_SUBSCRIPTIONS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self.lock:
+            discard(self.user_subscriptions, subscription.user_id, subscription)
+            for note_id in subscription.note_ids:
+                discard(self.note_subscriptions, note_id, subscription)
+
+        NOTE_EVENTS_SUBSCRIPTIONS.dec()
+
+    def dispatch(self, event: Event):
+        """
+        Deliver the event to the subscriptions of its note & users, May be called from any thread.
+        """
+
+        with self.lock:
+            subscriptions = set(self.note_subscriptions.get(event.note_id, ()))
+
+            # The notes which are shared with (or unshared from) the user are followed by its subscriptions
+            for user_id in event.user_ids:
+                for subscription in self.user_subscriptions.get(user_id, ()):
+                    subscriptions.add(subscription)
+
+                    if event.type == NOTE_SHARED:
+                        subscription.note_ids.add(event.note_id)
+                        self.note_subscriptions[event.note_id].add(subscription)
+                    elif event.type == NOTE_UNSHARED:
+                        subscription.note_ids.discard(event.note_id)
+                        discard(self.note_subscriptions, event.note_id, subscription)
+
+        for subscription in subscriptions:
+            # The loop of a subscription is closed once its worker is shutting down
+            if not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+
+        NOTE_EVENTS_DELIVERED.inc(len(subscriptions))
+
+    def resync(self):
+        """
+        Tell all the subscriptions that they have missed events.
+        """
+
+        with self.lock:
+            subscriptions = set().union(*self.user_subscriptions.values())
+
+        for subscription in subscriptions:
+            if not subscription.loop.is_closed():
+                subscription.loop.call_soon_threadsafe(subscription.deliver, None)
+
+
+def discard(subscriptions: dict, key, subscription: Subscription):
+    subscriptions[key].discard(subscription)
+    if not subscriptions[key]:
+        del subscriptions[key]
+
+
+class InMemoryBroker(Broker):
+    def publish(self, event: Event):
+        transaction.on_commit(partial(self.dispatch, event))
+
+
+class PostgresBroker(Broker):
+    channel = "note_events"
+    # Seconds between the checks whether the listener is stopped
+    poll_interval = 1
+    # Seconds to wait before reconnecting the listener
+    retry_interval = 1
+
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+        # Set while the listener is connected
+        self.listening = threading.Event()
+        self.stopping = threading.Event()
+
+    def publish(self, event: Event):
+        # A notification is only sent once the transaction commits, And not at all if it rolls back
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, event.to_json()])
+
+    def subscribe(self, user_id, note_ids: set[str], max_pending: int) -> Subscription:
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(target=self.listen, name="note-events", daemon=True)
+                self.listener.start()
+
+        return super().subscribe(user_id, note_ids, max_pending)
+
+    def listen(self):
+        """
+        Receive the notifications on a dedicated connection of the current process & dispatch them, Until the
+        broker is stopped.
+        """
+
+        reconnecting = False
+
+        while not self.stopping.is_set():
+            conn = None
+            try:
+                # Not a connection of the Django's (pooled) backend, Since it is held for the lifetime of the process
+                conn = psycopg2.connect(**connections["default"].get_connection_params())
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {self.channel}")
+                self.listening.set()
+
+                # The events which were sent while the listener was disconnected are lost
+                if reconnecting:
+                    self.resync()
+
+                while not self.stopping.is_set():
+                    select.select([conn], [], [], self.poll_interval)
+                    conn.poll()
+
+                    while conn.notifies:
+                        self.dispatch(Event.from_json(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Note events listener is disconnected")
+            finally:
+                self.listening.clear()
+                if conn is not None:
+                    conn.close()
+
+            reconnecting = True
+            self.stopping.wait(self.retry_interval)
+
+    def stop(self):
+        self.stopping.set()
+        if self.listener is not None:
+            self.listener.join()
+
+
+@cache
+def load_broker(path: str) -> Broker:
+    return import_string(path)()
+
+
+def get_broker() -> Broker:
+    return load_broker(settings.NOTE_EVENTS_BROKER)
+
+
+def publish_note_updated(note, user):
+    """
+    Publish the update of the note by the given user, Within the transaction which has updated it.
+    """
+
+    data = {"version": note.version, "modified_at": note.modified_at.isoformat(), "user": user.username}
+    get_broker().publish(Event(type=NOTE_UPDATED, note_id=str(note.id), data=data))
+
+
+def publish_note_shared(event_type: str, note_id, user_ids: list, permission: str | None = None):
+    """
+    Publish the share (or unshare) of the note with the given users.
+    """
+
+    data = {"permission": permission} if permission else {}
+    user_ids = list(user_ids)
+
+    for i in range(0, len(user_ids), MAX_EVENT_USERS):
+        event = Event(type=event_type, note_id=str(note_id), data=data, user_ids=user_ids[i:i + MAX_EVENT_USERS])
+        get_broker().publish(event)
+
+
+async def astream_events(user_id, note_ids: set[str], heartbeat: float):
+    """
+    Subscribe to the events of the given notes & yield them as server-sent events until the client disconnects,
+    Or until the subscription has missed events. A comment is sent every `heartbeat` seconds without any event, So
+    that the proxies keep the connection open.
+    """
+
+    # Subscribed once the response is streamed, So that a response which is never sent does not leak a subscription
+    subscription = get_broker().subscribe(user_id, note_ids, settings.NOTE_EVENTS_MAX_PENDING)
+
+    try:
+        # Sent right away, So that the client knows that it has subscribed
+        yield ": subscribed\n\n"
+
+        while True:
+            events = await subscription.get(timeout=heartbeat)
+
+            if subscription.missed:
+                yield f"event: {RESYNC}\ndata: {{}}\n\n"
+                return
+
+            yield "".join(event.sse for event in events) if events else ": heartbeat\n\n"
+    finally:
+        subscription.close()
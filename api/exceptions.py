@@ -0,0 +1,22 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+import strings
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = strings.NOTE_VERSION_MISMATCH
+    default_code = "precondition_failed"
+
+
+class SyncCursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = strings.SYNC_CURSOR_EXPIRED
+    default_code = "sync_cursor_expired"
+
+
+class PatchConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = strings.NOTE_PATCH_CONFLICT
+    default_code = "patch_conflict"
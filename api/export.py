@@ -0,0 +1,71 @@
+"""
+Streaming export of the notes of a user along with their full version history, As NDJSON.
+
+The rows are read via server side cursors in chunks of `NOTE_EXPORT_CHUNK_SIZE` and written out as soon as
+they are serialized, So the memory usage stays flat regardless of the number of notes & versions. All the notes
+are written first, Followed by the versions of each note in the order of their sequence:
+
+    {"type": "note", "id": ..., "description": ..., "created_at": ..., "modified_at": ...}
+    {"type": "version", "note_id": ..., "sequence": 1, "user": ..., "old_description": ..., "new_description": ..., "created_at": ...}
+"""
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from api.history import HistoryReplayer
+from api.models import Note, VersionHistory
+
+NOTE_FIELDS = ("id", "description", "created_at", "modified_at")
+VERSION_FIELDS = ("note_id", "sequence", "snapshot", "delta", "user__username", "created_at")
+
+
+def to_line(data: dict) -> str:
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")) + "\n"
+
+
+async def aexport_notes(user_id, chunk_size: int):
+    """
+    Yield the NDJSON export of the notes owned by the given user, One chunk of lines at a time.
+    """
+
+    notes = Note.objects.filter(owner_id=user_id).order_by("created_at", "id").values(*NOTE_FIELDS)
+
+    lines = list()
+    async for note in notes.aiterator(chunk_size=chunk_size):
+        lines.append(to_line({"type": "note", **note}))
+
+        if len(lines) == chunk_size:
+            yield "".join(lines)
+            lines.clear()
+
+    versions = (
+        VersionHistory.objects
+        .filter(note__owner_id=user_id)
+        .order_by("note_id", "sequence")
+        .values(*VERSION_FIELDS)
+    )
+    replayer = HistoryReplayer()
+
+    # `values` instead of `values_list`, Since the async iteration of `values_list` is not lazy on Django 5.0
+    async for version in versions.aiterator(chunk_size=chunk_size):
+        old_description, new_description = replayer.replay(version["note_id"], version["snapshot"], version["delta"])
+
+        lines.append(
+            to_line({
+                "type": "version",
+                "note_id": version["note_id"],
+                "sequence": version["sequence"],
+                "user": version["user__username"],
+                "old_description": old_description,
+                "new_description": new_description,
+                "created_at": version["created_at"],
+            })
+        )
+
+        if len(lines) == chunk_size:
+            yield "".join(lines)
+            lines.clear()
+
+    if lines:
+        yield "".join(lines)
@@ -0,0 +1,129 @@
+"""
+Password hashing & verification off the request path.
+
+Hashing a password takes hundreds of milliseconds of CPU, Running it inline would block the event loop (or the
+thread sensitive executor which is shared with the ORM) and starve the note traffic of the same worker. Instead
+the hashing runs on a dedicated pool of `PASSWORD_HASHER_WORKERS` threads, `hashlib` releases the GIL while
+hashing so the threads run in parallel with the request handling.
+
+At most `PASSWORD_HASHER_MAX_PENDING` hashing jobs can be queued or running at the same time, Any job beyond that
+is rejected with `HasherSaturated` so that the views can shed the load (429) instead of queuing it without a bound.
+The queued, running & rejected jobs are exported as Prometheus metrics (see `api.metrics`).
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate, hashers, user_logged_in
+from django.db import connections
+
+from api.metrics import PASSWORD_HASHER_IN_FLIGHT, PASSWORD_HASHER_QUEUED, PASSWORD_HASHER_REJECTED
+
+logger = logging.getLogger(__name__)
+
+
+class HasherSaturated(Exception):
+    pass
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+
+    async def run(self, fn, *args):
+        """
+        Run the given function on the pool and return its result, Raise `HasherSaturated` if the queue is full.
+        """
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                PASSWORD_HASHER_REJECTED.inc()
+                logger.warning("Password hasher is saturated", extra=self.stats())
+                raise HasherSaturated()
+
+            self.pending += 1
+
+        queued_at = time.perf_counter()
+        PASSWORD_HASHER_QUEUED.inc()
+
+        def timed():
+            # Record the time which the job has spent in the queue before being picked by a thread
+            with self._lock:
+                self.wait_time += time.perf_counter() - queued_at
+
+            PASSWORD_HASHER_QUEUED.dec()
+            with PASSWORD_HASHER_IN_FLIGHT.track_inprogress():
+                return fn(*args)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def stats(self) -> dict:
+        """
+        Return the queue depth & the counters of the pool.
+        """
+
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_time": self.wait_time,
+        }
+
+
+password_hasher = BoundedExecutor(
+    max_workers=settings.PASSWORD_HASHER_WORKERS,
+    max_pending=settings.PASSWORD_HASHER_MAX_PENDING,
+)
+
+
+def authenticate_user(request, username: str, password: str):
+    """
+    Return the user of the given credentials via the `AUTHENTICATION_BACKENDS`, Else None. Same as the Django's
+    `authenticate` (which sends `user_login_failed`), Along with `user_logged_in` for the authenticated user which
+    updates its last login.
+
+    Runs on a thread of the pool, Which is not a request thread. So its DB connections are closed (i.e. returned
+    to the pool) once done.
+    """
+
+    try:
+        user = authenticate(request, username=username, password=password)
+        if user is not None:
+            user_logged_in.send(sender=user.__class__, request=request, user=user)
+        return user
+    finally:
+        connections.close_all()
+
+
+async def amake_password(password: str) -> str:
+    return await password_hasher.run(hashers.make_password, password)
+
+
+async def aauthenticate(request, username: str, password: str):
+    """
+    Async counterpart of `authenticate_user` on the pool, The password is verified by the backends there.
+    """
+
+    return await password_hasher.run(authenticate_user, request, username, password)
@@ -0,0 +1,372 @@
+"""
+Helpers to write & read the version history of the notes.
+
+Instead of the full old & new description, Each version history record stores a compressed delta from the
+previous description. Every `VERSION_HISTORY_SNAPSHOT_INTERVAL` versions the full old description is stored as
+a snapshot as well, So that any version can be rebuilt by replaying a bounded number of deltas.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVector
+from django.db import transaction
+from django.db.models import Subquery, Value
+from django.utils import timezone
+
+from api import delta
+from api.cache import set_note_states
+from api.models import SEARCH_CONFIG, HistoryOutbox, Note, VersionHistory
+
+
+@dataclass
+class Change:
+    note: Note
+    user: User
+    old_description: str
+    new_description: str
+    # Time of the change, The time when its version history record is written by default
+    changed_at: datetime | None = None
+    # Edit script of the change if it is known (e.g. a patch of the note), Else it is computed from the descriptions
+    ops: list | None = None
+
+
+def get_latest_versions(note_ids) -> dict:
+    """
+    Return the latest version history record of each of the given notes which has any, With a single query.
+    """
+
+    return {
+        version.note_id: version
+        for version in (
+            VersionHistory.objects
+            .filter(note_id__in=note_ids)
+            .order_by("note_id", "-sequence")
+            .distinct("note_id")
+            .only("note_id", "user_id", "sequence", "snapshot", "delta", "created_at", "modified_at")
+        )
+    }
+
+
+def get_search_vector(old_description: str, new_description: str, ops: list, sequence: int) -> SearchVector:
+    # Only the words written by the version are indexed for the search, Along with the initial description
+    # of the note on the first version. So every text which was ever part of the note is searchable once.
+    search_text = delta.get_inserted_words(new_description, ops)
+    if sequence == 1:
+        search_text = f"{old_description} {search_text}"
+
+    return SearchVector(Value(search_text), config=SEARCH_CONFIG)
+
+
+def build_version(
+    note: Note, user: User, old_description: str, new_description: str, sequence: int, ops: list | None = None
+) -> VersionHistory:
+    """
+    Return an unsaved version history record of the given description change, The edit script is computed from the
+    descriptions unless it is given.
+    """
+
+    is_snapshot = (sequence - 1) % settings.VERSION_HISTORY_SNAPSHOT_INTERVAL == 0
+    if ops is None:
+        ops = delta.get_edit_script(old_description, new_description)
+
+    version = VersionHistory(
+        user=user,
+        note=note,
+        sequence=sequence,
+        snapshot=delta.compress(old_description) if is_snapshot else None,
+        delta=delta.encode_script(ops),
+        search_vector=get_search_vector(old_description, new_description, ops, sequence),
+    )
+    version.old_description = old_description
+    version.new_description = new_description
+    version.ops = ops
+
+    return version
+
+
+def can_coalesce(version: VersionHistory, change: Change, changed_at: datetime) -> bool:
+    """
+    Return True if the change is made by the user of the given version within `VERSION_HISTORY_COALESCE_WINDOW`
+    seconds of its last change, Else False.
+    """
+
+    window = settings.VERSION_HISTORY_COALESCE_WINDOW
+    if not window or version.user_id != change.user.id:
+        return False
+
+    return changed_at - version.modified_at <= timedelta(seconds=window)
+
+
+def coalesce_version(version: VersionHistory, change: Change):
+    """
+    Turn the given version into the version of its old description and the new description of the change.
+
+    The old description is only known if the version is a snapshot, Otherwise the edit script of the change is
+    composed with the one of the version. So no other version has to be read.
+    """
+
+    if version.snapshot is not None:
+        old_description = delta.decompress(version.snapshot)
+        ops = delta.get_edit_script(old_description, change.new_description)
+    else:
+        old_description = None
+        ops = getattr(version, "ops", None) or delta.decode_script(version.delta)
+        change_ops = change.ops
+        if change_ops is None:
+            change_ops = delta.get_edit_script(change.old_description, change.new_description)
+        ops = delta.compose_scripts(ops, change_ops)
+
+    version.delta = delta.encode_script(ops)
+    version.search_vector = get_search_vector(old_description, change.new_description, ops, version.sequence)
+    version.new_description = change.new_description
+    version.ops = ops
+
+
+def save_versions(changes: list[Change]) -> list[VersionHistory]:
+    """
+    Write the version history of the given changes, Which must be in the order they are made. Return the version
+    history records which are created or coalesced.
+
+    Each change gets a new version, Unless it is made by the same user within `VERSION_HISTORY_COALESCE_WINDOW`
+    seconds of the latest version of the note. Then it is coalesced into that version instead, So a burst of edits
+    (e.g. autosaves) is recorded as a single version. Should be called in the same transaction which has locked the
+    notes, So that concurrent edits of a note get consecutive sequences.
+    """
+
+    latest_versions = get_latest_versions({change.note.id for change in changes})
+    now = timezone.now()
+
+    created, coalesced, saved = list(), dict(), list()
+
+    for change in changes:
+        changed_at = change.changed_at or now
+        version = latest_versions.get(change.note.id)
+
+        if version is not None and can_coalesce(version, change, changed_at):
+            coalesce_version(version, change)
+            if not version._state.adding:
+                coalesced[version.id] = version
+        else:
+            sequence = version.sequence + 1 if version is not None else 1
+            version = build_version(
+                change.note, change.user, change.old_description, change.new_description, sequence, change.ops
+            )
+            version.created_at = changed_at
+            latest_versions[change.note.id] = version
+            created.append(version)
+
+        version.modified_at = changed_at
+        saved.append(version)
+
+    times = [(version.created_at, version.modified_at) for version in created]
+    VersionHistory.objects.bulk_create(created)
+
+    # `bulk_create` sets the `auto_now` fields to the current time, So the times of the given changes are restored
+    if any(change.changed_at is not None for change in changes):
+        for version, (created_at, modified_at) in zip(created, times):
+            version.created_at, version.modified_at = created_at, modified_at
+            coalesced[version.id] = version
+
+    # `bulk_update` writes the fields as they are, Including the `auto_now` field
+    VersionHistory.objects.bulk_update(coalesced.values(), ("delta", "search_vector", "created_at", "modified_at"))
+
+    return saved
+
+
+def create_version(
+    note: Note, user: User, old_description: str, new_description: str, ops: list | None = None
+) -> VersionHistory:
+    """
+    Create (or coalesce) the version history record of the given description change, See `save_versions`.
+    """
+
+    return create_versions([Change(note, user, old_description, new_description, ops=ops)])[0]
+
+
+def create_versions(changes: list[Change]) -> list[VersionHistory]:
+    """
+    Create (or coalesce) the version history records of the given changes with a fixed number of queries,
+    See `save_versions`.
+    """
+
+    versions = save_versions(changes)
+
+    # The cached responses of the notes are replaced once the new versions are committed
+    notes = {change.note.id: change.note for change in changes}
+    transaction.on_commit(lambda: set_note_states(notes.values()))
+
+    return versions
+
+
+def build_outbox_record(note: Note, user: User, old_description: str, new_description: str) -> HistoryOutbox:
+    """
+    Return an unsaved outbox record of the given description change, See `VERSION_HISTORY_WRITE_BEHIND`.
+    """
+
+    return HistoryOutbox(
+        user=user,
+        note=note,
+        version=note.version,
+        old_description=delta.compress(old_description),
+        new_description=delta.compress(new_description),
+    )
+
+
+def enqueue_versions(records: list[HistoryOutbox]) -> list[HistoryOutbox]:
+    """
+    Create the given outbox records with a single insert, Their version history records are created later by the
+    consumer (see `api.outbox`). Should be called in the same transaction which has updated the notes.
+    """
+
+    records = HistoryOutbox.objects.bulk_create(records)
+
+    notes = {record.note_id: record.note for record in records}
+    transaction.on_commit(lambda: set_note_states(notes.values()))
+
+    return records
+
+
+def record_version(note: Note, user: User, old_description: str, new_description: str, ops: list | None = None):
+    """
+    Record the given description change of the note, Either by creating its version history record right away or
+    by writing an outbox record if `VERSION_HISTORY_WRITE_BEHIND` is enabled. The edit script of the change (if
+    known) is only used by the former, The outbox stores the descriptions.
+    """
+
+    if settings.VERSION_HISTORY_WRITE_BEHIND:
+        enqueue_versions([build_outbox_record(note, user, old_description, new_description)])
+    else:
+        create_version(note, user, old_description, new_description, ops)
+
+
+def materialize_versions(records: list[HistoryOutbox]) -> list[VersionHistory]:
+    """
+    Create (or coalesce) the version history records of the given outbox records, Which must be ordered by their ID.
+
+    The records of a note are written in the order of their updates, Since each of them is written while the note
+    row is locked. So the versions are written in the same order as `create_versions` would have, Along with the
+    time of each update.
+    """
+
+    return save_versions([
+        Change(
+            record.note,
+            record.user,
+            delta.decompress(record.old_description),
+            delta.decompress(record.new_description),
+            changed_at=record.created_at,
+        )
+        for record in records
+    ])
+
+
+def get_chain_queryset(note_id, first: int, last: int):
+    """
+    Return the (sequence, snapshot, delta) records which are needed to rebuild the versions from `first` to `last`,
+    Starting from the closest snapshot.
+    """
+
+    snapshot = (
+        VersionHistory.objects
+        .filter(note_id=note_id, sequence__lte=first, snapshot__isnull=False)
+        .order_by("-sequence")
+        .values("sequence")[:1]
+    )
+
+    return (
+        VersionHistory.objects
+        .filter(note_id=note_id, sequence__gte=Subquery(snapshot), sequence__lte=last)
+        .order_by("sequence")
+        .values_list("sequence", "snapshot", "delta")
+    )
+
+
+def replay_chain(chain) -> dict[int, tuple[str, str]]:
+    """
+    Replay the deltas of the given chain and return the (old, new) description of each sequence.
+    """
+
+    versions = dict()
+    description = None
+
+    for sequence, snapshot, change in chain:
+        old_description = delta.decompress(snapshot) if snapshot is not None else description
+        description = delta.apply_delta(old_description, change)
+        versions[sequence] = (old_description, description)
+
+    return versions
+
+
+class HistoryReplayer:
+    """
+    Rebuilds the descriptions of whole version histories which are read in the order of (note, sequence),
+    Only the latest description of the current note is kept in memory. So any number of versions can be
+    streamed with a flat memory usage.
+    """
+
+    def __init__(self):
+        self.note_id = None
+        self.description = None
+
+    def replay(self, note_id, snapshot: bytes | None, change: bytes) -> tuple[str, str]:
+        """
+        Return the (old, new) description of the next version record.
+        """
+
+        # The first version of each note is always a snapshot
+        if snapshot is not None:
+            old_description = delta.decompress(snapshot)
+        elif note_id == self.note_id:
+            old_description = self.description
+        else:
+            raise ValueError(f"Version history of the note {note_id} does not start with a snapshot")
+
+        self.note_id = note_id
+        self.description = delta.apply_delta(old_description, change)
+
+        return old_description, self.description
+
+
+def get_sequence_ranges(versions: list[VersionHistory]) -> dict:
+    sequences = defaultdict(list)
+    for version in versions:
+        sequences[version.note_id].append(version.sequence)
+
+    return {note_id: (min(note_sequences), max(note_sequences)) for note_id, note_sequences in sequences.items()}
+
+
+def set_descriptions(versions: list[VersionHistory], descriptions: dict):
+    for version in versions:
+        version.old_description, version.new_description = descriptions[(version.note_id, version.sequence)]
+
+
+def restore_descriptions(versions: list[VersionHistory]):
+    """
+    Set the `old_description` & `new_description` of the given version history records, With a single query per note.
+    """
+
+    descriptions = dict()
+
+    for note_id, (first, last) in get_sequence_ranges(versions).items():
+        chain = get_chain_queryset(note_id, first, last)
+        descriptions.update({(note_id, sequence): value for sequence, value in replay_chain(chain).items()})
+
+    set_descriptions(versions, descriptions)
+
+
+async def arestore_descriptions(versions: list[VersionHistory]):
+    """
+    Async counterpart of `restore_descriptions`.
+    """
+
+    descriptions = dict()
+
+    for note_id, (first, last) in get_sequence_ranges(versions).items():
+        chain = [record async for record in get_chain_queryset(note_id, first, last)]
+        descriptions.update({(note_id, sequence): value for sequence, value in replay_chain(chain).items()})
+
+    set_descriptions(versions, descriptions)
@@ -0,0 +1,84 @@
+"""
+Per request performance metrics, See `api.middleware.RequestMetricsMiddleware`.
+
+The metrics of the current request are kept in a context variable, Which is copied into the thread sensitive
+executor by `sync_to_async`. So the queries & the rendering which run off the event loop are recorded against
+the request which has issued them. Nothing is recorded outside of a sampled request.
+"""
+
+import heapq
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+_request_metrics: ContextVar["RequestMetrics | None"] = ContextVar("request_metrics", default=None)
+
+
+@dataclass
+class RequestMetrics:
+    # Number of the slowest queries which are kept, Along with their SQL
+    max_slow_queries: int = 0
+
+    query_count: int = 0
+    query_time: float = 0.0
+    serialization_time: float = 0.0
+    slow_queries: list = field(default_factory=list)
+
+    def add_query(self, sql: str, duration: float):
+        self.query_count += 1
+        self.query_time += duration
+
+        if self.max_slow_queries:
+            # Min heap of the slowest queries so far, The fastest of them is replaced first
+            entry = (duration, self.query_count, sql)
+            if len(self.slow_queries) < self.max_slow_queries:
+                heapq.heappush(self.slow_queries, entry)
+            else:
+                heapq.heappushpop(self.slow_queries, entry)
+
+    def get_slow_queries(self) -> list[dict]:
+        return [
+            {"sql": sql, "duration_ms": round(duration * 1000, 3)}
+            for duration, _, sql in sorted(self.slow_queries, reverse=True)
+        ]
+
+
+def get_request_metrics() -> RequestMetrics | None:
+    return _request_metrics.get()
+
+
+def start_request_metrics(max_slow_queries: int = 0):
+    """
+    Start recording the metrics of the current request, Return the token to reset them via `stop_request_metrics`.
+    """
+
+    return _request_metrics.set(RequestMetrics(max_slow_queries=max_slow_queries))
+
+
+def stop_request_metrics(token):
+    _request_metrics.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper of the DB connections (see `install_query_recorder`), Records the duration of each query.
+    """
+
+    metrics = _request_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Receiver of the `connection_created` signal, Installs `record_query` on every DB connection once.
+    """
+
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
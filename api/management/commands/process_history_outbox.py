@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import outbox
+
+
+class Command(BaseCommand):
+    help = "Write the version history records of the outbox, See `VERSION_HISTORY_WRITE_BEHIND`."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.VERSION_HISTORY_OUTBOX_BATCH_SIZE,
+            help="Number of outbox records which are written per transaction",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.VERSION_HISTORY_OUTBOX_INTERVAL,
+            help="Seconds to wait before polling the outbox again, Once it is empty",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once the outbox is empty")
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            help="Expose the lag metrics of the consumer on this port, Unless they are written to "
+                 "`PROMETHEUS_MULTIPROC_DIR` along with the metrics of the API",
+        )
+
+    def handle(self, *args, **options):
+        if options["metrics_port"]:
+            from prometheus_client import start_http_server
+
+            start_http_server(options["metrics_port"])
+
+        try:
+            outbox.run(options["batch_size"], options["interval"], once=options["once"])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import sync
+
+
+class Command(BaseCommand):
+    help = "Delete the note removals of the sync which are older than `NOTE_SYNC_RETENTION_DAYS`."
+
+    def handle(self, *args, **options):
+        count = sync.prune_removals()
+        self.stdout.write(f"Pruned {count} note removals")
@@ -0,0 +1,103 @@
+"""
+Prometheus metrics of the API, Exposed by `api.views.metrics.metrics` and recorded by
+`api.middleware.PrometheusMetricsMiddleware`.
+
+Each gunicorn worker is a separate process, So the metrics are written to the files of the
+`PROMETHEUS_MULTIPROC_DIR` directory (see `gunicorn.conf.py`) and aggregated across all the workers when they are
+exposed. Without the directory (e.g. under `manage.py runserver` or the tests) the metrics of the current process
+are exposed.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Requests which do not match any URL
+UNMATCHED_VIEW = "<unmatched>"
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Latency of the requests",
+    ["view", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS = Counter("http_requests", "Number of the responses", ["view", "method", "status"])
+REQUEST_ERRORS = Counter("http_request_errors", "Number of the server errors (5xx)", ["view", "method"])
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Number of the requests which are being handled",
+    ["view", "method"],
+    # Sum of the workers which are alive
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter("db_queries", "Number of the DB queries", ["view", "method"])
+DB_QUERY_TIME = Counter("db_query_duration_seconds", "Total time of the DB queries", ["view", "method"])
+
+# Version history outbox, See `api.outbox`. The gauges are set by the consumer, Which may run in any process.
+HISTORY_OUTBOX_PENDING = Gauge(
+    "history_outbox_pending",
+    "Number of the outbox records which are yet to be written",
+    multiprocess_mode="mostrecent",
+)
+HISTORY_OUTBOX_LAG = Gauge(
+    "history_outbox_lag_seconds",
+    "Age of the oldest outbox record which is yet to be written",
+    multiprocess_mode="mostrecent",
+)
+HISTORY_OUTBOX_DELIVERY = Histogram(
+    "history_outbox_delivery_seconds",
+    "Time from the update of a note until its version history record is written",
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+HISTORY_OUTBOX_WRITTEN = Counter("history_outbox_written", "Number of the version history records which are written")
+HISTORY_OUTBOX_FAILURES = Counter("history_outbox_failures", "Number of the outbox batches which have failed")
+
+# Note events, See `api.events`
+NOTE_EVENTS_SUBSCRIPTIONS = Gauge(
+    "note_events_subscriptions",
+    "Number of the clients which are subscribed to the note events",
+    multiprocess_mode="livesum",
+)
+NOTE_EVENTS_DELIVERED = Counter("note_events_delivered", "Number of the note events which are delivered to the clients")
+
+# Password hasher pool, See `api.hashing`
+PASSWORD_HASHER_QUEUED = Gauge(
+    "password_hasher_queued",
+    "Number of the hashing jobs which are waiting for a thread of the pool",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASHER_IN_FLIGHT = Gauge(
+    "password_hasher_in_flight",
+    "Number of the hashing jobs which are running on the pool",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASHER_REJECTED = Counter(
+    "password_hasher_rejected", "Number of the hashing jobs which are rejected (429), Since the pool is saturated"
+)
+
+
+def get_registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    # A new registry on every collection, Since the files of the workers come & go
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def generate_metrics() -> tuple[bytes, str]:
+    """
+    Return the metrics in the Prometheus text format, Along with their content type.
+    """
+
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
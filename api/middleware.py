@@ -0,0 +1,183 @@
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from api import metrics as prometheus
+from api.instrumentation import get_request_metrics, start_request_metrics, stop_request_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+    """
+    Logs the wall time, The number & the total time of the DB queries, The serialization time and the response
+    size of a sample of the requests (`REQUEST_METRICS_SAMPLE_RATE`) as structured fields.
+
+    A request which takes longer than `SLOW_REQUEST_THRESHOLD_MS` is logged as a warning regardless of the
+    sampling, Along with its `SLOW_REQUEST_QUERIES` slowest queries if it has been sampled. The requests which
+    are not sampled only pay for the wall time measurement.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        self.slow_threshold = settings.SLOW_REQUEST_THRESHOLD_MS / 1000
+        self.max_slow_queries = settings.SLOW_REQUEST_QUERIES
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def start(self):
+        token = None
+        if self.sample_rate and random.random() < self.sample_rate:
+            token = start_request_metrics(max_slow_queries=self.max_slow_queries)
+
+        return token, time.perf_counter()
+
+    def finish(self, request, response, token, start: float):
+        duration = time.perf_counter() - start
+        metrics = get_request_metrics() if token else None
+
+        if token:
+            stop_request_metrics(token)
+
+        is_slow = duration >= self.slow_threshold
+        if metrics is None and not is_slow:
+            return
+
+        resolver_match = request.resolver_match
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "view": resolver_match.url_name if resolver_match else None,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 3),
+        }
+
+        if metrics is not None:
+            fields.update({
+                "query_count": metrics.query_count,
+                "query_time_ms": round(metrics.query_time * 1000, 3),
+                "serialization_ms": round(metrics.serialization_time * 1000, 3),
+                # The size of a streaming response is not known upfront
+                "response_size": None if response.streaming else len(response.content),
+            })
+
+        if is_slow:
+            if metrics is not None:
+                fields["slow_queries"] = metrics.get_slow_queries()
+            logger.warning("Slow request", extra=fields)
+        else:
+            logger.info("Request metrics", extra=fields)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token, start = self.start()
+        response = self.get_response(request)
+        self.finish(request, response, token, start)
+
+        return response
+
+    async def __acall__(self, request):
+        token, start = self.start()
+        response = await self.get_response(request)
+        self.finish(request, response, token, start)
+
+        return response
+
+
+class PrometheusMetricsMiddleware:
+    """
+    Records the latency, The requests in progress, The responses, The server errors & the DB queries of each
+    request in the Prometheus metrics (see `api.metrics`), Labelled by the URL name of the view.
+
+    Must come after the `RequestMetricsMiddleware`, So that the queries of a request which is sampled by it are
+    counted here as well.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    # Any other method is labelled as "other", So that the number of the label values stays bounded
+    methods = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+    excluded_views = {"metrics"}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def get_view_name(self, request) -> str:
+        # The URL is resolved by the handler only after the middleware has been called
+        try:
+            return resolve(request.path_info).view_name
+        except Resolver404:
+            return prometheus.UNMATCHED_VIEW
+
+    def start(self, request) -> tuple | None:
+        view = self.get_view_name(request)
+        if view in self.excluded_views:
+            return None
+
+        labels = (view, request.method if request.method in self.methods else "other")
+        prometheus.REQUESTS_IN_PROGRESS.labels(*labels).inc()
+
+        # Reuse the metrics of the request if it has been sampled, Else count its queries on our own
+        token = start_request_metrics() if get_request_metrics() is None else None
+
+        return labels, token, time.perf_counter()
+
+    def finish(self, state: tuple | None, response):
+        if state is None:
+            return
+
+        labels, token, start = state
+        view, method = labels
+        metrics = get_request_metrics()
+
+        prometheus.REQUEST_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+        prometheus.REQUESTS_IN_PROGRESS.labels(*labels).dec()
+
+        if response is not None:
+            prometheus.REQUESTS.labels(view, method, response.status_code).inc()
+
+        if response is None or response.status_code >= 500:
+            prometheus.REQUEST_ERRORS.labels(*labels).inc()
+
+        if metrics is not None:
+            prometheus.DB_QUERIES.labels(*labels).inc(metrics.query_count)
+            prometheus.DB_QUERY_TIME.labels(*labels).inc(metrics.query_time)
+
+        if token:
+            stop_request_metrics(token)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        state, response = self.start(request), None
+        try:
+            response = self.get_response(request)
+        finally:
+            self.finish(state, response)
+
+        return response
+
+    async def __acall__(self, request):
+        state, response = self.start(request), None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self.finish(state, response)
+
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='versionhistory',
+            options={'ordering': ('-created_at', '-id')},
+        ),
+        migrations.AddIndex(
+            model_name='versionhistory',
+            index=models.Index(fields=['note', 'created_at', 'id'], name='api_vh_note_created_id_idx'),
+        ),
+        # The user model is owned by django.contrib.auth, So the index backing the keyset pagination
+        # of the user list is created here.
+        migrations.RunSQL(
+            sql='CREATE INDEX api_user_joined_id_idx ON auth_user (date_joined, id);',
+            reverse_sql='DROP INDEX api_user_joined_id_idx;',
+        ),
+    ]
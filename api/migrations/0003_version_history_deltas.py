@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versionhistory',
+            name='sequence',
+            field=models.PositiveIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='versionhistory',
+            name='snapshot',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='versionhistory',
+            name='delta',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.db import migrations
+
+from api import delta
+
+
+def encode_history(apps, schema_editor):
+    """
+    Convert the full old & new descriptions of the existing version history records into snapshots & deltas.
+    """
+
+    VersionHistory = apps.get_model("api", "VersionHistory")
+    interval = settings.VERSION_HISTORY_SNAPSHOT_INTERVAL
+
+    note_ids = VersionHistory.objects.values_list("note_id", flat=True).distinct()
+    for note_id in note_ids.iterator():
+        versions = []
+        previous_description = None
+
+        records = VersionHistory.objects.filter(note_id=note_id).order_by("created_at", "id")
+        for sequence, version in enumerate(records.iterator(), start=1):
+            version.sequence = sequence
+
+            # A full snapshot is also stored whenever the recorded old description does not follow the
+            # previous version, e.g. concurrent edits of the note.
+            if (sequence - 1) % interval == 0 or version.old_description != previous_description:
+                version.snapshot = delta.compress(version.old_description)
+            else:
+                version.snapshot = None
+
+            version.delta = delta.encode_delta(version.old_description, version.new_description)
+            previous_description = version.new_description
+            versions.append(version)
+
+        VersionHistory.objects.bulk_update(versions, ["sequence", "snapshot", "delta"], batch_size=500)
+
+
+def decode_history(apps, schema_editor):
+    """
+    Restore the full old & new descriptions of the version history records from the snapshots & deltas.
+    """
+
+    VersionHistory = apps.get_model("api", "VersionHistory")
+
+    note_ids = VersionHistory.objects.values_list("note_id", flat=True).distinct()
+    for note_id in note_ids.iterator():
+        versions = []
+        description = None
+
+        for version in VersionHistory.objects.filter(note_id=note_id).order_by("sequence").iterator():
+            version.old_description = delta.decompress(version.snapshot) if version.snapshot is not None else description
+            version.new_description = description = delta.apply_delta(version.old_description, version.delta)
+            versions.append(version)
+
+        VersionHistory.objects.bulk_update(versions, ["old_description", "new_description"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_version_history_deltas'),
+    ]
+
+    operations = [
+        migrations.RunPython(encode_history, decode_history),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_encode_version_history'),
+    ]
+
+    operations = [
+        # Default to an empty string, So that the columns can be added back when the migration is reversed
+        migrations.AlterField(
+            model_name='versionhistory',
+            name='old_description',
+            field=models.TextField(default='', max_length=2000),
+        ),
+        migrations.AlterField(
+            model_name='versionhistory',
+            name='new_description',
+            field=models.TextField(default='', max_length=2000),
+        ),
+        migrations.RemoveField(
+            model_name='versionhistory',
+            name='old_description',
+        ),
+        migrations.RemoveField(
+            model_name='versionhistory',
+            name='new_description',
+        ),
+        migrations.AddConstraint(
+            model_name='versionhistory',
+            constraint=models.UniqueConstraint(fields=('note', 'sequence'), name='api_vh_note_sequence_uniq'),
+        ),
+    ]
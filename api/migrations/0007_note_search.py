@@ -0,0 +1,51 @@
+# Generated by Django 5.0.2 on 2026-10-18 08:56
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_note_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('description', config='english'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddField(
+            model_name='versionhistory',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_note_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='versionhistory',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='api_vh_search_vector_idx'),
+        ),
+        # Trigram index which backs the substring search fallback (`icontains`) of the notes. The pg_trgm
+        # extension is a contrib module which may not be installed on the database server, In which case
+        # the fallback still works but scans the notes of the user instead.
+        migrations.RunSQL(
+            sql="""
+                DO $$
+                BEGIN
+                    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+                        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                        CREATE INDEX api_note_description_trgm_idx ON api_note USING gin (UPPER(description) gin_trgm_ops);
+                    END IF;
+                END
+                $$;
+            """,
+            reverse_sql='DROP INDEX IF EXISTS api_note_description_trgm_idx;',
+        ),
+    ]
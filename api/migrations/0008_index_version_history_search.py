@@ -0,0 +1,42 @@
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Value
+
+from api import delta
+
+
+def index_history(apps, schema_editor):
+    """
+    Set the search vector of the existing version history records, i.e. The words written by each version.
+    """
+
+    VersionHistory = apps.get_model("api", "VersionHistory")
+
+    note_ids = VersionHistory.objects.values_list("note_id", flat=True).distinct()
+    for note_id in note_ids.iterator():
+        versions = []
+        description = None
+
+        for version in VersionHistory.objects.filter(note_id=note_id).order_by("sequence").iterator():
+            old_description = delta.decompress(version.snapshot) if version.snapshot is not None else description
+            description = delta.apply_delta(old_description, version.delta)
+
+            text = delta.get_inserted_words(description, delta.get_edit_script(old_description, description))
+            if version.sequence == 1:
+                text = f"{old_description} {text}"
+
+            version.search_vector = SearchVector(Value(text), config="english")
+            versions.append(version)
+
+        VersionHistory.objects.bulk_update(versions, ["search_vector"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_note_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_history, migrations.RunPython.noop),
+    ]
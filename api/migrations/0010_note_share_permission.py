@@ -0,0 +1,41 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_note_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The note share model takes over the auto created many to many table as is, So only the state changes
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='NoteShare',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shares', to='api.note')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'api_note_shared_with',
+                        'unique_together': {('note', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='note',
+                    name='shared_with',
+                    field=models.ManyToManyField(related_name='shared_notes', through='api.NoteShare', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='noteshare',
+            name='permission',
+            field=models.CharField(choices=[('read', 'Read'), ('write', 'Write')], default='write', max_length=5),
+        ),
+    ]
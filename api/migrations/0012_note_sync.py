@@ -0,0 +1,91 @@
+# Generated by Django 5.0.2 on 2026-10-18 10:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_history_outbox'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRemoval',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('note_id', models.UUIDField()),
+                ('user_id', models.IntegerField()),
+                ('change_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='change_id',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='noteshare',
+            name='change_id',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'change_id', 'id'], name='api_note_owner_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='noteremoval',
+            index=models.Index(fields=['user_id', 'change_id'], name='api_removal_user_change_idx'),
+        ),
+        # The change IDs are the IDs of the writing transactions, Set by triggers so that every write of the notes
+        # & note shares (ORM, bulk or raw SQL) is covered. See `api.sync` for why transaction IDs are used.
+        migrations.RunSQL(
+            sql="""
+                CREATE FUNCTION api_set_change_id() RETURNS trigger AS $$
+                BEGIN
+                    NEW.change_id := pg_current_xact_id()::text::bigint;
+                    RETURN NEW;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER api_note_change_id
+                    BEFORE INSERT OR UPDATE OF description, owner_id ON api_note
+                    FOR EACH ROW EXECUTE FUNCTION api_set_change_id();
+
+                CREATE TRIGGER api_note_share_change_id
+                    BEFORE INSERT OR UPDATE OF permission ON api_note_shared_with
+                    FOR EACH ROW EXECUTE FUNCTION api_set_change_id();
+
+                CREATE FUNCTION api_record_note_removal() RETURNS trigger AS $$
+                BEGIN
+                    IF TG_TABLE_NAME = 'api_note' THEN
+                        INSERT INTO api_noteremoval (note_id, user_id, change_id)
+                        VALUES (OLD.id, OLD.owner_id, pg_current_xact_id()::text::bigint);
+                    ELSE
+                        INSERT INTO api_noteremoval (note_id, user_id, change_id)
+                        VALUES (OLD.note_id, OLD.user_id, pg_current_xact_id()::text::bigint);
+                    END IF;
+                    RETURN OLD;
+                END
+                $$ LANGUAGE plpgsql;
+
+                CREATE TRIGGER api_note_removal
+                    AFTER DELETE ON api_note
+                    FOR EACH ROW EXECUTE FUNCTION api_record_note_removal();
+
+                CREATE TRIGGER api_note_share_removal
+                    AFTER DELETE ON api_note_shared_with
+                    FOR EACH ROW EXECUTE FUNCTION api_record_note_removal();
+            """,
+            reverse_sql="""
+                DROP TRIGGER api_note_share_removal ON api_note_shared_with;
+                DROP TRIGGER api_note_removal ON api_note;
+                DROP FUNCTION api_record_note_removal();
+                DROP TRIGGER api_note_share_change_id ON api_note_shared_with;
+                DROP TRIGGER api_note_change_id ON api_note;
+                DROP FUNCTION api_set_change_id();
+            """,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:00
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_note_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noteremoval',
+            name='created_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddIndex(
+            model_name='noteremoval',
+            index=models.Index(fields=['created_at'], name='api_removal_created_idx'),
+        ),
+    ]
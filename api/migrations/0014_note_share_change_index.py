@@ -0,0 +1,19 @@
+# Generated by Django 5.0.2 on 2026-10-18 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_note_removal_retention'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='noteshare',
+            index=models.Index(fields=['user', 'change_id'], name='api_share_user_change_idx'),
+        ),
+    ]
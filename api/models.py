@@ -2,7 +2,14 @@ import uuid
 from datetime import datetime
 
 from django.contrib.auth.models import User
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connections, models, router
+from django.db.models.functions import Now
+from django.utils import timezone
+
+# Text search configuration of the search vectors, The search queries must use the same configuration
+SEARCH_CONFIG = "english"
 
 class BaseModel(models.Model):
     id: uuid = models.UUIDField(default=uuid.uuid4, primary_key=True, db_index=True, editable=False)
@@ -13,20 +20,192 @@ class BaseModel(models.Model):
         abstract = True
 
 
+class NoteQuerySet(models.QuerySet):
+    def with_access(self, user_id):
+        """
+        Annotate `has_access` & `can_update` on each note, Which are True if the given user is either the owner of
+        the note or have read (resp. write) access to the note via note share. The share lookups are EXISTS
+        subqueries on the note share table, So they are evaluated along with the note fetch in a single query.
+        """
+
+        shares = NoteShare.objects.filter(note_id=models.OuterRef("pk"), user_id=user_id)
+        is_owner = models.Q(owner_id=user_id)
+
+        return self.annotate(
+            has_access=models.ExpressionWrapper(
+                is_owner | models.Q(models.Exists(shares)),
+                output_field=models.BooleanField(),
+            ),
+            can_update=models.ExpressionWrapper(
+                is_owner | models.Q(models.Exists(shares.filter(permission=NoteShare.Permission.WRITE))),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+    def lock_description(self, pk, version: int) -> str | None:
+        """
+        Lock the note & return its description, Else None if the note is not at the given version anymore. Must be
+        called in a transaction, The row stays locked until its end.
+        """
+
+        return self.select_for_update().filter(pk=pk, version=version).values_list("description", flat=True).first()
+
+    def update_description(self, pk, description: str, version: int | None = None) -> tuple | None:
+        """
+        Update the description of the note and increment its version with a single conditional UPDATE, Only if the
+        note is still at the given version (if any).
+
+        Return the (old description, version, modified_at) of the note, Else None if the note is not at the
+        given version anymore. The old description is read from the row which is locked by the UPDATE, So the
+        concurrent updates of the note are applied one after another. The note is not written at all if the
+        description is not changed, The old description is the given one then and the version is the current one.
+        """
+
+        table = self.model._meta.db_table
+        condition = "AND version = %s" if version is not None else ""
+        params = [pk] + ([version] if version is not None else []) + [description, timezone.now(), description]
+
+        with connections[self._db or router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH old AS (
+                    SELECT id, description, version, modified_at FROM {table} WHERE id = %s {condition} FOR UPDATE
+                ), updated AS (
+                    UPDATE {table} SET description = %s, version = {table}.version + 1, modified_at = %s
+                    FROM old WHERE {table}.id = old.id AND old.description <> %s
+                    RETURNING {table}.version, {table}.modified_at
+                )
+                SELECT old.description, coalesce(updated.version, old.version),
+                    coalesce(updated.modified_at, old.modified_at)
+                FROM old LEFT JOIN updated ON true
+                """,
+                params,
+            )
+            return cursor.fetchone()
+
+
+class NoteManager(models.Manager.from_queryset(NoteQuerySet)):
+    def get_queryset(self):
+        # The search vector is only read by the database while searching, So it is not loaded along with the notes
+        return super().get_queryset().defer("search_vector")
+
+
 class Note(BaseModel):
     owner: User = models.ForeignKey(User, on_delete=models.CASCADE)
     description: str = models.TextField(max_length=2000)
-    shared_with: list[User] = models.ManyToManyField(User, related_name="shared_notes")
+    shared_with: list[User] = models.ManyToManyField(User, related_name="shared_notes", through="NoteShare")
+    # Incremented on every update of the description, Used as the ETag of the note
+    version: int = models.PositiveIntegerField(default=1)
+    # ID of the transaction which has last created or updated the note, Set by a trigger. See `api.sync`
+    change_id: int = models.BigIntegerField(default=0, editable=False)
+    # Stored, So that the search does not parse the description of every candidate note again
+    search_vector = models.GeneratedField(
+        expression=SearchVector("description", config=SEARCH_CONFIG),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = NoteManager()
 
     class Meta:
         ordering = ("-created_at",)
+        indexes = [
+            # Back the keyset pagination of the owned notes, On either ordering of the notes list
+            models.Index(fields=("owner", "modified_at", "id"), name="api_note_owner_modified_id_idx"),
+            models.Index(fields=("owner", "created_at", "id"), name="api_note_owner_created_id_idx"),
+            # Backs the sync of the owned notes, See `api.sync`
+            models.Index(fields=("owner", "change_id", "id"), name="api_note_owner_change_idx"),
+            # Backs the full text search of the notes, See `api.search`
+            GinIndex(fields=("search_vector",), name="api_note_search_idx"),
+        ]
+
+
+class NoteShare(models.Model):
+    class Permission(models.TextChoices):
+        READ = "read"
+        WRITE = "write"
+
+    id: int = models.AutoField(primary_key=True)
+    note: Note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name="shares")
+    user: User = models.ForeignKey(User, on_delete=models.CASCADE)
+    # The shares which were created before the permission levels could read & update the note
+    permission: str = models.CharField(max_length=5, choices=Permission.choices, default=Permission.WRITE)
+    # ID of the transaction which has last shared the note or changed the permission, Set by a trigger
+    change_id: int = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        # The table of the former auto created many to many table, See `api.sharing` for the raw queries on it
+        db_table = "api_note_shared_with"
+        unique_together = ("note", "user")
+        indexes = [
+            # The note shares of a user which are changed since a sync, See `api.sync`
+            models.Index(fields=("user", "change_id"), name="api_share_user_change_idx"),
+        ]
+
+
+class NoteRemoval(models.Model):
+    """
+    Note which is not visible to the user anymore, Since it is either unshared or deleted. Written by the triggers
+    of the notes & note share tables, So that the sync can tell the clients to drop the note. See `api.sync`.
+    """
+
+    id: int = models.BigAutoField(primary_key=True)
+    # Not foreign keys, Since the note (or the user) is usually deleted already
+    note_id: uuid = models.UUIDField()
+    user_id: int = models.IntegerField()
+    # ID of the transaction which has removed the note
+    change_id: int = models.BigIntegerField()
+    # Set by the DB, Since the records are inserted by the triggers. The old records are pruned, See
+    # `NOTE_SYNC_RETENTION_DAYS`
+    created_at: datetime = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("user_id", "change_id"), name="api_removal_user_change_idx"),
+            models.Index(fields=("created_at",), name="api_removal_created_idx"),
+        ]
 
 
 class VersionHistory(BaseModel):
     user: User = models.ForeignKey(User, on_delete=models.CASCADE)
     note: Note = models.ForeignKey(Note, on_delete=models.CASCADE)
-    old_description: str = models.TextField(max_length=2000)
-    new_description: str = models.TextField(max_length=2000)
+    sequence: int = models.PositiveIntegerField()
+    # Compressed description of the note before this version, Only stored on the snapshot versions
+    snapshot: bytes | None = models.BinaryField(null=True)
+    # Compressed edit script which turns the previous description of the note into the new one
+    delta: bytes = models.BinaryField()
+    # Words which are written by this version, Along with the initial description on the first version
+    search_vector = SearchVectorField(null=True)
+
+    # Rebuilt from the snapshot & deltas, See `api.history`
+    old_description: str
+    new_description: str
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created_at", "-id")
+        indexes = [
+            # Backs the keyset pagination of a note's version history
+            models.Index(fields=("note", "created_at", "id"), name="api_vh_note_created_id_idx"),
+            GinIndex(fields=("search_vector",), name="api_vh_search_vector_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=("note", "sequence"), name="api_vh_note_sequence_uniq"),
+        ]
+
+
+class HistoryOutbox(models.Model):
+    """
+    Version history record which is yet to be written, See `VERSION_HISTORY_WRITE_BEHIND` & `api.outbox`.
+    """
+
+    # Sequential, So that the records are consumed in the order they are written
+    id: int = models.BigAutoField(primary_key=True)
+    user: User = models.ForeignKey(User, on_delete=models.CASCADE)
+    note: Note = models.ForeignKey(Note, on_delete=models.CASCADE)
+    # Version of the note which is written by the update
+    version: int = models.PositiveIntegerField()
+    # Compressed descriptions of the note before & after the update, The delta is computed by the consumer
+    old_description: bytes = models.BinaryField()
+    new_description: bytes = models.BinaryField()
+    # Time of the update, Copied to the version history record
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,150 @@
+"""
+Consumer of the version history outbox, See `VERSION_HISTORY_WRITE_BEHIND`.
+
+With the write behind enabled, An update of a note only writes a compact outbox record in its transaction (see
+`api.history.record_version`). The consumer turns the outbox records into version history records in batches,
+Either via the `process_history_outbox` management command or via `OutboxWorker` in the gunicorn workers.
+
+Delivery guarantees:
+
+- An outbox record is committed along with the note update, So a committed update is never lost.
+- A batch of version history records is written & its outbox records are deleted in a single transaction. If the
+  consumer crashes midway the batch is rolled back and retried, So each record is written exactly once.
+- Only one consumer writes at a time (via an advisory lock), So the sequences of a note are assigned in the order
+  of its updates even if the consumer runs in many processes.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from api import history
+from api.cache import invalidate_note_responses
+from api.metrics import (
+    HISTORY_OUTBOX_DELIVERY,
+    HISTORY_OUTBOX_FAILURES,
+    HISTORY_OUTBOX_LAG,
+    HISTORY_OUTBOX_PENDING,
+    HISTORY_OUTBOX_WRITTEN,
+)
+from api.models import HistoryOutbox
+
+logger = logging.getLogger(__name__)
+
+# Key of the transaction level advisory lock, Which is held by the consumer that is writing a batch
+OUTBOX_LOCK_ID = 0x68697374
+
+
+def acquire_lock() -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", [OUTBOX_LOCK_ID])
+        return cursor.fetchone()[0]
+
+
+def delete_records(record_ids: list[int]):
+    HistoryOutbox.objects.filter(id__in=record_ids).delete()
+
+
+def on_batch_written(records: list[HistoryOutbox]):
+    # The cached version history responses of the notes are missing the written versions, Only the shared response
+    # cache reaches the other processes (see `VersionHisotryList.is_cached`)
+    invalidate_note_responses({record.note_id for record in records})
+
+    now = timezone.now()
+    for record in records:
+        HISTORY_OUTBOX_DELIVERY.observe((now - record.created_at).total_seconds())
+    HISTORY_OUTBOX_WRITTEN.inc(len(records))
+
+
+def process_batch(batch_size: int) -> int:
+    """
+    Write the version history records of the oldest `batch_size` outbox records, Return the number of the written
+    records. Nothing is written if another consumer is writing a batch at the same time.
+    """
+
+    with transaction.atomic():
+        if not acquire_lock():
+            return 0
+
+        records = list(
+            HistoryOutbox.objects
+            .select_related("note", "user")
+            .only("version", "old_description", "new_description", "created_at", "note__id", "user__id")
+            .order_by("id")[:batch_size]
+        )
+        if not records:
+            return 0
+
+        history.materialize_versions(records)
+        delete_records([record.id for record in records])
+
+        transaction.on_commit(lambda: on_batch_written(records))
+
+    return len(records)
+
+
+def update_lag_metrics():
+    stats = HistoryOutbox.objects.aggregate(pending=Count("id"), oldest=Min("created_at"))
+
+    HISTORY_OUTBOX_PENDING.set(stats["pending"])
+    HISTORY_OUTBOX_LAG.set((timezone.now() - stats["oldest"]).total_seconds() if stats["oldest"] else 0)
+
+
+def run(batch_size: int, interval: float, stop: threading.Event | None = None, once: bool = False):
+    """
+    Write the outbox records in batches until `stop` is set, Or until the outbox is empty if `once` is passed.
+
+    The outbox is polled every `interval` seconds once it is empty, A failed batch is retried after the interval.
+    """
+
+    stop = stop or threading.Event()
+
+    while not stop.is_set():
+        # A long running consumer drops the connection once it is broken or past its `CONN_MAX_AGE`
+        if not once:
+            close_old_connections()
+
+        try:
+            written = process_batch(batch_size)
+            update_lag_metrics()
+        except Exception:
+            logger.exception("Could not write the version history outbox")
+            HISTORY_OUTBOX_FAILURES.inc()
+
+            if once:
+                raise
+            written = 0
+
+        if written:
+            logger.info("Version history outbox is written", extra={"written": written})
+        elif once:
+            return
+        else:
+            stop.wait(interval)
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Runs the consumer in a background thread of the current process, See `post_worker_init` in `gunicorn.conf.py`.
+    """
+
+    def __init__(self, batch_size: int | None = None, interval: float | None = None):
+        super().__init__(name="history-outbox", daemon=True)
+
+        self.batch_size = batch_size or settings.VERSION_HISTORY_OUTBOX_BATCH_SIZE
+        self.interval = interval or settings.VERSION_HISTORY_OUTBOX_INTERVAL
+        self.stop_event = threading.Event()
+
+    def run(self):
+        try:
+            run(self.batch_size, self.interval, self.stop_event)
+        finally:
+            connection.close()
+
+    def stop(self, timeout: float | None = None):
+        self.stop_event.set()
+        self.join(timeout)
@@ -0,0 +1,181 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async counterpart of `paginate_queryset`, Which runs the count and page queries via the async ORM.
+        """
+
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [obj async for obj in queryset[self.offset:self.offset + self.limit]]
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Keyset (a.k.a cursor) pagination over a `(<timestamp>, id)` ordering.
+
+    Unlike the limit/offset pagination it does not run a count query and does not skip rows via OFFSET,
+    Each page is fetched by seeking the composite index from the position of the previous page. So the
+    cost of a page stays the same regardless of how deep the client has paginated.
+
+    The view can set `ordering` to a `(<timestamp field>, "id")` pair, Prefixed with "-" for a descending order.
+    """
+
+    ordering = ("-created_at", "-id")
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request):
+        try:
+            return pagination._positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, view) -> tuple[str, str]:
+        return getattr(view, "ordering", None) or self.ordering
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        position = [getattr(obj, self.field).isoformat(), str(obj.id), int(reverse)]
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def decode_cursor(self, request) -> tuple[datetime, str, bool] | None:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            value, pk, reverse = json.loads(urlsafe_b64decode(encoded.encode()))
+            return datetime.fromisoformat(value), pk, bool(reverse)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """
+        Return the queryset of the requested page, Which includes one extra row to detect further pages.
+
+        A list of querysets can be passed as well to paginate their union, e.g. the rows which are matched via
+        different indexes. Each queryset is then seeked & limited on its own before being combined, So that
+        every part can still use its index instead of the database sorting the whole union.
+        """
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        ordering = self.get_ordering(view)
+        self.field = ordering[0].lstrip("-")
+        self.descending = ordering[0].startswith("-")
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor[2])
+
+        if isinstance(queryset, (list, tuple)):
+            first, *others = [self.seek(part) for part in queryset]
+            if not others:
+                return first
+            return first.union(*others).order_by(*self.get_page_ordering())[:self.page_size + 1]
+
+        return self.seek(queryset)
+
+    def get_page_ordering(self) -> tuple[str, str]:
+        # Walk in the opposite direction of the ordering while paginating backwards
+        prefix = "-" if self.descending != self.reverse else ""
+        return f"{prefix}{self.field}", f"{prefix}id"
+
+    def seek(self, queryset):
+        """
+        Return the rows of the given queryset after the cursor position, In the page ordering.
+        """
+
+        descending = self.descending != self.reverse
+        lookup = "lt" if descending else "gt"
+
+        if self.cursor:
+            value, pk, _ = self.cursor
+
+            # The first condition narrows the index range scan, The second one excludes the rows of the
+            # previous page which share the same timestamp as the cursor position.
+            try:
+                queryset = queryset.filter(
+                    Q(**{f"{self.field}__{lookup}e": value}),
+                    Q(**{f"{self.field}__{lookup}": value}) | Q(**{f"id__{lookup}": pk}),
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset.order_by(*self.get_page_ordering())[:self.page_size + 1]
+
+    def get_page(self, results: list) -> list:
+        has_more = len(results) > self.page_size
+        page = results[:self.page_size]
+
+        if self.reverse:
+            page.reverse()
+            self.has_next, self.has_previous = bool(page), has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None and bool(page)
+
+        self.page = page
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(list(self.get_page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.get_page([obj async for obj in self.get_page_queryset(queryset, request, view)])
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[-1], False))
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(self.page[0], True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
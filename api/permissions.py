@@ -1,15 +1,85 @@
-from rest_framework.permissions import BasePermission
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 import strings
+from api.cache import NOTE_ACCESS_CACHE, get_note_access_key
+from api.models import NoteShare
 
 
 class CanReadOrUpdateNote(BasePermission):
     message = strings.NOTE_PERMISSION_ERROR
 
+    def is_allowed(self, request, obj, permission) -> bool:
+        """
+        Return True if the note share permission (False if the note is not shared) allows the request method,
+        Else return False. A read only note share allows the safe methods only.
+        """
+
+        if request.method in SAFE_METHODS:
+            return bool(permission)
+        return permission == NoteShare.Permission.WRITE
+
+    def get_annotated_permission(self, obj) -> str | bool:
+        """
+        Return the note share permission of the annotated access, Else False if the note is not shared.
+        """
+
+        if obj.can_update:
+            return NoteShare.Permission.WRITE
+        if obj.has_access:
+            return NoteShare.Permission.READ
+        return False
+
     def has_object_permission(self, request, _, obj):
         """
         Return True if current user is either the owner of the note or have access to the note via note share,
         Else return False.
+
+        If the note is fetched via `Note.objects.with_access` the annotated access is used, Otherwise the note
+        share permission is read from the DB. Either way the permission is cached per (note, user), So that the
+        cached responses of the note can be served to the user (see `NoteResponseCacheMixin`) and the next check
+        does not query the DB. See `api.cache.invalidate_note_access`.
         """
 
-        return obj.owner_id == request.user.id or obj.shared_with.filter(id=request.user.id).exists()
+        if obj.owner_id == request.user.id:
+            return True
+
+        cache = caches[NOTE_ACCESS_CACHE]
+        key = get_note_access_key(obj.id, request.user.id)
+
+        if hasattr(obj, "has_access"):
+            permission = self.get_annotated_permission(obj)
+            cache.set(key, permission)
+            return self.is_allowed(request, obj, permission)
+
+        permission = cache.get(key)
+        if permission is None:
+            permission = obj.shares.filter(user_id=request.user.id).values_list("permission", flat=True).first()
+            permission = permission or False
+            cache.set(key, permission)
+
+        return self.is_allowed(request, obj, permission)
+
+    async def ahas_object_permission(self, request, _, obj):
+        """
+        Async counterpart of `has_object_permission`, Used by the async views.
+        """
+
+        if obj.owner_id == request.user.id:
+            return True
+
+        cache = caches[NOTE_ACCESS_CACHE]
+        key = get_note_access_key(obj.id, request.user.id)
+
+        if hasattr(obj, "has_access"):
+            permission = self.get_annotated_permission(obj)
+            await cache.aset(key, permission)
+            return self.is_allowed(request, obj, permission)
+
+        permission = await cache.aget(key)
+        if permission is None:
+            permission = await obj.shares.filter(user_id=request.user.id).values_list("permission", flat=True).afirst()
+            permission = permission or False
+            await cache.aset(key, permission)
+
+        return self.is_allowed(request, obj, permission)
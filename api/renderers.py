@@ -0,0 +1,19 @@
+import time
+
+from rest_framework import renderers
+
+from api.instrumentation import get_request_metrics
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Record the serialization time of the sampled requests, See `api.middleware.RequestMetricsMiddleware`
+        metrics = get_request_metrics()
+        if metrics is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            metrics.serialization_time += time.perf_counter() - start
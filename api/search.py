@@ -0,0 +1,81 @@
+"""
+Full text search over the notes & their version history, Limited to the notes which are visible to the user.
+
+The notes are matched against their stored search vector (`api_note_search_idx`) and ranked via `ts_rank`. A query which
+does not match any whole word (e.g. a part of a word) falls back to a substring match of the description, Which is
+backed by the trigram index when the pg_trgm extension is available. The version history is matched against the
+words which were written by each version, See `api.history.build_version`.
+"""
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, Q
+
+from api.models import SEARCH_CONFIG, Note, VersionHistory
+
+
+def get_search_query(query: str) -> SearchQuery:
+    # The websearch syntax accepts any user input, e.g. quoted phrases, "or" & "-" for negation
+    return SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+
+
+def get_visible_notes(user_id, prefix: str = "") -> Q:
+    """
+    Return the filter of the notes which are either owned by or shared with the given user, The prefix is the
+    lookup path of the note, e.g. "note__" to filter the version history records.
+    """
+
+    shared_notes = Note.shared_with.through.objects.filter(user_id=user_id).values("note_id")
+    return Q(**{f"{prefix}owner_id": user_id}) | Q(**{f"{prefix}id__in": shared_notes})
+
+
+def search_notes(user_id, query: str):
+    """
+    Return the visible notes which match the given query, The most relevant ones first.
+    """
+
+    search_query = get_search_query(query)
+
+    queryset = (
+        Note.objects
+        .filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by()
+    )
+
+    # The owned & shared notes are matched by separate queries, So that the planner can choose between the
+    # search index & the notes of the user for each of them. An OR of both conditions can only be applied
+    # as a filter on the search index matches of all the users.
+    owned_notes = queryset.filter(owner_id=user_id)
+    shared_notes = queryset.filter(shared_with=user_id)
+
+    return owned_notes.union(shared_notes).order_by("-rank", "-modified_at", "-id")
+
+
+def search_notes_by_substring(user_id, query: str):
+    """
+    Return the visible notes whose description contains the given query, The latest modified ones first.
+    """
+
+    queryset = Note.objects.filter(description__icontains=query).order_by()
+
+    return (
+        queryset.filter(owner_id=user_id)
+        .union(queryset.filter(shared_with=user_id))
+        .order_by("-modified_at", "-id")
+    )
+
+
+def search_history(user_id, query: str):
+    """
+    Return the version history records of the visible notes which have written the text matching the given query,
+    The most relevant ones first.
+    """
+
+    search_query = get_search_query(query)
+
+    return (
+        VersionHistory.objects
+        .filter(get_visible_notes(user_id, prefix="note__"), search_vector=search_query)
+        .annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by("-rank", "-created_at", "-id")
+    )
@@ -1,6 +1,11 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
+from django.db import transaction
 from rest_framework import serializers
 
+import strings
+from api import delta, events, history
+from api.exceptions import PatchConflict, PreconditionFailed
 from api.models import Note, VersionHistory
 
 
@@ -10,33 +15,131 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ("username", "date_joined")
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class AsyncModelSerializer(serializers.ModelSerializer):
+    """
+    Model serializer which can also be saved from the async views via `asave`.
+
+    By default `acreate` & `aupdate` run the sync `create` & `update` in a single atomic block on the
+    thread sensitive executor, Subclasses can override them with native async ORM calls.
+    """
+
+    async def asave(self, **kwargs):
+        validated_data = {**self.validated_data, **kwargs}
+
+        if self.instance is not None:
+            self.instance = await self.aupdate(self.instance, validated_data)
+        else:
+            self.instance = await self.acreate(validated_data)
+
+        return self.instance
+
+    async def acreate(self, validated_data: dict):
+        return await sync_to_async(transaction.atomic(self.create))(validated_data)
+
+    async def aupdate(self, instance, validated_data: dict):
+        return await sync_to_async(transaction.atomic(self.update))(instance, validated_data)
+
+
+class NoteSerializer(AsyncModelSerializer):
     class Meta:
         model = Note
-        fields = ("id", "description", "created_at", "modified_at")
+        fields = ("id", "description", "version", "created_at", "modified_at")
+        read_only_fields = ("version",)
 
     def create(self, validated_data: dict):
         validated_data.update({"owner": self.context["request"].user})
         return super().create(validated_data)
 
+    async def acreate(self, validated_data: dict):
+        # Creating a note is a single insert, So it does not need the atomic block
+        validated_data.update({"owner": self.context["request"].user})
+        return await Note.objects.acreate(**validated_data)
+
     def update(self, instance, validated_data):
-        old_description = instance.description
-        new_description = validated_data["description"]
+        return self.update_description(instance, validated_data["description"], self.context.get("expected_version"))
 
-        instance = super().update(instance, validated_data)
+    def update_description(self, instance, new_description: str, expected_version: int | None, ops=None):
+        """
+        Update the description of the note & record its version, The edit script of the change is computed from the
+        descriptions unless it is given.
+        """
 
-        # Create the version history record, Whenever any update action is performed on the note
-        VersionHistory.objects.create(
-            user=self.context["request"].user,
+        # Update the note only if it is still at the version which is expected by the client (see `If-Match`),
+        # The row stays locked until the end of the transaction. So that the concurrent edits of the note
+        # are recorded in order in the version history.
+        updated = Note.objects.update_description(instance.pk, new_description, expected_version)
+        if updated is None:
+            raise PreconditionFailed()
+
+        old_description, instance.version, instance.modified_at = updated
+        instance.description = new_description
+
+        # The note is not written if its description is not changed, So no version is recorded either
+        if old_description == new_description:
+            return instance
+
+        # Record the version history, Whenever any update action is performed on the note
+        history.record_version(
             note=instance,
+            user=self.context["request"].user,
             old_description=old_description,
             new_description=new_description,
+            ops=ops,
         )
+        events.publish_note_updated(instance, self.context["request"].user)
 
         return instance
 
 
+class NotePatchSerializer(NoteSerializer):
+    """
+    Update the description of the note by an edit script (see `api.delta`) against the given base version of the
+    note, Instead of sending the whole description. e.g. `{"base_version": 3, "ops": [12, -5, "world", 40]}` keeps
+    the first 12 characters, Replaces the next 5 by "world" and keeps the last 40 characters.
+
+    The script is applied while the note is locked, The update is rejected if the note is not at the base version
+    anymore (412) or if the script does not cover its description exactly (409). The version history record of the
+    update is built from the script, So the descriptions are not diffed.
+    """
+
+    base_version = serializers.IntegerField(min_value=1, write_only=True)
+    ops = serializers.JSONField(write_only=True)
+
+    class Meta(NoteSerializer.Meta):
+        fields = NoteSerializer.Meta.fields + ("base_version", "ops")
+        read_only_fields = ("version", "description")
+
+    def validate_ops(self, value):
+        try:
+            return delta.normalize_script(value)
+        except ValueError:
+            raise serializers.ValidationError(strings.INVALID_NOTE_PATCH)
+
+    def update(self, instance, validated_data):
+        base_version = validated_data["base_version"]
+
+        old_description = Note.objects.lock_description(instance.pk, base_version)
+        if old_description is None:
+            raise PreconditionFailed()
+
+        try:
+            new_description = delta.apply_script(old_description, validated_data["ops"])
+        except ValueError:
+            raise PatchConflict()
+
+        # The patched description is validated the same way as a description which is sent as a whole
+        new_description = NoteSerializer().fields["description"].run_validation(new_description)
+
+        return self.update_description(instance, new_description, base_version, ops=validated_data["ops"])
+
+
 class VersionHistorySerializer(serializers.ModelSerializer):
+    """
+    The descriptions must be restored on the version history records via `api.history` before serializing them.
+    """
+
+    old_description = serializers.CharField(read_only=True)
+    new_description = serializers.CharField(read_only=True)
     user = UserSerializer(read_only=True)
     note = NoteSerializer(read_only=True)
 
@@ -50,3 +153,33 @@ class VersionHistorySerializer(serializers.ModelSerializer):
             "note",
             "created_at",
         )
+
+
+class CompactVersionHistorySerializer(serializers.ModelSerializer):
+    """
+    Compact shape of `VersionHistorySerializer`, Where the note is left out and the user is referenced by the
+    username. The note & the users are sent once along with the page instead, See `VersionHisotryList`.
+
+    The `old_description` is left out as well when `omit_old_description` is passed, Since it is the
+    `new_description` of the previous version.
+    """
+
+    old_description = serializers.CharField(read_only=True)
+    new_description = serializers.CharField(read_only=True)
+    user = serializers.CharField(source="user.username", read_only=True)
+
+    class Meta:
+        model = VersionHistory
+        fields = (
+            "id",
+            "old_description",
+            "new_description",
+            "user",
+            "created_at",
+        )
+
+    def __init__(self, *args, omit_old_description: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if omit_old_description:
+            self.fields.pop("old_description")
@@ -0,0 +1,96 @@
+"""
+Set based sharing & unsharing of a note with many users at once.
+
+Each operation is a single statement, Which checks that the note is owned by the user, Resolves the usernames and
+writes all the note share rows. The rows are only written if the note is owned and all the usernames exist, So an
+operation either applies to all the given users or to none of them.
+"""
+
+from dataclasses import dataclass
+
+from django.contrib.auth.models import User
+from django.db import connection
+
+from api.models import Note, NoteShare
+
+
+@dataclass
+class ShareResult:
+    # False if the note does not exist or is not owned by the user, Nothing is written then
+    is_owner: bool
+    # IDs of the users which are shared with (resp. unshared from) the note, Keyed by their username
+    user_ids: dict
+    # Usernames which do not belong to any user, Nothing is written if there are any
+    invalid_usernames: list
+
+    @property
+    def is_valid(self) -> bool:
+        return self.is_owner and not self.invalid_usernames
+
+
+# Resolves the requested usernames, The write is only applied if the note is owned & all the usernames exist
+RESOLVE_USERS = f"""
+    WITH requested AS (
+        SELECT DISTINCT unnest(%(usernames)s::varchar[]) AS username
+    ), users AS (
+        SELECT users.id, users.username FROM {User._meta.db_table} users JOIN requested USING (username)
+    ), is_owner AS (
+        SELECT EXISTS (
+            SELECT 1 FROM {Note._meta.db_table} WHERE id = %(note_id)s AND owner_id = %(owner_id)s
+        ) AS is_owner
+    ), is_valid AS (
+        SELECT
+            (SELECT is_owner FROM is_owner)
+            AND (SELECT count(*) FROM users) = (SELECT count(*) FROM requested) AS is_valid
+    )
+"""
+
+SELECT_RESULT = """
+    SELECT (SELECT is_owner FROM is_owner), requested.username, users.id
+    FROM requested LEFT JOIN users USING (username)
+"""
+
+SHARE = RESOLVE_USERS + f"""
+    , shared AS (
+        INSERT INTO {NoteShare._meta.db_table} AS shares (note_id, user_id, permission)
+        SELECT %(note_id)s, users.id, %(permission)s FROM users WHERE (SELECT is_valid FROM is_valid)
+        ON CONFLICT (note_id, user_id) DO UPDATE SET permission = EXCLUDED.permission
+        WHERE shares.permission <> EXCLUDED.permission
+    )
+""" + SELECT_RESULT
+
+UNSHARE = RESOLVE_USERS + f"""
+    , unshared AS (
+        DELETE FROM {NoteShare._meta.db_table} shares USING users
+        WHERE shares.note_id = %(note_id)s AND shares.user_id = users.id AND (SELECT is_valid FROM is_valid)
+    )
+""" + SELECT_RESULT
+
+
+def execute(sql: str, params: dict) -> ShareResult:
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    user_ids = {username: user_id for _, username, user_id in rows if user_id is not None}
+    invalid_usernames = sorted(username for _, username, user_id in rows if user_id is None)
+
+    return ShareResult(is_owner=rows[0][0], user_ids=user_ids, invalid_usernames=invalid_usernames)
+
+
+def share_note(owner_id, note_id, usernames: list[str], permission: str) -> ShareResult:
+    """
+    Share the note of the given owner with the users of the given usernames, Or update the permission of the users
+    which the note is already shared with.
+    """
+
+    params = {"owner_id": owner_id, "note_id": note_id, "usernames": usernames, "permission": permission}
+    return execute(SHARE, params)
+
+
+def unshare_note(owner_id, note_id, usernames: list[str]) -> ShareResult:
+    """
+    Remove the note shares of the users of the given usernames from the note of the given owner.
+    """
+
+    return execute(UNSHARE, {"owner_id": owner_id, "note_id": note_id, "usernames": usernames})
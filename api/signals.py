@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from api.cache import invalidate_note_access, invalidate_note_responses, invalidate_users
+from api.models import Note
+
+
+@receiver(pre_delete, sender=Note)
+def invalidate_deleted_note_access(sender, instance: Note, **kwargs):
+    # Collect the shared users before the note share records are deleted along with the note,
+    # The note ID is also copied since it is cleared on the instance once the note is deleted.
+    note_id = instance.id
+    user_ids = list(instance.shared_with.values_list("id", flat=True))
+
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_note_access(note_id, user_ids))
+
+    transaction.on_commit(lambda: invalidate_note_responses([note_id]))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_state(sender, instance: User, **kwargs):
+    # Drop the cached auth state, So that a deactivated user or a changed password is rejected by the next request
+    user_id = instance.id
+    transaction.on_commit(lambda: invalidate_users([user_id]))
@@ -0,0 +1,203 @@
+"""
+Incremental sync of the notes which are visible to a user, So that a client only fetches what has changed since
+its last sync instead of listing all the notes again.
+
+Each note (and note share) stores the ID of the transaction which has last written it (`change_id`), And each note
+which is unshared from or deleted for a user leaves a `NoteRemoval` record, Both are written by triggers. A sync
+returns the notes & removals whose change ID is at least the `since` of the cursor, Along with the next cursor.
+
+Transaction IDs are assigned when a transaction starts writing, Not when it commits. So a transaction with a lower
+ID can commit after the sync has read the notes, And a timestamp or a sequence as the cursor would skip its writes.
+Instead the next cursor is the oldest transaction which was still running when the sync started (the xmin of its
+snapshot), Every transaction below it had already committed or rolled back. A change may be returned twice, But
+never missed.
+
+The removals are only kept for `NOTE_SYNC_RETENTION_DAYS` (see `prune_removals`), So a cursor also stores when its
+`since` was taken and a cursor which is older than that is rejected. The client must then sync in full again.
+"""
+
+import json
+import time
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from api.exceptions import SyncCursorExpired
+from api.models import Note, NoteRemoval
+from api.search import get_visible_notes
+
+# The removals are kept for a day longer than the cursors, Since a removal is written before its transaction commits
+# and so may be older than the cursor which it is returned by
+REMOVAL_GRACE_PERIOD = timedelta(days=1)
+
+
+@dataclass
+class SyncCursor:
+    # Change ID from which the notes are synced, 0 for a full sync
+    since: int = 0
+    # Change ID up to which every change is visible, Fixed while a sync is paginated. None for a new sync
+    until: int | None = None
+    # (change ID, note ID) of the last note of the previous page, None for the first page
+    after: tuple[int, str] | None = None
+    # Unix timestamps of when `since` & `until` were taken, None for the cursors which were issued without them
+    since_at: int | None = None
+    until_at: int | None = None
+
+    def encode(self) -> str:
+        position = [self.since, self.until, list(self.after) if self.after else None, self.since_at, self.until_at]
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    @classmethod
+    def decode(cls, encoded: str | None) -> "SyncCursor":
+        """
+        Return the cursor which is encoded by `encode`, Else raise ValueError if it is malformed.
+        """
+
+        if not encoded:
+            return cls()
+
+        try:
+            # The cursors which were issued before the timestamps were added hold only the first three values
+            since, until, after, since_at, until_at = (json.loads(urlsafe_b64decode(encoded.encode())) + [None] * 2)[:5]
+            cursor = cls(
+                since=int(since),
+                until=None if until is None else int(until),
+                after=None if after is None else (int(after[0]), str(after[1])),
+                since_at=None if since_at is None else int(since_at),
+                until_at=None if until_at is None else int(until_at),
+            )
+        except (TypeError, ValueError, IndexError) as e:
+            raise ValueError("Invalid sync cursor") from e
+
+        if cursor.after and cursor.until is None:
+            raise ValueError("Invalid sync cursor")
+        return cursor
+
+
+@dataclass
+class SyncResult:
+    notes: list[Note]
+    # IDs of the notes which the client should drop, Only sent along with the last page
+    removed: list
+    cursor: SyncCursor
+    has_more: bool
+
+
+def get_watermark() -> int:
+    """
+    Return the ID of the oldest transaction which is still running, Every change below it is visible from now on.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+        return cursor.fetchone()[0]
+
+
+def get_changed_notes(user_id, since: int):
+    """
+    Return the visible notes which are changed since the given change ID, Annotated with their `sync_id`.
+
+    A shared note is changed when either the note or the note share of the user is written, So that a note which
+    is shared with the user afterwards is synced as well. Each of them is a separate queryset which filters on the
+    change ID of a single table, So that the range is served by its index (the greatest of both is only selected).
+    The querysets are meant to be combined via UNION, Which drops the notes that are returned by both.
+    """
+
+    owned_notes = Note.objects.filter(owner_id=user_id, change_id__gte=since).annotate(sync_id=F("change_id"))
+    shared_notes = [
+        # The share filters are passed in a single call, So that they apply to the same note share
+        Note.objects.filter(shares__user_id=user_id, **{lookup: since}).annotate(
+            sync_id=Greatest("change_id", "shares__change_id")
+        )
+        for lookup in ("shares__change_id__gte", "change_id__gte")
+    ]
+
+    return [queryset.order_by() for queryset in (owned_notes, *shared_notes)]
+
+
+def get_removed_notes(user_id, since: int) -> list:
+    """
+    Return the IDs of the notes which are unshared from or deleted for the user since the given change ID, Except
+    the ones which are visible again (e.g. shared again).
+    """
+
+    removed = set(
+        NoteRemoval.objects.filter(user_id=user_id, change_id__gte=since).values_list("note_id", flat=True)
+    )
+    if not removed:
+        return []
+
+    visible = Note.objects.filter(get_visible_notes(user_id), id__in=removed).values_list("id", flat=True)
+    return sorted(map(str, removed - set(visible)))
+
+
+def is_expired(cursor: SyncCursor) -> bool:
+    """
+    Return True if the removals since the cursor may have been pruned already, Else False. A full sync never expires.
+    """
+
+    if not cursor.since:
+        return False
+    if cursor.since_at is None:
+        return True
+
+    return cursor.since_at < time.time() - timedelta(days=settings.NOTE_SYNC_RETENTION_DAYS).total_seconds()
+
+
+def prune_removals() -> int:
+    """
+    Delete the removals which are older than the retention (see `NOTE_SYNC_RETENTION_DAYS`), Return their number.
+    """
+
+    horizon = timezone.now() - timedelta(days=settings.NOTE_SYNC_RETENTION_DAYS) - REMOVAL_GRACE_PERIOD
+    count, _ = NoteRemoval.objects.filter(created_at__lt=horizon).delete()
+
+    return count
+
+
+def get_changes(user_id, cursor: SyncCursor, limit: int) -> SyncResult:
+    """
+    Return the page of the notes which are changed since the given cursor, The notes are ordered by their change ID.
+    Else raise `SyncCursorExpired` if the cursor is older than the retention of the removals.
+    """
+
+    if is_expired(cursor):
+        raise SyncCursorExpired()
+
+    # The watermark must be read before the notes, So that every change below it is visible to the queries
+    if cursor.until is None:
+        until, until_at = get_watermark(), int(time.time())
+    else:
+        until, until_at = cursor.until, cursor.until_at
+
+    querysets = get_changed_notes(user_id, cursor.since)
+    if cursor.after:
+        change_id, note_id = cursor.after
+        after = Q(sync_id__gt=change_id) | Q(sync_id=change_id, id__gt=note_id)
+        querysets = [queryset.filter(after) for queryset in querysets]
+
+    notes = list(querysets[0].union(*querysets[1:]).order_by("sync_id", "id")[:limit + 1])
+    has_more = len(notes) > limit
+    notes = notes[:limit]
+
+    if has_more:
+        last = notes[-1]
+        next_cursor = SyncCursor(
+            since=cursor.since,
+            until=until,
+            after=(last.sync_id, str(last.id)),
+            since_at=cursor.since_at,
+            until_at=until_at,
+        )
+        return SyncResult(notes=notes, removed=[], cursor=next_cursor, has_more=True)
+
+    # A client without a previous sync has nothing to drop
+    removed = get_removed_notes(user_id, cursor.since) if cursor.since else []
+    next_cursor = SyncCursor(since=until, since_at=until_at)
+    return SyncResult(notes=notes, removed=removed, cursor=next_cursor, has_more=False)
@@ -1,8 +1,14 @@
+from unittest import mock
+
 from django.urls import reverse
+from django.contrib.auth import user_logged_in, user_login_failed
 from django.contrib.auth.models import User
 
+from prometheus_client import REGISTRY
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from api.hashing import password_hasher
 
 
 class SingupTests(APITestCase):
@@ -49,8 +55,29 @@ class SingupTests(APITestCase):
             msg="Check number of users exists in the DB with the defined username"
         )
 
+    def test_normalized_username(self):
+        # The fullwidth letters are normalized to the ASCII ones (NFKC)
+        data = {"username": "\uff54\uff45\uff53\uff54_user", "password": "1234"}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED,
+            msg="Check response status code. Should be equal to 201"
+        )
+        self.assertTrue(User.objects.filter(username="test_user").exists(), msg="Check if the username is normalized")
+
+        response = self.client.post(self.url, {"username": "test_user", "password": "1234"}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+            msg="Check response status code. Should be equal to 400, Since the normalized username already exists"
+        )
+
 
-class LoginTests(APITestCase):
+# The users are authenticated on the threads of the password hasher pool, So they must be committed
+class LoginTests(APITransactionTestCase):
     url = reverse("login")
 
     def setUp(self) -> None:
@@ -69,6 +96,23 @@ class LoginTests(APITestCase):
             msg="Check response status code. Should be equal to 200, Since we are testing with valid credentials"
         )
 
+    def test_login_signals(self):
+        logged_in, login_failed = mock.Mock(), mock.Mock()
+        user_logged_in.connect(logged_in)
+        user_login_failed.connect(login_failed)
+        self.addCleanup(user_logged_in.disconnect, logged_in)
+        self.addCleanup(user_login_failed.disconnect, login_failed)
+
+        self.client.post(self.url, {"username": "test_user", "password": "12345"}, format="json")
+        self.assertEqual(login_failed.call_count, 1, msg="Check if the failed login is signaled")
+
+        self.client.post(self.url, {"username": "test_user", "password": "1234"}, format="json")
+        self.assertEqual(logged_in.call_count, 1, msg="Check if the login is signaled")
+        self.assertIsNotNone(
+            User.objects.get(username="test_user").last_login,
+            msg="Check if the last login timestamp of the user is updated"
+        )
+
     def test_invalid_username(self):
         data = {"username": "test_user1", "password": "1234"}
         response = self.client.post(self.url, data, format="json")
@@ -88,3 +132,61 @@ class LoginTests(APITestCase):
             status.HTTP_401_UNAUTHORIZED,
             msg="Check response status code. Should be equal to 402, Since we are testing with invalid password"
         )
+
+
+    def test_login_hasher_saturated(self):
+        data = {"username": "test_user", "password": "1234"}
+        rejected = REGISTRY.get_sample_value("password_hasher_rejected_total")
+
+        with mock.patch.object(password_hasher, "max_pending", 0):
+            response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+            msg="Check response status code. Should be equal to 429, Since the password hasher is saturated"
+        )
+
+        self.assertIn("Retry-After", response, msg="Check if the client is told when to retry")
+        self.assertIsNone(response.data["errors"], msg="Check if the stats of the password hasher are not sent")
+        self.assertEqual(
+            REGISTRY.get_sample_value("password_hasher_rejected_total"),
+            rejected + 1,
+            msg="Check if the rejected job is exported as a metric"
+        )
+        self.assertEqual(
+            REGISTRY.get_sample_value("password_hasher_queued") + REGISTRY.get_sample_value("password_hasher_in_flight"),
+            0,
+            msg="Check if no job is left queued or running"
+        )
+
+
+class UserListTests(APITestCase):
+    url = reverse("user-list")
+
+    def setUp(self) -> None:
+        for i in range(3):
+            User.objects.create_user(username=f"other_user_{i}", password="1234")
+
+        User.objects.create_user(username="test_user", password="1234")
+        self.client.login(username="test_user", password="1234")
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+
+    def test_user_list(self):
+        response = self.client.get(self.url, {"limit": 2}, format="json")
+        usernames = [result["username"] for result in response.data["results"]]
+
+        response = self.client.get(response.data["next"], format="json")
+        usernames.extend(result["username"] for result in response.data["results"])
+
+        self.assertEqual(
+            usernames,
+            ["other_user_2", "other_user_1", "other_user_0"],
+            msg="Check if other users are listed with the latest joined one first, Excluding the current user"
+        )
+
+        self.assertIsNone(response.data["next"], msg="Check if the last page has no next cursor")
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from api.checks import check_response_cache
+
+LOCAL_RESPONSE_CACHE = {
+    **settings.CACHES,
+    "responses": {**settings.CACHES["responses"], "BACKEND": "api.cache.LocMemCache"},
+}
+
+SHARED_RESPONSE_CACHE = {
+    **settings.CACHES,
+    "responses": {**settings.CACHES["responses"], "BACKEND": "django.core.cache.backends.db.DatabaseCache"},
+}
+
+
+class ResponseCacheCheckTests(SimpleTestCase):
+    def test_default_response_cache(self):
+        self.assertEqual(check_response_cache(None), [], msg="Check if the default response cache is accepted")
+
+    @override_settings(CACHES=LOCAL_RESPONSE_CACHE, WORKERS=4)
+    def test_local_response_cache_with_workers(self):
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)],
+            ["api.E001"],
+            msg="Check if the process memory is rejected as the response cache of many workers"
+        )
+
+    @override_settings(CACHES=LOCAL_RESPONSE_CACHE, WORKERS=1)
+    def test_local_response_cache_with_single_worker(self):
+        self.assertEqual(
+            check_response_cache(None), [], msg="Check if the process memory is accepted for a single worker"
+        )
+
+    @override_settings(CACHES=LOCAL_RESPONSE_CACHE, WORKERS=1, VERSION_HISTORY_WRITE_BEHIND=True)
+    def test_local_response_cache_with_write_behind(self):
+        self.assertEqual(
+            [warning.id for warning in check_response_cache(None)],
+            ["api.W001"],
+            msg="Check if the uncached version history is reported, Once it is written behind"
+        )
+
+    @override_settings(CACHES=SHARED_RESPONSE_CACHE)
+    def test_shared_response_cache_with_local_access_cache(self):
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)],
+            ["api.E002"],
+            msg="Check if a shared response cache is rejected along with the note access cache in the process memory"
+        )
+
+    @override_settings(
+        CACHES={
+            **SHARED_RESPONSE_CACHE,
+            "note-access": {**settings.CACHES["note-access"], "BACKEND": "django.core.cache.backends.db.DatabaseCache"},
+        }
+    )
+    def test_shared_response_cache_with_shared_access_cache(self):
+        self.assertEqual(check_response_cache(None), [], msg="Check if the shared caches are accepted")
@@ -0,0 +1,84 @@
+import threading
+
+from django.test import SimpleTestCase
+from psycopg2 import extensions
+
+from generic_notes.db.postgresql.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnectionInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self, healthy: bool = True):
+        self.healthy = healthy
+        self.closed = False
+        self.info = FakeConnectionInfo()
+
+    def cursor(self):
+        if not self.healthy:
+            raise ConnectionError("server closed the connection unexpectedly")
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_connection_reuse(self):
+        pool = ConnectionPool(max_size=2)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+
+        self.assertIs(
+            pool.getconn(FakeConnection),
+            connection,
+            msg="Check if the returned connection is reused"
+        )
+
+    def test_pool_size_limit(self):
+        pool = ConnectionPool(max_size=1, timeout=0.1)
+        connection = pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout, msg="Check if the checkout fails once the pool is exhausted"):
+            pool.getconn(FakeConnection)
+
+        # A connection which is returned by another thread is handed out to the waiting checkout
+        threading.Timer(0.05, pool.putconn, args=(connection,)).start()
+        pool.timeout = 5
+
+        self.assertIs(
+            pool.getconn(FakeConnection),
+            connection,
+            msg="Check if the waiting checkout gets the returned connection"
+        )
+
+    def test_health_check(self):
+        pool = ConnectionPool(max_size=1, check_after=0)
+        connection = pool.getconn(FakeConnection)
+        pool.putconn(connection)
+
+        # The server has closed the idle connection in the meantime
+        connection.healthy = False
+
+        self.assertIsNot(
+            pool.getconn(FakeConnection),
+            connection,
+            msg="Check if the broken connection is replaced with a new one"
+        )
+
+        self.assertTrue(connection.closed, msg="Check if the broken connection is closed")
+
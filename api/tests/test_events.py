@@ -0,0 +1,147 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APITransactionTestCase
+
+from api import events
+from api.models import Note
+from api.utils import get_auth_token
+
+
+# The events are delivered once the transaction commits, So each write of these tests is committed on its own
+@override_settings(NOTE_EVENTS_BROKER="api.events.InMemoryBroker")
+class NoteEventsTests(APITransactionTestCase):
+    user = None
+    other_user = None
+    note = None
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="test_user", password="1234")
+        self.other_user = User.objects.create_user(username="test_user_2", password="1234")
+        self.note = Note.objects.create(owner=self.user, description="Lorem Ipsum")
+
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    async def subscribe(self, user: User, note_ids: list[str]):
+        response = await AsyncClient().get(
+            reverse("note-events"),
+            {"note_ids": ",".join(note_ids)},
+            AUTHORIZATION=f"Bearer {get_auth_token(user)['access']}",
+        )
+
+        self.assertEqual(response.status_code, 200, msg="Check if the subscription is successful")
+        self.assertEqual(response["Content-Type"], "text/event-stream", msg="Check if the events are streamed")
+
+        stream = aiter(response.streaming_content)
+        self.assertIn(b"subscribed", await anext(stream), msg="Check if the client is told that it has subscribed")
+
+        return stream
+
+    async def read_event(self, stream) -> str:
+        return (await asyncio.wait_for(anext(stream), timeout=5)).decode()
+
+    async def test_note_update_event(self):
+        stream = await self.subscribe(self.user, [str(self.note.id)])
+
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        await sync_to_async(self.client.put)(note_detail_url, {"description": "Updated"}, format="json")
+
+        event = await self.read_event(stream)
+
+        self.assertIn("event: note.updated", event, msg="Check if the update of the note is pushed")
+        self.assertIn('"version":2', event, msg="Check if the new version of the note is sent")
+
+        await stream.aclose()
+
+    async def test_note_share_events(self):
+        stream = await self.subscribe(self.other_user, [])
+        share_url = reverse("share-note")
+        data = {"note_id": str(self.note.id), "usernames": [self.other_user.username], "permission": "read"}
+
+        await sync_to_async(self.client.post)(share_url, data, format="json")
+        event = await self.read_event(stream)
+
+        self.assertIn("event: note.shared", event, msg="Check if the user is told that the note is shared with it")
+        self.assertIn('"permission":"read"', event, msg="Check if the permission of the share is sent")
+
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        await sync_to_async(self.client.put)(note_detail_url, {"description": "Updated"}, format="json")
+
+        self.assertIn(
+            "event: note.updated",
+            await self.read_event(stream),
+            msg="Check if the updates of the shared note are pushed to the user"
+        )
+
+        await sync_to_async(self.client.delete)(share_url, data, format="json")
+
+        self.assertIn(
+            "event: note.unshared",
+            await self.read_event(stream),
+            msg="Check if the user is told that the note is unshared from it"
+        )
+
+        await stream.aclose()
+
+    async def test_slow_client_resync(self):
+        stream = await self.subscribe(self.user, [str(self.note.id)])
+
+        # More events than the client can fall behind by, Before the client reads any of them
+        broker = events.get_broker()
+        subscription = next(iter(broker.user_subscriptions[self.user.id]))
+        for version in range(subscription.max_pending + 1):
+            broker.dispatch(events.Event(type=events.NOTE_UPDATED, note_id=str(self.note.id), data={"version": version}))
+
+        self.assertIn("event: resync", await self.read_event(stream), msg="Check if the slow client is told to resync")
+
+        with self.assertRaises(StopAsyncIteration, msg="Check if the stream is closed after the resync"):
+            await self.read_event(stream)
+
+        self.assertNotIn(self.user.id, broker.user_subscriptions, msg="Check if the subscription is removed")
+
+    def test_subscribe_forbidden_note(self):
+        note = Note.objects.create(owner=self.other_user, description="Lorem Ipsum")
+        response = self.client.get(reverse("note-events"), {"note_ids": f"{self.note.id},{note.id}"})
+
+        self.assertEqual(response.status_code, 403, msg="Check if the notes without access cannot be subscribed")
+        self.assertEqual(response.data["errors"]["note_ids"], [str(note.id)], msg="Check if the notes are listed")
+
+
+class PostgresBrokerTests(APITransactionTestCase):
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+
+    async def test_publish_on_commit(self):
+        broker = events.PostgresBroker()
+        subscription = broker.subscribe(1, {"note"}, max_pending=10)
+
+        # The notifications are only received once the listener is connected
+        self.assertTrue(await sync_to_async(broker.listening.wait)(5), msg="Check if the listener is connected")
+
+        @transaction.atomic
+        def publish(rollback: bool):
+            broker.publish(events.Event(type=events.NOTE_UPDATED, note_id="note", data={"rollback": rollback}))
+            if rollback:
+                transaction.set_rollback(True)
+
+        await sync_to_async(publish)(rollback=True)
+        await sync_to_async(publish)(rollback=False)
+
+        received = await subscription.get(timeout=5)
+        subscription.close()
+        await sync_to_async(broker.stop)()
+
+        self.assertEqual(
+            [event.data for event in received],
+            [{"rollback": False}],
+            msg="Check if only the events of the committed transactions are received"
+        )
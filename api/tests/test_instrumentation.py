@@ -0,0 +1,60 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Note
+
+
+class RequestMetricsTests(APITestCase):
+    url = None
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+        note = Note.objects.create(owner=user, description="Lorem Ipsum")
+
+        self.client.force_authenticate(user=user)
+        self.url = reverse("note-version-history", kwargs={"note_id": str(note.id)})
+
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1)
+    def test_request_metrics(self):
+        with self.assertLogs("api.middleware", level="INFO") as logs:
+            response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        record = logs.records[0]
+
+        self.assertEqual(record.view, "note-version-history", msg="Check if the request is labelled by the view")
+        self.assertGreater(record.query_count, 0, msg="Check if the queries of the request are counted")
+        self.assertEqual(
+            record.response_size,
+            len(response.content),
+            msg="Check if the response size is recorded"
+        )
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=1, SLOW_REQUEST_THRESHOLD_MS=0, SLOW_REQUEST_QUERIES=1)
+    def test_slow_request(self):
+        with self.assertLogs("api.middleware", level="WARNING") as logs:
+            self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            len(logs.records[0].slow_queries),
+            1,
+            msg="Check if only the given number of the slowest queries are logged"
+        )
+
+    @override_settings(REQUEST_METRICS_SAMPLE_RATE=0)
+    def test_request_not_sampled(self):
+        with self.assertNoLogs("api.middleware", level="INFO"):
+            self.client.get(self.url, format="json")
@@ -0,0 +1,61 @@
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.test import override_settings
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models import Note
+
+
+class MetricsTests(APITestCase):
+    url = reverse("metrics")
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+        self.note = Note.objects.create(owner=user, description="Lorem Ipsum")
+
+        self.client.force_authenticate(user=user)
+
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_metrics(self):
+        self.client.get(reverse("note-detail", kwargs={"pk": str(self.note.id)}), format="json")
+
+        response = self.client.get(self.url)
+        content = response.content.decode()
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        for line in (
+            'http_request_duration_seconds_count{method="GET",view="note-detail"}',
+            'http_requests_total{method="GET",status="200",view="note-detail"}',
+            'db_queries_total{method="GET",view="note-detail"}',
+        ):
+            self.assertIn(line, content, msg="Check if the metrics of the request are labelled by the view")
+
+        self.assertNotIn('view="metrics"', content, msg="Check if the metrics requests are not recorded")
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED,
+            msg="Check response status code. Should be equal to 401, Since the token is not sent"
+        )
+
+        response = self.client.get(self.url, HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
@@ -1,12 +1,27 @@
+import json
 import uuid
+from unittest import mock
 
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.urls import reverse
 from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import override_settings
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api import history
+from api.cache import NOTE_ACCESS_CACHE, get_note_access_key, set_note_states
 from api.models import Note, VersionHistory
+from api.utils import get_auth_token
+
+# The tests run in a single process, So the responses can be cached in its memory
+LOCAL_RESPONSE_CACHE = {
+    **settings.CACHES,
+    "responses": {**settings.CACHES["responses"], "BACKEND": "api.cache.LocMemCache"},
+}
 
 
 class NoteCreateTests(APITestCase):
@@ -43,6 +58,7 @@ class NoteCreateTests(APITestCase):
         )
 
 
+@override_settings(CACHES=LOCAL_RESPONSE_CACHE)
 class NoteDetailTests(APITestCase):
     url = None
     note = None
@@ -69,6 +85,151 @@ class NoteDetailTests(APITestCase):
             msg="Check response status code. Should be equal to 200"
         )
 
+    def test_note_retrive_with_access_token(self):
+        # Logout the session user, So that the request is authenticated only via the JWT access token
+        self.client.logout()
+
+        token = get_auth_token(user=self.note.owner)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token['access']}")
+
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        self.assertEqual(
+            response.data["data"]["id"],
+            str(self.note.id),
+            msg="Check if the requested note is returned"
+        )
+
+    def test_note_retrive_with_cached_user(self):
+        self.client.logout()
+
+        token = get_auth_token(user=self.note.owner)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token['access']}")
+
+        self.client.get(self.url, format="json")
+
+        with self.assertNumQueries(0, msg="Check if the user is authenticated without any query, Once it is cached"):
+            response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        # Deactivating the user drops its cached state, So the token is not accepted anymore
+        with self.captureOnCommitCallbacks(execute=True):
+            self.note.owner.is_active = False
+            self.note.owner.save()
+
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_401_UNAUTHORIZED,
+            msg="Check response status code. Should be equal to 401, Since the user is deactivated"
+        )
+
+    def test_note_retrive_query_count(self):
+        user = User.objects.create_user(username="shared_user", password="1234")
+        self.note.shared_with.add(user)
+
+        for request_user in (self.note.owner, user):
+            self.client.force_authenticate(user=request_user)
+
+            with self.assertNumQueries(1, msg="Check if the note and its access are fetched in a single query"):
+                response = self.client.get(self.url, format="json")
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_200_OK,
+                msg="Check response status code. Should be equal to 200"
+            )
+
+    def test_note_retrive_not_modified(self):
+        self.client.force_authenticate(user=self.note.owner)
+        etag = self.client.get(self.url, format="json")["ETag"]
+
+        with self.assertNumQueries(0, msg="Check if the cached response is served without any query"):
+            response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+            msg="Check response status code. Should be equal to 304, Since the note is not modified"
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(self.url, {"description": "Lorem Ipsum 1"}, format="json")
+
+        response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.data["data"]["description"],
+            "Lorem Ipsum 1",
+            msg="Check if the cached response is replaced once the note is updated"
+        )
+
+    # The default settings, i.e. The responses are not cached
+    @override_settings(CACHES=settings.CACHES)
+    def test_note_retrive_not_modified_without_cache(self):
+        self.client.force_authenticate(user=self.note.owner)
+        etag = self.client.get(self.url, format="json")["ETag"]
+
+        with self.assertNumQueries(1, msg="Check if the note is only fetched, Along with the access of the user"):
+            response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+            msg="Check response status code. Should be equal to 304, Since the note is not modified"
+        )
+        self.assertEqual(response["ETag"], etag, msg="Check if the ETag is sent along with the 304")
+
+        self.client.put(self.url, {"description": "Lorem Ipsum 1"}, format="json")
+        response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is modified"
+        )
+
+    def test_note_retrive_shared_not_modified(self):
+        user = User.objects.create_user(username="shared_user", password="1234")
+        self.note.shared_with.add(user, through_defaults={"permission": "read"})
+
+        self.client.force_authenticate(user=user)
+        etag = self.client.get(self.url, format="json")["ETag"]
+
+        with self.assertNumQueries(0, msg="Check if the cached response is served to the shared user without a query"):
+            response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_304_NOT_MODIFIED,
+            msg="Check response status code. Should be equal to 304, Since the note is not modified"
+        )
+
+        self.client.force_authenticate(user=self.note.owner)
+        data = {"note_id": str(self.note.id), "usernames": [user.username]}
+        self.client.delete(reverse("share-note"), data, format="json")
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(self.url, format="json", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN,
+            msg="Check response status code. Should be equal to 403, Since the note is unshared from the user"
+        )
+
     def test_note_retrive_invalid_id(self):
         response = self.client.get(
             reverse("note-detail", kwargs={"pk": str(uuid.uuid4())}),
@@ -100,6 +261,42 @@ class NoteDetailTests(APITestCase):
             msg="Check if description is updated in DB"
         )
 
+    def test_note_update_if_match(self):
+        etag = self.client.get(self.url, format="json")["ETag"]
+
+        response = self.client.put(self.url, {"description": "Lorem Ipsum 1"}, format="json", HTTP_IF_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is at the given version"
+        )
+
+        self.assertNotEqual(response["ETag"], etag, msg="Check if the version of the note is incremented")
+
+        # The note has moved on since the first read, So the stale ETag must not overwrite it
+        response = self.client.put(self.url, {"description": "Lorem Ipsum 2"}, format="json", HTTP_IF_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_412_PRECONDITION_FAILED,
+            msg="Check response status code. Should be equal to 412, Since the note is modified in the meantime"
+        )
+
+        self.note.refresh_from_db()
+
+        self.assertEqual(
+            (self.note.description, self.note.version),
+            ("Lorem Ipsum 1", 2),
+            msg="Check if the note is not updated by the stale request"
+        )
+
+        self.assertEqual(
+            VersionHistory.objects.filter(note=self.note).count(),
+            1,
+            msg="Check if the version history record is not created for the rejected update"
+        )
+
     def test_note_version_history_creation(self):
         data = {"description": "Lorem Ipsum 2"}
         response = self.client.put(self.url, data, format="json")
@@ -115,6 +312,537 @@ class NoteDetailTests(APITestCase):
             msg="Check is version hisotry record is created related to the given note object"
         )
 
+    def test_note_update_without_change(self):
+        response = self.client.put(self.url, {"description": self.note.description}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        self.assertEqual(response.data["data"]["version"], 1, msg="Check if the version of the note is not changed")
+
+        self.assertFalse(
+            VersionHistory.objects.filter(note=self.note).exists(),
+            msg="Check if the version history record is not created for an unchanged description"
+        )
+
+    def test_note_patch(self):
+        # "Lorem Ipsum" -> "Lorem dolor Ipsum sit"
+        data = {"base_version": 1, "ops": [6, "dolor ", 5, " sit"]}
+        response = self.client.patch(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        self.assertEqual(
+            response.data["data"]["description"],
+            "Lorem dolor Ipsum sit",
+            msg="Check if the patch is applied on the description"
+        )
+        self.assertEqual(response["ETag"], '"2"', msg="Check if the ETag is the new version of the note")
+
+        version = VersionHistory.objects.get(note=self.note)
+        async_to_sync(history.arestore_descriptions)([version])
+
+        self.assertEqual(
+            (version.old_description, version.new_description),
+            ("Lorem Ipsum", "Lorem dolor Ipsum sit"),
+            msg="Check if the version history record is created from the patch"
+        )
+
+        response = self.client.patch(self.url, {"base_version": 1, "ops": [21]}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_412_PRECONDITION_FAILED,
+            msg="Check if a patch against an outdated version is rejected"
+        )
+
+        response = self.client.patch(self.url, {"base_version": 2, "ops": [6, -5, "Ipsum"]}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_409_CONFLICT,
+            msg="Check if a patch which does not cover the description is rejected"
+        )
+
+        response = self.client.patch(self.url, {"base_version": 2, "ops": [6, {"insert": "dolor"}]}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+            msg="Check if a malformed patch is rejected"
+        )
+
+        self.assertEqual(
+            Note.objects.get(id=self.note.id).description,
+            "Lorem dolor Ipsum sit",
+            msg="Check if the rejected patches are not applied"
+        )
+
+
+class NoteListTests(APITestCase):
+    url = reverse("note-list")
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+        other_user = User.objects.create_user(username="test_user_2", password="1234")
+
+        for i in range(3):
+            Note.objects.create(owner=user, description=f"Owned {i}")
+
+        for i in range(2):
+            note = Note.objects.create(owner=other_user, description=f"Shared {i}")
+            note.shared_with.add(user)
+
+        Note.objects.create(owner=other_user, description="Not shared")
+
+        # Update the first owned note, So that it is the latest modified one
+        note = Note.objects.get(description="Owned 0")
+        note.save()
+
+        self.client.login(username="test_user", password="1234")
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_note_list(self):
+        response = self.client.get(self.url, {"limit": 3}, format="json")
+        descriptions = [result["description"] for result in response.data["results"]]
+
+        response = self.client.get(response.data["next"], format="json")
+        descriptions.extend(result["description"] for result in response.data["results"])
+
+        self.assertEqual(
+            descriptions,
+            ["Owned 0", "Shared 1", "Shared 0", "Owned 2", "Owned 1"],
+            msg="Check if the owned & shared notes are listed with the latest modified one first"
+        )
+
+        self.assertIsNone(response.data["next"], msg="Check if the last page has no next cursor")
+
+    def test_note_list_scope(self):
+        response = self.client.get(self.url, {"scope": "shared", "ordering": "created_at"}, format="json")
+
+        self.assertEqual(
+            [result["description"] for result in response.data["results"]],
+            ["Shared 0", "Shared 1"],
+            msg="Check if only the shared notes are listed with the oldest one first"
+        )
+
+
+class NoteSearchTests(APITestCase):
+    url = reverse("search-notes")
+    note = None
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+        other_user = User.objects.create_user(username="test_user_2", password="1234")
+
+        self.note = Note.objects.create(owner=user, description="Buy apples and oranges")
+        Note.objects.create(owner=user, description="Call the plumber")
+        Note.objects.create(owner=other_user, description="Apples are not shared")
+
+        self.client.login(username="test_user", password="1234")
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_note_search(self):
+        response = self.client.get(self.url, {"q": "apple"}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        self.assertEqual(
+            [result["description"] for result in response.data["results"]],
+            ["Buy apples and oranges"],
+            msg="Check if only the visible notes are matched by the stemmed word"
+        )
+
+    def test_note_search_substring(self):
+        response = self.client.get(self.url, {"q": "plumb"}, format="json")
+
+        self.assertEqual(
+            [result["description"] for result in response.data["results"]],
+            ["Call the plumber"],
+            msg="Check if a part of a word is matched via the substring fallback"
+        )
+
+    def test_version_history_search(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+
+        for description in ("Buy bananas and oranges", "Buy bananas"):
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        response = self.client.get(self.url, {"q": "apples", "in": "history"}, format="json")
+
+        self.assertEqual(
+            [result["old_description"] for result in response.data["results"]],
+            ["Buy apples and oranges"],
+            msg="Check if the removed text is found in the version history"
+        )
+
+        response = self.client.get(self.url, {"q": "bananas", "in": "history"}, format="json")
+
+        self.assertEqual(
+            [result["new_description"] for result in response.data["results"]],
+            ["Buy bananas and oranges"],
+            msg="Check if only the version which has written the text is matched"
+        )
+
+
+class BulkNotesTests(APITestCase):
+    url = reverse("bulk-notes")
+    note = None
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+        other_user = User.objects.create_user(username="test_user_2", password="1234")
+
+        self.note = Note.objects.create(owner=user, description="Lorem Ipsum")
+        self.other_note = Note.objects.create(owner=other_user, description="Lorem Ipsum")
+        self.client.login(username="test_user", password="1234")
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_bulk_notes(self):
+        data = {
+            "notes": [
+                {"description": "Lorem Ipsum 1"},
+                {"id": str(self.note.id), "description": "Lorem Ipsum 2"},
+                {"description": "Lorem Ipsum" * 2000},
+                {"id": str(self.other_note.id), "description": "Lorem Ipsum 3"},
+                {"id": str(self.note.id), "description": "Lorem Ipsum 4"},
+            ]
+        }
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        results = response.data["data"]
+
+        self.assertEqual(
+            [index for index, result in enumerate(results) if "errors" in result],
+            [2, 3],
+            msg="Check if only the invalid description & the note of the other user are reported as errors"
+        )
+
+        self.assertTrue(Note.objects.filter(id=results[0]["id"]).exists(), msg="Check if the new note is created")
+
+        self.note.refresh_from_db()
+        self.other_note.refresh_from_db()
+
+        self.assertEqual(self.note.description, "Lorem Ipsum 4", msg="Check if the last update of the note is saved")
+        self.assertEqual(self.other_note.description, "Lorem Ipsum", msg="Check if the other user's note is unchanged")
+
+        self.assertEqual(
+            list(VersionHistory.objects.filter(note=self.note).order_by("sequence").values_list("sequence", flat=True)),
+            [1, 2],
+            msg="Check if a version history record is created for each update of the note"
+        )
+
+    @override_settings(NOTE_BULK_CHUNK_SIZE=2)
+    def test_bulk_notes_chunks(self):
+        data = {"notes": [{"description": f"Lorem Ipsum {i}"} for i in range(5)]}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            [result["index"] for result in response.data["data"]],
+            list(range(5)),
+            msg="Check if the results of all the chunks are returned in the given order"
+        )
+
+        self.assertEqual(Note.objects.filter(owner=self.note.owner).count(), 6, msg="Check if all the notes are created")
+
+    def test_bulk_notes_invalid_data(self):
+        response = self.client.post(self.url, {"notes": {"description": "Lorem Ipsum"}}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+            msg="Check response status code. Should be equal to 400, Since the notes is not an array"
+        )
+
+
+class ExportNotesTests(APITestCase):
+    url = reverse("export-notes")
+    note = None
+
+    def setUp(self) -> None:
+        User.objects.create_user(username="test_user", password="1234")
+        self.client.login(username="test_user", password="1234")
+
+        response = self.client.post(reverse("create-note"), {"description": "Lorem Ipsum"}, format="json")
+        self.note = Note.objects.get(id=response.data["data"]["id"])
+
+        for i in range(3):
+            self.client.put(reverse("note-detail", kwargs={"pk": str(self.note.id)}), {"description": f"Lorem Ipsum {i}"})
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    @override_settings(VERSION_HISTORY_SNAPSHOT_INTERVAL=2, NOTE_EXPORT_CHUNK_SIZE=2)
+    def test_export_notes(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        async def read_content():
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        lines = [json.loads(line) for line in async_to_sync(read_content)().splitlines()]
+
+        self.assertEqual(
+            [(line["type"], line.get("sequence")) for line in lines],
+            [("note", None), ("version", 1), ("version", 2), ("version", 3)],
+            msg="Check if the note is followed by all of its versions"
+        )
+
+        self.assertEqual(
+            [(line["old_description"], line["new_description"]) for line in lines[1:]],
+            [("Lorem Ipsum", "Lorem Ipsum 0"), ("Lorem Ipsum 0", "Lorem Ipsum 1"), ("Lorem Ipsum 1", "Lorem Ipsum 2")],
+            msg="Check if the descriptions of each version are rebuilt"
+        )
+
+
+class VersionHistoryListTests(APITestCase):
+    url = None
+    note = None
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+
+        self.note = Note.objects.create(owner=user, description="Lorem Ipsum")
+        self.client.login(username="test_user", password="1234")
+        self.url = reverse("note-version-history", kwargs={"note_id": str(self.note.id)})
+
+    def tearDown(self) -> None:
+        self.client.logout()
+
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_version_history_list(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+
+        for description in ("Lorem Ipsum 1", "Lorem Ipsum 2"):
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200"
+        )
+
+        self.assertEqual(
+            [result["new_description"] for result in response.data["results"]],
+            ["Lorem Ipsum 2", "Lorem Ipsum 1"],
+            msg="Check if version history records are returned with the latest one first"
+        )
+
+    @override_settings(VERSION_HISTORY_COALESCE_WINDOW=60)
+    def test_version_history_coalescing(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        user = User.objects.create_user(username="another_user", password="1234")
+        self.note.shared_with.add(user)
+
+        self.client.put(note_detail_url, {"description": "Lorem Ipsum 1"}, format="json")
+
+        # A burst of edits by another user, Coalesced into the version after the one of the owner
+        self.client.force_authenticate(user=user)
+        for description in ("Lorem Ipsum 2", "Lorem Ipsum 23", "Lorem 23"):
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        self.client.force_authenticate(user=self.note.owner)
+        self.client.put(note_detail_url, {"description": "Lorem 234"}, format="json")
+
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            [(result["old_description"], result["new_description"]) for result in response.data["results"]],
+            [("Lorem 23", "Lorem 234"), ("Lorem Ipsum 1", "Lorem 23"), ("Lorem Ipsum", "Lorem Ipsum 1")],
+            msg="Check if the edits of the same user within the window are recorded as a single version"
+        )
+
+    def test_version_history_compact(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+
+        for description in ("Lorem Ipsum 1", "Lorem Ipsum 2"):
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        response = self.client.get(self.url, {"compact": "true", "old_description": "false"})
+
+        self.assertEqual(
+            response.data["note"]["description"],
+            "Lorem Ipsum 2",
+            msg="Check if the note is sent once at the top"
+        )
+
+        self.assertEqual(
+            [user["username"] for user in response.data["users"]],
+            ["test_user"],
+            msg="Check if the users of the versions are deduplicated"
+        )
+
+        self.assertEqual(
+            response.data["results"][0],
+            {
+                "id": response.data["results"][0]["id"],
+                "new_description": "Lorem Ipsum 2",
+                "user": "test_user",
+                "created_at": response.data["results"][0]["created_at"],
+            },
+            msg="Check if each version leaves out the note & the old description"
+        )
+
+    def test_version_history_cursor_pagination(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+
+        for i in range(5):
+            self.client.put(note_detail_url, {"description": f"Lorem Ipsum {i}"}, format="json")
+
+        response = self.client.get(self.url, {"limit": 2}, format="json")
+        descriptions = [result["new_description"] for result in response.data["results"]]
+
+        self.assertNotIn("count", response.data, msg="Check if the count query is skipped")
+        self.assertIsNone(response.data["previous"], msg="Check if the first page has no previous cursor")
+
+        # Follow the next cursors till the last page
+        while response.data["next"]:
+            response = self.client.get(response.data["next"], format="json")
+            descriptions.extend(result["new_description"] for result in response.data["results"])
+
+        self.assertEqual(
+            descriptions,
+            [f"Lorem Ipsum {i}" for i in reversed(range(5))],
+            msg="Check if every version history record is returned exactly once in order"
+        )
+
+        # Go back from the last page
+        response = self.client.get(response.data["previous"], format="json")
+
+        self.assertEqual(
+            [result["new_description"] for result in response.data["results"]],
+            ["Lorem Ipsum 2", "Lorem Ipsum 1"],
+            msg="Check if the previous cursor returns the preceding page"
+        )
+
+    @override_settings(VERSION_HISTORY_SNAPSHOT_INTERVAL=2)
+    def test_version_history_descriptions(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        descriptions = ["Lorem Ipsum"] + [f"Lorem Ipsum {i} dolor sit amet" * i for i in range(1, 6)]
+
+        for description in descriptions[1:]:
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        # Second page starts in between of two snapshots
+        response = self.client.get(self.url, {"limit": 2}, format="json")
+        response = self.client.get(response.data["next"], format="json")
+
+        self.assertEqual(
+            [(result["old_description"], result["new_description"]) for result in response.data["results"]],
+            [(descriptions[2], descriptions[3]), (descriptions[1], descriptions[2])],
+            msg="Check if old & new descriptions are rebuilt from the stored snapshots & deltas"
+        )
+
+    def test_version_history_without_access(self):
+        user = User.objects.create_user(username="another_user", password="1234")
+        self.client.force_authenticate(user=user)
+
+        for compact in ("false", "true"):
+            response = self.client.get(self.url, {"compact": compact}, format="json")
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_403_FORBIDDEN,
+                msg="Check response status code. Should be equal to 403, Since the note is not shared with the user"
+            )
+
+        self.note.shared_with.add(user)
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is shared with the user"
+        )
+
+        response = self.client.get(
+            reverse("note-version-history", kwargs={"note_id": str(uuid.uuid4())}), format="json"
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND,
+            msg="Check response status code. Should be equal to 404, Since the note does not exist"
+        )
+
+    @override_settings(CACHES=LOCAL_RESPONSE_CACHE)
+    def test_version_history_cache_concurrent_update(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        self.client.put(note_detail_url, {"description": "Lorem Ipsum 1"}, format="json")
+
+        restore_descriptions = history.arestore_descriptions
+
+        async def restore_and_update(page):
+            await restore_descriptions(page)
+
+            # The note is updated by another request once the page is read, But before it is cached
+            await Note.objects.filter(id=self.note.id).aupdate(description="Lorem Ipsum 2", version=3)
+            set_note_states([await Note.objects.aget(id=self.note.id)])
+
+        with mock.patch.object(history, "arestore_descriptions", restore_and_update):
+            self.client.get(self.url, format="json")
+
+        response = self.client.get(self.url, format="json")
+
+        self.assertEqual(
+            response.data["results"][0]["note"]["description"],
+            "Lorem Ipsum 2",
+            msg="Check if the page which was read before the update is not served as the latest version"
+        )
+
+    def test_version_history_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "invalid"}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND,
+            msg="Check response status code. Should be equal to 404, Since we are intentially passing an invalid cursor"
+        )
+
 
 class ShareNoteTests(APITestCase):
     url = reverse("share-note")
@@ -185,6 +913,141 @@ class ShareNoteTests(APITestCase):
             msg="Check if description is updated in DB"
         )
 
+    def test_share_note_after_denied_access(self):
+        user = User.objects.create_user(username="denied_user", password="1234")
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+
+        self.client.logout()
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(note_detail_url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN,
+            msg="Check response status code. Should be equal to 403, Since the note is not shared yet"
+        )
+
+        # Share the note via the API
+        self.client.force_authenticate(user=self.note.owner)
+        self.client.post(self.url, {"note_id": str(self.note.id), "usernames": '["denied_user"]'}, format="json")
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(note_detail_url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is shared now"
+        )
+
+    def test_share_note_invalid_usernames(self):
+        User.objects.create_user(username="another_user", password="1234")
+
+        data = {"note_id": str(self.note.id), "usernames": ["another_user", "missing_user", "missing_user_2"]}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST,
+            msg="Check response status code. Should be equal to 400, Since some of the usernames does not exist"
+        )
+
+        self.assertEqual(
+            response.data["errors"]["usernames"],
+            ["missing_user", "missing_user_2"],
+            msg="Check if only the usernames which does not exist are listed"
+        )
+
+        self.assertFalse(self.note.shared_with.exists(), msg="Check the note is not shared with any of the users")
+
+    def test_share_note_read_permission(self):
+        user = User.objects.create_user(username="reader_user", password="1234")
+
+        data = {"note_id": str(self.note.id), "usernames": ["reader_user"], "permission": "read"}
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200."
+        )
+
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get(note_detail_url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is shared for reading"
+        )
+
+        response = self.client.put(note_detail_url, {"description": "Lorem Ipsum 3"}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN,
+            msg="Check response status code. Should be equal to 403, Since the note is shared for reading only"
+        )
+
+        # Upgrade the share to write permission
+        self.client.force_authenticate(user=self.note.owner)
+        data["permission"] = "write"
+        self.client.post(self.url, data, format="json")
+        self.client.force_authenticate(user=user)
+
+        response = self.client.put(note_detail_url, {"description": "Lorem Ipsum 3"}, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200, Since the note is shared for writing now"
+        )
+
+    def test_unshare_note(self):
+        user = User.objects.create_user(username="another_user", password="1234")
+        self.client.post(self.url, {"note_id": str(self.note.id), "usernames": ["another_user"]}, format="json")
+
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        self.client.force_authenticate(user=user)
+        self.client.get(note_detail_url, format="json")
+
+        self.client.force_authenticate(user=self.note.owner)
+        response = self.client.delete(
+            self.url, {"note_id": str(self.note.id), "usernames": ["another_user"]}, format="json"
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK,
+            msg="Check response status code. Should be equal to 200."
+        )
+
+        self.assertFalse(self.note.shared_with.exists(), msg="Check the note share is removed in DB")
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(note_detail_url, format="json")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_403_FORBIDDEN,
+            msg="Check response status code. Should be equal to 403, Since the note is unshared now"
+        )
+
+    def test_note_delete_access_cache(self):
+        user = User.objects.create_user(username="deleted_note_user", password="1234")
+        self.note.shared_with.add(user)
+
+        key = get_note_access_key(self.note.id, user.id)
+        caches[NOTE_ACCESS_CACHE].set(key, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Note.objects.filter(id=self.note.id).delete()
+
+        self.assertIsNone(caches[NOTE_ACCESS_CACHE].get(key), msg="Check if the cached access is removed")
+
     def test_note_accessiblity_without_share(self):
         # Logout the previous user
         self.client.logout()
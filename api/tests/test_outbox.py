@@ -0,0 +1,104 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+
+from api import outbox
+from api.models import HistoryOutbox, Note, VersionHistory
+
+
+@override_settings(VERSION_HISTORY_WRITE_BEHIND=True)
+class HistoryOutboxTests(APITestCase):
+    note = None
+
+    def setUp(self) -> None:
+        user = User.objects.create_user(username="test_user", password="1234")
+
+        self.note = Note.objects.create(owner=user, description="Lorem Ipsum")
+        self.client.force_authenticate(user=user)
+
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def test_history_after_crash(self):
+        note_detail_url = reverse("note-detail", kwargs={"pk": str(self.note.id)})
+        descriptions = ["Lorem Ipsum 1", "Lorem Ipsum 2", "Lorem Ipsum 3"]
+
+        for description in descriptions:
+            self.client.put(note_detail_url, {"description": description}, format="json")
+
+        self.assertFalse(VersionHistory.objects.exists(), msg="Check the version history is not written by the update")
+        self.assertEqual(HistoryOutbox.objects.count(), 3, msg="Check an outbox record is written by each update")
+
+        # Crash the consumer after the version history records are written, But before the batch is committed
+        with mock.patch("api.outbox.delete_records", side_effect=RuntimeError("crash")):
+            with self.assertRaises(RuntimeError):
+                outbox.process_batch(batch_size=2)
+
+        self.assertFalse(VersionHistory.objects.exists(), msg="Check the batch of the crashed consumer is rolled back")
+        self.assertEqual(HistoryOutbox.objects.count(), 3, msg="Check the outbox records are kept for the retry")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(outbox.process_batch(batch_size=2), 2, msg="Check a batch is limited by its size")
+        with self.captureOnCommitCallbacks(execute=True):
+            outbox.process_batch(batch_size=2)
+
+        self.assertFalse(HistoryOutbox.objects.exists(), msg="Check the outbox is empty once it is written")
+
+        response = self.client.get(reverse("note-version-history", kwargs={"note_id": str(self.note.id)}))
+
+        self.assertEqual(
+            [result["new_description"] for result in response.data["results"]],
+            descriptions[::-1],
+            msg="Check if the version history is complete, In the order of the updates"
+        )
+
+        self.assertEqual(
+            list(VersionHistory.objects.order_by("sequence").values_list("sequence", flat=True)),
+            [1, 2, 3],
+            msg="Check if the versions get consecutive sequences"
+        )
+
+    def test_process_history_outbox_command(self):
+        data = {"notes": [{"id": str(self.note.id), "description": "Lorem Ipsum 1"}]}
+        self.client.post(reverse("bulk-notes"), data, format="json")
+
+        self.assertEqual(HistoryOutbox.objects.count(), 1, msg="Check an outbox record is written by the bulk update")
+
+        call_command("process_history_outbox", "--once")
+
+        self.assertFalse(HistoryOutbox.objects.exists(), msg="Check the outbox is empty once it is written")
+        self.assertEqual(
+            VersionHistory.objects.filter(note=self.note).count(),
+            1,
+            msg="Check the version history record is written by the command"
+        )
+
+    @override_settings(
+        CACHES={**settings.CACHES, "responses": {**settings.CACHES["responses"], "BACKEND": "api.cache.LocMemCache"}}
+    )
+    def test_history_with_local_response_cache(self):
+        version_history_url = reverse("note-version-history", kwargs={"note_id": str(self.note.id)})
+        self.client.put(
+            reverse("note-detail", kwargs={"pk": str(self.note.id)}), {"description": "Lorem Ipsum 1"}, format="json"
+        )
+        self.client.get(version_history_url)
+
+        # The outbox is written by another process, Whose invalidation does not reach the cache of this process
+        with mock.patch("api.outbox.invalidate_note_responses"):
+            with self.captureOnCommitCallbacks(execute=True):
+                outbox.process_batch(batch_size=10)
+
+        response = self.client.get(version_history_url)
+
+        self.assertEqual(
+            [result["new_description"] for result in response.data["results"]],
+            ["Lorem Ipsum 1"],
+            msg="Check if the version history is not served from the cache of the process"
+        )
@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITransactionTestCase
+
+from api import sharing
+from api.models import Note, NoteRemoval, NoteShare
+from api.sync import SyncCursor
+
+
+# The change IDs are the IDs of the committed transactions, So each write of these tests is committed on its own
+class NoteSyncTests(APITransactionTestCase):
+    user = None
+    other_user = None
+
+    def setUp(self) -> None:
+        self.user = User.objects.create_user(username="test_user", password="1234")
+        self.other_user = User.objects.create_user(username="test_user_2", password="1234")
+
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self) -> None:
+        User.objects.all().delete()
+        Note.objects.all().delete()
+
+    def sync(self, cursor: str | None = None, **params) -> dict:
+        if cursor:
+            params["cursor"] = cursor
+
+        response = self.client.get(reverse("sync-notes"), params)
+        self.assertEqual(response.status_code, 200, msg="Check if the sync is successful")
+
+        return response.data["data"]
+
+    def test_sync_changed_notes(self):
+        notes = [Note.objects.create(owner=self.user, description=f"Lorem Ipsum {i}") for i in range(3)]
+        shared_note = Note.objects.create(owner=self.other_user, description="Shared")
+        sharing.share_note(self.other_user.id, shared_note.id, [self.user.username], NoteShare.Permission.READ)
+
+        data = self.sync()
+
+        self.assertEqual(
+            {note["id"] for note in data["notes"]},
+            {str(note.id) for note in notes + [shared_note]},
+            msg="Check if the first sync returns all the visible notes"
+        )
+        self.assertFalse(data["has_more"], msg="Check if the first sync is complete")
+
+        self.assertEqual(self.sync(data["cursor"])["notes"], [], msg="Check if nothing is returned without changes")
+
+        self.client.put(
+            reverse("note-detail", kwargs={"pk": str(notes[1].id)}), {"description": "Updated"}, format="json"
+        )
+        new_note = Note.objects.create(owner=self.user, description="New")
+        Note.objects.create(owner=self.other_user, description="Not shared")
+
+        data = self.sync(data["cursor"])
+
+        self.assertEqual(
+            [note["id"] for note in data["notes"]],
+            [str(notes[1].id), str(new_note.id)],
+            msg="Check if only the changed notes are returned, In the order of the changes"
+        )
+        self.assertEqual(data["notes"][0]["description"], "Updated", msg="Check if the latest description is returned")
+
+    def test_sync_changed_shared_notes(self):
+        notes = [Note.objects.create(owner=self.other_user, description=f"Shared {i}") for i in range(3)]
+        sharing.share_note(self.other_user.id, notes[0].id, [self.user.username], NoteShare.Permission.READ)
+        sharing.share_note(self.other_user.id, notes[1].id, [self.user.username], NoteShare.Permission.READ)
+
+        cursor = self.sync()["cursor"]
+
+        # Either the note, Or the note share of the user, Or both are changed
+        Note.objects.filter(id=notes[0].id).update(description="Updated")
+        sharing.share_note(self.other_user.id, notes[1].id, [self.user.username], NoteShare.Permission.WRITE)
+        sharing.share_note(self.other_user.id, notes[2].id, [self.user.username], NoteShare.Permission.READ)
+        Note.objects.filter(id=notes[2].id).update(description="Updated")
+
+        self.assertEqual(
+            sorted(note["id"] for note in self.sync(cursor)["notes"]),
+            sorted(str(note.id) for note in notes),
+            msg="Check if each changed shared note is returned once"
+        )
+
+    def test_sync_removed_notes(self):
+        note = Note.objects.create(owner=self.user, description="Lorem Ipsum")
+        shared_note = Note.objects.create(owner=self.other_user, description="Shared")
+        sharing.share_note(self.other_user.id, shared_note.id, [self.user.username], NoteShare.Permission.WRITE)
+
+        cursor = self.sync()["cursor"]
+
+        sharing.unshare_note(self.other_user.id, shared_note.id, [self.user.username])
+        note_id = str(note.id)
+        note.delete()
+
+        data = self.sync(cursor)
+
+        self.assertEqual(data["notes"], [], msg="Check if the removed notes are not returned")
+        self.assertEqual(
+            sorted(data["removed"]),
+            sorted([note_id, str(shared_note.id)]),
+            msg="Check if the unshared & deleted notes are returned as removed"
+        )
+        self.assertEqual(self.sync(data["cursor"])["removed"], [], msg="Check if the removals are not returned again")
+
+    def test_sync_pagination(self):
+        notes = [Note.objects.create(owner=self.user, description=f"Lorem Ipsum {i}") for i in range(5)]
+
+        data = self.sync(limit=2)
+        synced = [note["id"] for note in data["notes"]]
+
+        while data["has_more"]:
+            self.assertEqual(len(data["notes"]), 2, msg="Check if a page is limited by the given limit")
+            # A note which is changed in the middle of the sync is returned either by this sync or by the next one
+            Note.objects.filter(id=notes[0].id).update(description="Updated")
+
+            data = self.sync(data["cursor"], limit=2)
+            synced += [note["id"] for note in data["notes"]]
+
+        self.assertEqual(sorted(set(synced)), sorted(str(note.id) for note in notes), msg="Check if all notes are synced")
+        self.assertIn(
+            str(notes[0].id),
+            [note["id"] for note in self.sync(data["cursor"])["notes"]],
+            msg="Check if the note which was changed during the sync is returned by the next sync"
+        )
+
+    def test_sync_invalid_cursor(self):
+        response = self.client.get(reverse("sync-notes"), {"cursor": "invalid"})
+
+        self.assertEqual(response.status_code, 400, msg="Check if an invalid cursor is rejected")
+
+    def test_sync_expired_cursor(self):
+        Note.objects.create(owner=self.user, description="Lorem Ipsum")
+        cursor = SyncCursor.decode(self.sync()["cursor"])
+
+        cursor.since_at -= int(timedelta(days=31).total_seconds())
+        response = self.client.get(reverse("sync-notes"), {"cursor": cursor.encode()})
+
+        self.assertEqual(response.status_code, 410, msg="Check if a cursor older than the retention is rejected")
+
+        # A cursor without the timestamps cannot tell whether the removals since then are kept
+        cursor.since_at = None
+        response = self.client.get(reverse("sync-notes"), {"cursor": cursor.encode()})
+
+        self.assertEqual(response.status_code, 410, msg="Check if a cursor without the timestamps is rejected")
+
+    def test_prune_removals(self):
+        note_ids = [Note.objects.create(owner=self.user, description=f"Lorem Ipsum {i}").id for i in range(2)]
+        Note.objects.filter(id__in=note_ids).delete()
+
+        NoteRemoval.objects.filter(note_id=note_ids[0]).update(created_at=timezone.now() - timedelta(days=32))
+
+        call_command("prune_note_removals")
+
+        self.assertEqual(
+            list(NoteRemoval.objects.values_list("note_id", flat=True)),
+            [note_ids[1]],
+            msg="Check if only the removals older than the retention are pruned"
+        )
@@ -11,7 +11,13 @@ urlpatterns = [
     path("user/", auth.UserList.as_view(), name="user-list"),
 
     # Note API Endpoints
+    path("notes/", notes.NoteList.as_view(), name="note-list"),
     path("notes/create/", notes.CreateNote.as_view(), name="create-note"),
+    path("notes/bulk/", notes.BulkNotes.as_view(), name="bulk-notes"),
+    path("notes/export/", notes.ExportNotes.as_view(), name="export-notes"),
+    path("notes/search/", notes.NoteSearch.as_view(), name="search-notes"),
+    path("notes/events/", notes.NoteEvents.as_view(), name="note-events"),
+    path("notes/sync/", notes.NoteSync.as_view(), name="sync-notes"),
     path("notes/share/", notes.ShareNote.as_view(), name="share-note"),
     path("notes/version-history/<str:note_id>/", notes.VersionHisotryList.as_view(), name="note-version-history"),
     path("notes/<str:pk>/", notes.NoteDetail.as_view(), name="note-detail"),
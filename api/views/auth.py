@@ -1,7 +1,5 @@
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db import transaction
-from django.utils import timezone
+from django.db import IntegrityError
 
 from rest_framework import status
 from rest_framework.request import Request
@@ -9,8 +7,11 @@ from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 
 import strings
+from api.hashing import HasherSaturated, aauthenticate, amake_password
+from api.pagination import KeysetPagination
 from api.serializers import UserSerializer
 from api.views.base import (
+    AsyncCustomAPIView,
     CustomAPIView,
     CustomGenericAPIView,
     CustomListModelMixin,
@@ -18,20 +19,44 @@ from api.views.base import (
 from api.utils import get_auth_token, error_response, success_response
 
 
-class Singup(CustomAPIView):
+class PasswordHasherMixin:
+    """
+    Passwords are hashed & verified on the bounded hasher pool (see `api.hashing`), When the pool is
+    saturated a 429 response is returned instead. The stats of the pool are only logged, Not sent to the client.
+    """
+
+    retry_after = 1
+
+    def handle_exception(self, exc):
+        if isinstance(exc, HasherSaturated):
+            response = error_response(
+                message=strings.PASSWORD_HASHER_SATURATED,
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            )
+            response["Retry-After"] = str(self.retry_after)
+            return response
+
+        return super().handle_exception(exc)
+
+
+class Singup(PasswordHasherMixin, AsyncCustomAPIView):
     permission_classes = (AllowAny,)
 
-    @transaction.atomic
-    def post(self, request: Request):
+    async def post(self, request: Request):
+        # Normalize the username the same as `create_user`, So that the equivalent usernames are the same user
+        username = User.normalize_username(request.data["username"])
+
         # Check if user with the given username already exists or not
-        if User.objects.filter(username__exact=request.data["username"]).exists():
+        if await User.objects.filter(username__exact=username).aexists():
             return error_response(message=strings.USERNAME_ALREADY_EXISTS)
 
-        # Create user object
-        user = User.objects.create_user(
-            username=request.data["username"],
-            password=request.data["password"]
-        )
+        password = await amake_password(request.data["password"])
+
+        # Create user object, The username may have been taken while the password was being hashed
+        try:
+            user = await User.objects.acreate(username=username, password=password)
+        except IntegrityError:
+            return error_response(message=strings.USERNAME_ALREADY_EXISTS)
 
         # Generate JWT tokens for the user
         data = get_auth_token(user=user)
@@ -43,24 +68,20 @@ class Singup(CustomAPIView):
         )
 
 
-class Login(CustomAPIView):
+class Login(PasswordHasherMixin, AsyncCustomAPIView):
     permission_classes = (AllowAny,)
 
-    @transaction.atomic
-    def post(self, request: Request):
-        # Authenticate the user with the given credentials
-        user = authenticate(request, username=request.data["username"], password=request.data["password"])
-        
+    async def post(self, request: Request):
+        # Authenticate the user with the given credentials on the hasher pool, Which also updates the last login
+        # timestamp (along with the upgraded password hash if any) of the user
+        user = await aauthenticate(request, request.data["username"], request.data["password"])
+
         if not user:
             return error_response(
                 message=strings.INVALID_LOGIN_CREDENTIALS,
                 status_code=status.HTTP_401_UNAUTHORIZED,
             )
 
-        # Update the last login timestamp in user object
-        user.last_login = timezone.now()
-        user.save(update_fields=["last_login"])
-
         # Generate JWT tokens for the user
         data = get_auth_token(user=user)
 
@@ -92,6 +113,8 @@ class UserList(CustomGenericAPIView, CustomListModelMixin):
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = KeysetPagination
+    ordering = ("-date_joined", "-id")
 
     def get_queryset(self):
         # Exclude the current user from the users queryset
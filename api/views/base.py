@@ -5,6 +5,13 @@ related views.
 This way we can easily manage all views behaviour from a centralize place.
 """
 
+from hashlib import md5
+from inspect import isawaitable
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.http import Http404
 from rest_framework import serializers, status
 from rest_framework.generics import GenericAPIView
 from rest_framework.views import APIView
@@ -18,6 +25,7 @@ from rest_framework.mixins import (
 from rest_framework.response import Response
 
 import strings
+from api.cache import NOTE_ACCESS_CACHE, RESPONSE_CACHE, get_note_access_key, get_note_state_key
 from api.utils import success_response
 
 
@@ -36,9 +44,248 @@ class CustomGenericAPIView(GenericAPIView):
         return super().handle_exception(exc)
 
 
+class AsyncViewMixin:
+    """
+    Makes a view run natively on the event loop when served via ASGI.
+
+    All the handlers of the view must be coroutines. Authentication and permission checks are awaited
+    via the `aauthenticate`, `ahas_permission` & `ahas_object_permission` hooks when a class provides them,
+    Otherwise the sync methods are called directly. So any authentication or permission class which hits
+    the database must provide the async hook.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+
+            # `options` is inherited as a sync handler from the DRF's APIView
+            if isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+
+        neg = self.perform_content_negotiation(request)
+        request.accepted_renderer, request.accepted_media_type = neg
+
+        version, scheme = self.determine_version(request, *args, **kwargs)
+        request.version, request.versioning_scheme = version, scheme
+
+        await self.aperform_authentication(request)
+        await self.acheck_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except Exception:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    async def acheck_permissions(self, request):
+        for permission in self.get_permissions():
+            if hasattr(permission, "ahas_permission"):
+                has_permission = await permission.ahas_permission(request, self)
+            else:
+                has_permission = permission.has_permission(request, self)
+
+            if not has_permission:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+    async def acheck_object_permissions(self, request, obj):
+        for permission in self.get_permissions():
+            if hasattr(permission, "ahas_object_permission"):
+                has_permission = await permission.ahas_object_permission(request, self, obj)
+            else:
+                has_permission = permission.has_object_permission(request, self, obj)
+
+            if not has_permission:
+                self.permission_denied(
+                    request,
+                    message=getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+
+class AsyncCustomAPIView(AsyncViewMixin, CustomAPIView):
+    pass
+
+
+class AsyncCustomGenericAPIView(AsyncViewMixin, CustomGenericAPIView):
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        filter_kwargs = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+
+        try:
+            obj = await queryset.aget(**filter_kwargs)
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+
+        # May raise a permission denied
+        await self.acheck_object_permissions(self.request, obj)
+
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        return await self.paginator.apaginate_queryset(queryset, self.request, view=self)
+
+
+class NoteResponseCacheMixin:
+    """
+    Caches the successful GET responses of a note resource per (note, version, caller, query) and tags them
+    with an ETag, So that a client which sends the ETag back via If-None-Match gets a 304 without the response
+    being fetched or serialized at all.
+
+    The (owner, version) state of each note is kept in the response cache as well, A write of the note
+    replaces the state (see `api.cache.set_note_states`) which makes the cached responses of the note unreachable.
+    A cached response is only served to the owner or to a user whose access to the note is cached, Any other
+    request goes through the view as usual.
+
+    The view must set `note_url_kwarg` and set `note` to the note before the response is built, The response is
+    cached under the state of that note. So a response is never cached under a newer state than it was built from,
+    Even if the note is updated while the response is being built.
+    """
+
+    note_url_kwarg = "pk"
+    note = None
+
+    def get_note_state(self) -> tuple | None:
+        """
+        Return the (owner ID, version) state of the note which the response is built from, Else None if the note
+        is not fetched.
+        """
+
+        if self.note is None:
+            return None
+        return self.note.owner_id, self.note.version
+
+    def get_response_cache_key(self, note_id, version) -> str:
+        # The variant is hashed, So that the key is valid for any cache backend (e.g. memcached) regardless of the query
+        query = sorted(self.request.query_params.lists())
+        variant = md5(f"{version}:{self.request.user.id}:{query}".encode()).hexdigest()
+
+        return f"{self.__class__.__name__}:{note_id}:{variant}"
+
+    def get_etag(self, key: str | None, version) -> str:
+        return f'"{key.rsplit(":", 1)[-1]}"'
+
+    def is_not_modified(self, etag: str) -> bool:
+        if_none_match = self.request.headers.get("If-None-Match", "")
+        return etag in (tag.strip() for tag in if_none_match.split(","))
+
+    async def aget_cached_response(self, request) -> Response | None:
+        note_id = self.kwargs[self.note_url_kwarg]
+
+        state = await caches[RESPONSE_CACHE].aget(get_note_state_key(note_id))
+        if state is None:
+            return None
+
+        owner_id, version = state
+        if owner_id != request.user.id:
+            has_access = await caches[NOTE_ACCESS_CACHE].aget(get_note_access_key(note_id, request.user.id))
+            if not has_access:
+                return None
+
+        key = self.get_response_cache_key(note_id, version)
+        etag = self.get_etag(key, version)
+
+        if self.is_not_modified(etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        data = await caches[RESPONSE_CACHE].aget(key)
+        if data is None:
+            return None
+
+        return Response(data, headers={"ETag": etag})
+
+    async def acache_response(self, response):
+        state = self.get_note_state()
+        if state is None:
+            return
+
+        # The state is only added, So that a state which is written by a concurrent update is not overwritten
+        cache = caches[RESPONSE_CACHE]
+        note_id = self.kwargs[self.note_url_kwarg]
+        await cache.aadd(get_note_state_key(note_id), state)
+
+        key = self.get_response_cache_key(note_id, state[1])
+        await cache.aset(key, response.data)
+
+        response["ETag"] = self.get_etag(key, state[1])
+
+    async def aget_response(self, request, handler, *args, **kwargs):
+        """
+        Return the cached response if any, Else the response of the given handler which is then cached.
+        """
+
+        response = await self.aget_cached_response(request)
+        if response is not None:
+            return response
+
+        response = await handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            await self.acache_response(response)
+
+        return response
+
+
 class CustomListModelMixin(ListModelMixin):
     def list(self, request, *args, **kwargs):
         response = super().list(request, *args, **kwargs)
+        return self.get_list_response(response, message=kwargs.get("message"))
+
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        page = await self.apaginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer([obj async for obj in queryset], many=True)
+            response = Response(serializer.data)
+
+        return self.get_list_response(response, message=kwargs.get("message"))
+
+    def get_list_response(self, response, message: str | None = None):
         data = dict()
 
         if "results" in response.data:
@@ -46,7 +293,7 @@ class CustomListModelMixin(ListModelMixin):
         else:
             data["results"] = response.data
 
-        data["message"] = kwargs.get("message")
+        data["message"] = message
         return Response(data)
 
 
@@ -60,14 +307,39 @@ class CustomCreateModelMixin(CreateModelMixin):
             status_code=status.HTTP_201_CREATED,
         )
 
+    async def acreate(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        await serializer.asave()
+
+        return success_response(
+            data=serializer.data,
+            message=kwargs.get("message", strings.CREATE_SUCCESS),
+            status_code=status.HTTP_201_CREATED,
+        )
+
 
 class CustomRetrieveModelMixin(RetrieveModelMixin):
     def retrieve(self, request, *args, **kwargs):
         response = super().retrieve(request, *args, **kwargs)
         return success_response(data=response.data, message=kwargs.get("message"))
 
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance)
+        return success_response(data=serializer.data, message=kwargs.get("message"))
+
 
 class CustomUpdateModelMixin(UpdateModelMixin):
     def update(self, request, *args, **kwargs):
         response = super().update(request, *args, **kwargs)
         return success_response(data=response.data, message=kwargs.get("message", strings.UPDATE_SUCESS))
+
+    async def aupdate(self, request, *args, **kwargs):
+        partial = kwargs.pop("partial", False)
+        instance = await self.aget_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        await serializer.asave()
+
+        return success_response(data=serializer.data, message=kwargs.get("message", strings.UPDATE_SUCESS))
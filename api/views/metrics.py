@@ -0,0 +1,21 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from api.metrics import generate_metrics
+
+
+async def metrics(request):
+    """
+    Expose the Prometheus metrics, If `METRICS_TOKEN` is set the scraper must send it as a bearer token.
+    """
+
+    if settings.METRICS_TOKEN:
+        if not constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+            return HttpResponse(status=401)
+
+    # The metrics of the workers are read from their files, So it does not run on the event loop
+    content, content_type = await sync_to_async(generate_metrics, thread_sensitive=False)()
+
+    return HttpResponse(content, content_type=content_type)
@@ -1,78 +1,482 @@
 import json
+import uuid
 
-from django.db import transaction
-from django.contrib.auth.models import User
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import status
+from rest_framework.pagination import _positive_int
 from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 import strings
+from api import bulk, events, history, search, sharing, sync
+from api.exceptions import PatchConflict, PreconditionFailed, SyncCursorExpired
+from api.export import aexport_notes
+from api.cache import RESPONSE_CACHE, ainvalidate_note_access, ainvalidate_note_responses, is_process_local
 from api.views.base import (
-    CustomAPIView,
-    CustomGenericAPIView,
+    AsyncCustomAPIView,
+    AsyncCustomGenericAPIView,
     CustomListModelMixin,
     CustomCreateModelMixin,
     CustomRetrieveModelMixin,
     CustomUpdateModelMixin,
+    NoteResponseCacheMixin,
+)
+from api.serializers import (
+    CompactVersionHistorySerializer,
+    NotePatchSerializer,
+    NoteSerializer,
+    UserSerializer,
+    VersionHistorySerializer,
 )
-from api.serializers import NoteSerializer, VersionHistorySerializer
 from api.permissions import CanReadOrUpdateNote
-from api.models import Note, VersionHistory
+from api.models import Note, NoteShare, VersionHistory
+from api.pagination import KeysetPagination
 from api.utils import success_response, error_response
 
 
-class CreateNote(CustomGenericAPIView, CustomCreateModelMixin):
+class CreateNote(AsyncCustomGenericAPIView, CustomCreateModelMixin):
     serializer_class = NoteSerializer
 
-    @transaction.atomic
-    def post(self, request, *args, **kwargs):
-        return self.create(request, *args, **kwargs)
+    async def post(self, request, *args, **kwargs):
+        return await self.acreate(request, *args, **kwargs)
+
+
+class NoteList(AsyncCustomGenericAPIView, CustomListModelMixin):
+    """
+    List the notes which are visible to the current user, i.e. The owned notes along with the shared ones.
+
+    Pass `scope=owned` or `scope=shared` to list only one of them, And `ordering` to order the notes by either
+    `modified_at` (default) or `created_at`, Prefixed with "-" for a descending order.
+    """
+
+    queryset = Note.objects.all()
+    serializer_class = NoteSerializer
+    pagination_class = KeysetPagination
+    orderings = ("-modified_at", "modified_at", "-created_at", "created_at")
+
+    @property
+    def ordering(self) -> tuple[str, str]:
+        ordering = self.request.query_params.get("ordering")
+        if ordering not in self.orderings:
+            ordering = self.orderings[0]
+
+        return ordering, "-id" if ordering.startswith("-") else "id"
+
+    def get_querysets(self) -> list:
+        queryset = self.get_queryset()
+        scope = self.request.query_params.get("scope")
+
+        # The owned & shared notes are paginated as a union of two queries, So that the owned notes are
+        # seeked via the (owner, <ordering>, id) index instead of scanning all the notes for either condition.
+        querysets = list()
+        if scope != "shared":
+            querysets.append(queryset.filter(owner_id=self.request.user.id))
+        if scope != "owned":
+            querysets.append(queryset.filter(shared_with=self.request.user.id))
+
+        return querysets
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.paginator.apaginate_queryset(self.get_querysets(), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+
+        return self.get_list_response(self.get_paginated_response(serializer.data))
+
+
+class NoteSearch(AsyncCustomGenericAPIView, CustomListModelMixin):
+    """
+    Search the notes which are visible to the current user by the given `q` query, Pass `in=history` to search
+    the text which was written by any version of the notes instead. See `api.search`.
+    """
+
+    def search_history(self) -> bool:
+        return self.request.query_params.get("in") == "history"
+
+    def get_serializer_class(self):
+        if self.search_history():
+            return VersionHistorySerializer
+        return NoteSerializer
+
+    async def get(self, request, *args, **kwargs):
+        query = request.query_params["q"]
+
+        if self.search_history():
+            queryset = search.search_history(request.user.id, query).select_related("user", "note")
+            page = await self.apaginate_queryset(
+                queryset.defer("snapshot", "delta", "search_vector", "note__search_vector")
+            )
+            await history.arestore_descriptions(page)
+        else:
+            page = await self.apaginate_queryset(search.search_notes(request.user.id, query))
+
+            # Fallback to the substring match, When the query does not match any whole word
+            if self.paginator.count == 0:
+                page = await self.apaginate_queryset(search.search_notes_by_substring(request.user.id, query))
+
+        serializer = self.get_serializer(page, many=True)
+        return self.get_list_response(self.get_paginated_response(serializer.data))
+
+
+class NoteSync(AsyncCustomAPIView):
+    """
+    Return the visible notes which are changed since the given `cursor` (all of them without a cursor), Along with
+    the IDs of the notes which are unshared from or deleted for the current user since then. See `api.sync`.
+
+    The changes are paginated by `limit`, The cursor of the response fetches the next page while `has_more` is set.
+    Else it is stored by the client to fetch the next changes later. A cursor which is older than
+    `NOTE_SYNC_RETENTION_DAYS` gets a 410, i.e. A full resync (without the cursor) is required.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+
+    def get_limit(self, request: Request) -> int:
+        try:
+            return _positive_int(request.query_params["limit"], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    async def get(self, request: Request):
+        try:
+            cursor = sync.SyncCursor.decode(request.query_params.get("cursor"))
+        except ValueError:
+            return error_response(message=strings.INVALID_SYNC_CURSOR)
+
+        try:
+            result = await sync_to_async(sync.get_changes)(request.user.id, cursor, self.get_limit(request))
+        except SyncCursorExpired as e:
+            return error_response(message=e.detail, status_code=e.status_code)
+
+        return success_response(data={
+            "cursor": result.cursor.encode(),
+            "has_more": result.has_more,
+            "notes": NoteSerializer(result.notes, many=True).data,
+            "removed": result.removed,
+        })
+
+
+class BulkNotes(AsyncCustomAPIView):
+    async def post(self, request: Request):
+        notes = request.data["notes"]
+
+        if not isinstance(notes, list) or len(notes) > settings.NOTE_BULK_MAX_SIZE:
+            return error_response(message=strings.INVALID_BULK_NOTES.format(max_size=settings.NOTE_BULK_MAX_SIZE))
+
+        # Notes are written in chunks, Each chunk in its own transaction on the thread sensitive executor
+        results = await sync_to_async(bulk.save_notes)(
+            user=request.user,
+            items=notes,
+            chunk_size=settings.NOTE_BULK_CHUNK_SIZE,
+            context={"request": request},
+        )
+
+        return success_response(data=results, message=strings.BULK_SAVE_SUCCESS)
+
+
+class ExportNotes(AsyncCustomAPIView):
+    async def get(self, request: Request):
+        response = StreamingHttpResponse(
+            aexport_notes(request.user.id, chunk_size=settings.NOTE_EXPORT_CHUNK_SIZE),
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = 'attachment; filename="notes.ndjson"'
+
+        return response
+
+
+class NoteEvents(AsyncCustomAPIView):
+    """
+    Stream the updates of the given notes (`note_ids`, comma separated) as server-sent events, Along with the notes
+    which are shared with or unshared from the current user. See `api.events`.
+
+    On a `resync` event the stream is closed, The client catches up via `notes/sync/` and subscribes again.
+    """
+
+    def get_note_ids(self, request: Request) -> set[str] | None:
+        """
+        Return the note IDs which are passed in the request, Else None if they are malformed or too many.
+        """
+
+        note_ids = [note_id for note_id in request.query_params.get("note_ids", "").split(",") if note_id]
+        if len(note_ids) > settings.NOTE_EVENTS_MAX_NOTES:
+            return None
+
+        try:
+            return {str(uuid.UUID(note_id)) for note_id in note_ids}
+        except ValueError:
+            return None
+
+    def get_forbidden_note_ids(self, user_id, note_ids: set[str]) -> list[str]:
+        visible = Note.objects.filter(search.get_visible_notes(user_id), id__in=note_ids).values_list("id", flat=True)
+        forbidden = note_ids - {str(note_id) for note_id in visible}
+
+        # The stream can stay open for hours, So it does not hold the DB connection of the request
+        connection.close()
+        return sorted(forbidden)
+
+    async def get(self, request: Request):
+        note_ids = self.get_note_ids(request)
+        if note_ids is None:
+            return error_response(message=strings.INVALID_NOTE_IDS.format(max_size=settings.NOTE_EVENTS_MAX_NOTES))
+
+        forbidden = await sync_to_async(self.get_forbidden_note_ids)(request.user.id, note_ids)
+        if forbidden:
+            return error_response(
+                message=strings.NOTE_PERMISSION_ERROR,
+                errors={"note_ids": forbidden},
+                status_code=status.HTTP_403_FORBIDDEN,
+            )
+
+        response = StreamingHttpResponse(
+            events.astream_events(request.user.id, note_ids, heartbeat=settings.NOTE_EVENTS_HEARTBEAT),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # Disable the buffering of the proxies (e.g. nginx), So that each event is sent as soon as it is written
+        response["X-Accel-Buffering"] = "no"
 
+        return response
 
-class NoteDetail(CustomGenericAPIView, CustomRetrieveModelMixin, CustomUpdateModelMixin):
+
+class NoteDetail(NoteResponseCacheMixin, AsyncCustomGenericAPIView, CustomRetrieveModelMixin, CustomUpdateModelMixin):
     queryset = Note.objects.all()
     serializer_class = NoteSerializer
     permission_classes = (CanReadOrUpdateNote,)
 
-    def get(self, request, *args, **kwargs):
-        return self.retrieve(request, *args, **kwargs)
+    def get_queryset(self):
+        # Fetch the note along with the access of the current user, The note is still fetched regardless
+        # of the access so that a missing note (404) can be told apart from a forbidden one (403).
+        return super().get_queryset().with_access(self.request.user.id)
+
+    async def aget_object(self):
+        self.note = await super().aget_object()
+        return self.note
+
+    def get_etag(self, key: str | None, version) -> str:
+        # The version of the note is its ETag, So that it can be sent back via If-Match to update the note
+        return f'"{version}"'
+
+    def get_expected_version(self) -> int | None:
+        """
+        Return the version of the note which is expected by the If-Match header, Else None if any version matches.
+
+        A malformed or a weak ETag can never match, So the update is rejected with a 412 in that case.
+        """
+
+        if_match = self.request.headers.get("If-Match", "").strip()
+        if not if_match or if_match == "*":
+            return None
+
+        try:
+            return int(if_match.strip('"'))
+        except ValueError:
+            return 0
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["expected_version"] = self.get_expected_version()
+        return context
+
+    async def get(self, request, *args, **kwargs):
+        return await self.aget_response(request, self.aretrieve_note, *args, **kwargs)
+
+    async def aretrieve_note(self, request, *args, **kwargs):
+        # The If-None-Match is checked against the fetched note as well, So that a client gets a 304 without the
+        # note being serialized whether or not the responses are cached
+        note = await self.aget_object()
+        etag = self.get_etag(key=None, version=note.version)
+
+        if self.is_not_modified(etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        return success_response(data=self.get_serializer(note).data)
 
-    @transaction.atomic
-    def put(self, request, *args, **kwargs):
-        return self.update(request, *args, **kwargs)
+    def get_serializer_class(self):
+        if self.request.method == "PATCH":
+            return NotePatchSerializer
+        return super().get_serializer_class()
 
+    async def put(self, request, *args, **kwargs):
+        # The note update & its version history record are written atomically by the serializer, The update is only
+        # applied if the note is still at the version given via If-Match (if any), Else a 412 is returned.
+        try:
+            response = await self.aupdate(request, *args, **kwargs)
+        except PreconditionFailed as e:
+            return error_response(message=e.detail, status_code=e.status_code)
 
-class ShareNote(CustomAPIView):
-    @transaction.atomic
-    def post(self, request: Request):
-        # Fetch the note object with the given ID
-        note = Note.objects.filter(owner_id=request.user.id, id=request.data["note_id"]).first()
-        if not note:
+        response["ETag"] = self.get_etag(key=None, version=response.data["data"]["version"])
+        return response
+
+    async def patch(self, request, *args, **kwargs):
+        # Same as PUT, But the description is changed by an edit script against the base version of the note. See
+        # `NotePatchSerializer`, A 409 is returned if the script does not apply to the description.
+        try:
+            return await self.put(request, *args, **kwargs)
+        except PatchConflict as e:
+            return error_response(message=e.detail, status_code=e.status_code)
+
+
+class ShareNote(AsyncCustomAPIView):
+    """
+    Share the note with the given `usernames` via POST, Or remove their note shares via DELETE. The usernames are
+    passed either as an array or as a JSON encoded array, And `permission` is either "write" (default) or "read".
+
+    Each of them is applied with a single statement, See `api.sharing`. If any of the usernames does not exist
+    nothing is applied, And those usernames are listed in the errors.
+    """
+
+    def get_share_params(self, request: Request) -> tuple[uuid.UUID, list[str]] | Response:
+        """
+        Return the note ID & the usernames which are passed in the request, Else the error response.
+        """
+
+        try:
+            note_id = uuid.UUID(str(request.data.get("note_id")))
+        except ValueError:
             return error_response(message=strings.INVALID_NOTE_ID)
 
-        # Parse the usernames array
-        usernames: list[str] = json.loads(request.data["usernames"])
-        users = User.objects.filter(username__in=usernames)
+        usernames = request.data.get("usernames")
+        if isinstance(usernames, str):
+            try:
+                usernames = json.loads(usernames)
+            except ValueError:
+                usernames = None
+
+        if not usernames or not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+            return error_response(message=strings.INVALID_USERNAMES)
 
         # Check if current user username is preasent in the usernames array
         if str(request.user.username) in usernames:
             return error_response(message=strings.CURRENT_USERNAME_ERROR)
 
-        # Check if user exist w.r.t to each username that is passed
-        if len(usernames) != users.count():
-            return error_response(message=strings.INVALID_USER_IDS)
+        return note_id, usernames
+
+    async def aapply(self, request: Request, apply, message: str, event_type: str, **kwargs) -> Response:
+        params = self.get_share_params(request)
+        if isinstance(params, Response):
+            return params
+
+        note_id, usernames = params
+        result = await sync_to_async(apply)(request.user.id, note_id, usernames, **kwargs)
+
+        if not result.is_owner:
+            return error_response(message=strings.INVALID_NOTE_ID)
+
+        if result.invalid_usernames:
+            return error_response(message=strings.INVALID_USER_IDS, errors={"usernames": result.invalid_usernames})
 
-        # Associate given users with the note
-        note.shared_with.add(*users)
+        # Drop the cached access of the users whose note share has changed, Along with the cached responses of the note
+        await ainvalidate_note_access(note_id, result.user_ids.values())
+        await ainvalidate_note_responses([note_id])
 
-        return success_response(data=usernames, message=strings.SHARE_NOTE_SUCCESS)
+        # The share is already committed, So the event is sent right away
+        await sync_to_async(events.publish_note_shared)(event_type, note_id, result.user_ids.values(), **kwargs)
 
+        return success_response(data=usernames, message=message)
 
-class VersionHisotryList(CustomGenericAPIView, CustomListModelMixin):
-    queryset = VersionHistory.objects.select_related("user", "note")
+    async def post(self, request: Request):
+        permission = request.data.get("permission", NoteShare.Permission.WRITE)
+        if permission not in NoteShare.Permission.values:
+            return error_response(message=strings.INVALID_SHARE_PERMISSION)
+
+        return await self.aapply(
+            request, sharing.share_note, strings.SHARE_NOTE_SUCCESS, events.NOTE_SHARED, permission=permission
+        )
+
+    async def delete(self, request: Request):
+        return await self.aapply(request, sharing.unshare_note, strings.UNSHARE_NOTE_SUCCESS, events.NOTE_UNSHARED)
+
+
+class VersionHisotryList(NoteResponseCacheMixin, AsyncCustomGenericAPIView, CustomListModelMixin):
+    """
+    Pass `compact=true` to get the compact response, Where the note is sent once at the top, The users are
+    deduplicated and each version references its user by the username. Along with that `old_description=false`
+    leaves out the old description of each version.
+    """
+
+    queryset = VersionHistory.objects.defer("snapshot", "delta", "search_vector")
     serializer_class = VersionHistorySerializer
+    permission_classes = (CanReadOrUpdateNote,)
+    pagination_class = KeysetPagination
+    note_url_kwarg = "note_id"
+    page = None
+
+    def is_enabled(self, param: str, default: bool) -> bool:
+        value = self.request.query_params.get(param)
+        return default if value is None else value.lower() in ("1", "true")
+
+    def is_compact(self) -> bool:
+        return self.is_enabled("compact", default=False)
 
     def get_queryset(self):
         # Filter the version hisotry records based on the given note_id
-        return super().get_queryset().filter(note_id=self.kwargs["note_id"])
+        queryset = super().get_queryset().filter(note_id=self.kwargs["note_id"])
+
+        # The compact response fetches the note only once, Instead of joining it on every version
+        if self.is_compact():
+            return queryset.select_related("user")
+        return queryset.select_related("user", "note").defer("note__search_vector")
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return CompactVersionHistorySerializer
+        return super().get_serializer_class()
+
+    def get_serializer(self, *args, **kwargs):
+        if self.is_compact():
+            kwargs["omit_old_description"] = not self.is_enabled("old_description", default=True)
+        return super().get_serializer(*args, **kwargs)
+
+    async def aget_note(self) -> Note:
+        """
+        Return the note of the version history, Else raise a 404 if it does not exist or a 403 if the current user
+        has no access to it. Same as `NoteDetail`, The access is fetched along with the note.
+        """
+
+        queryset = Note.objects.with_access(self.request.user.id)
+
+        try:
+            note = await queryset.aget(id=self.kwargs["note_id"])
+        except (Note.DoesNotExist, ValueError, ValidationError):
+            raise Http404
+
+        await self.acheck_object_permissions(self.request, note)
+
+        return note
+
+    async def apaginate_queryset(self, queryset):
+        self.page = await super().apaginate_queryset(queryset)
+
+        # Rebuild the old & new descriptions of the page from the stored deltas
+        await history.arestore_descriptions(self.page)
+
+        return self.page
+
+    def is_cached(self) -> bool:
+        # The version history which is written behind is dropped from the cache by the outbox consumer, Which only
+        # reaches the cache of the other processes if it is shared
+        return not (settings.VERSION_HISTORY_WRITE_BEHIND and is_process_local(RESPONSE_CACHE))
+
+    async def get(self, request, *args, **kwargs):
+        if not self.is_cached():
+            return await self.alist_versions(request, *args, **kwargs)
+        return await self.aget_response(request, self.alist_versions, *args, **kwargs)
+
+    async def alist_versions(self, request, *args, **kwargs):
+        # Fetched before the page, Every version history write also updates the note so the state of the note covers
+        # its version history as well (see `NoteResponseCacheMixin`)
+        self.note = await self.aget_note()
+        response = await self.alist(request, *args, **kwargs)
+
+        if self.is_compact():
+            users = dict.fromkeys(version.user for version in self.page)
+
+            response.data["note"] = NoteSerializer(self.note).data
+            response.data["users"] = UserSerializer(users, many=True).data
 
-    def get(self, request, *args, **kwargs):
-        return self.list(request, *args, **kwargs)
+        return response
@@ -0,0 +1,158 @@
+"""
+Benchmark of the version history coalescing (`VERSION_HISTORY_COALESCE_WINDOW`) under autosaving clients.
+
+Simulates editing sessions of notes where the editor autosaves every few seconds, Some of the autosaves do not
+change the description (the user has paused). Each autosave is applied the same way as a PUT of the note detail
+(`NoteSerializer.update` in its own transaction). The clock is simulated, So the sessions & the pauses between
+them do not take real time.
+
+Reports for each coalescing window the version history rows, The tuples (heap) & index entries which are written
+to the notes & version history tables and the WAL bytes which are written by the autosaves. The latter being the
+write I/O of the database, Since every written page goes through the WAL.
+
+    python benchmarks/coalescing.py --notes 20 --sessions 4 --autosaves 30 --windows 0 60
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "generic_notes.settings")
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import override_settings  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from api.models import Note, VersionHistory  # noqa: E402
+from api.serializers import NoteSerializer  # noqa: E402
+from version_history import WORDS, edit  # noqa: E402
+
+
+class Clock:
+    def __init__(self):
+        self.now = timezone.now()
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+
+def get_write_stats() -> dict:
+    """
+    Return the WAL position along with the tuples which are written to the notes & version history tables so far.
+    """
+
+    with connection.cursor() as cursor:
+        # The statistics of the backend are flushed once it is idle, Right away after this call
+        cursor.execute("SELECT pg_stat_force_next_flush()")
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            """
+            SELECT
+                pg_wal_lsn_diff(pg_current_wal_insert_lsn(), '0/0'),
+                sum(n_tup_ins), sum(n_tup_upd), sum(n_tup_hot_upd), sum(n_tup_del)
+            FROM pg_stat_user_tables WHERE relname IN (%s, %s)
+            """,
+            [Note._meta.db_table, VersionHistory._meta.db_table],
+        )
+        wal, inserted, updated, hot_updated, deleted = map(int, cursor.fetchone())
+
+    return {"wal_bytes": wal, "tuples": inserted + updated + deleted, "index_writes": inserted + updated - hot_updated}
+
+
+def run(args, window: float) -> dict:
+    random.seed(args.seed)
+    clock = Clock()
+
+    user = User.objects.create_user(username=f"coalescing_bench_{os.getpid()}_{int(window)}", password="!")
+    notes = Note.objects.bulk_create(
+        [Note(owner=user, description=" ".join(random.choices(WORDS, k=args.size // 6))) for _ in range(args.notes)]
+    )
+    request = SimpleNamespace(user=user)
+
+    autosaves = noops = 0
+    start_stats = get_write_stats()
+    started = time.perf_counter()
+
+    try:
+        with override_settings(VERSION_HISTORY_COALESCE_WINDOW=window), mock.patch("django.utils.timezone.now", clock):
+            for _ in range(args.sessions):
+                for _ in range(args.autosaves):
+                    clock.advance(args.interval * random.uniform(0.5, 1.5))
+
+                    for note in notes:
+                        description = note.description
+                        if random.random() >= args.noop_ratio:
+                            description = edit(description, args.size)
+                        else:
+                            noops += 1
+
+                        serializer = NoteSerializer(
+                            note, data={"description": description}, context={"request": request}
+                        )
+                        serializer.is_valid(raise_exception=True)
+                        transaction.atomic(serializer.save)()
+                        autosaves += 1
+
+                # The user leaves the note, The next session starts well after the window
+                clock.advance(args.pause)
+
+        elapsed = time.perf_counter() - started
+        stats = get_write_stats()
+        rows = VersionHistory.objects.filter(note__owner=user).count()
+    finally:
+        user.delete()
+
+    return {
+        "autosaves": autosaves,
+        "noops": noops,
+        "rows": rows,
+        **{name: value - start_stats[name] for name, value in stats.items()},
+        "elapsed": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20)
+    parser.add_argument("--sessions", type=int, default=4, help="Number of editing sessions of each note")
+    parser.add_argument("--autosaves", type=int, default=30, help="Number of autosaves of each session")
+    parser.add_argument("--interval", type=float, default=5, help="Average seconds between the autosaves")
+    parser.add_argument("--pause", type=float, default=3600, help="Seconds between the sessions")
+    parser.add_argument("--noop-ratio", type=float, default=0.3, help="Fraction of the autosaves without a change")
+    parser.add_argument("--size", type=int, default=1500, help="Approximate size of the note description")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 60], help="Coalescing windows in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {window: run(args, window) for window in args.windows}
+    # Each of the no-op autosaves used to write the note & a version history record, They are skipped now
+    baseline = results[args.windows[0]]
+
+    for window, result in results.items():
+        print(
+            f"window={window:>5.0f}s: autosaves={result['autosaves']} "
+            f"no-ops={result['noops']} (skipped tuple writes={result['noops'] * 2}) "
+            f"rows={result['rows']} ({result['rows'] / baseline['rows']:.1%}) "
+            f"tuple writes={result['tuples']} ({result['tuples'] / baseline['tuples']:.1%}) "
+            f"index writes={result['index_writes']} ({result['index_writes'] / baseline['index_writes']:.1%}) "
+            f"wal={result['wal_bytes'] / 1024:.0f}KiB ({result['wal_bytes'] / baseline['wal_bytes']:.1%}) "
+            f"time={result['elapsed']:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
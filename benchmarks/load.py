@@ -0,0 +1,273 @@
+"""
+Load benchmark for the notes API.
+
+Starts the ASGI application under gunicorn with the given number of `UvicornWorker` processes and drives
+note detail & version history reads with many concurrent keep-alive connections, Then reports the
+throughput and latency percentiles.
+
+To compare the sync and async request path at matching worker counts, Checkout the revision to compare
+against in a separate directory and pass it with `--baseline`, e.g.
+
+    git worktree add ../generic-notes-sync <sync-revision>
+    python benchmarks/load.py --workers 2 --concurrency 64 --baseline ../generic-notes-sync
+
+Pass `--logins N` to keep N more connections busy with logins during the run, So that the impact of the password
+hashing on the note traffic can be measured. The login latency & the number of rejected (429) logins are reported
+separately from the note reads.
+
+A baseline can also be the same checkout with different settings, e.g. without the connection pool
+
+    python benchmarks/load.py --baseline-env DB_POOL_ENABLED=false --baseline-env DB_CONN_MAX_AGE=0
+
+Both applications must point to the same database (see `.env`) and have their migrations applied.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+class Client:
+    """
+    Minimal HTTP/1.1 client over a single keep-alive connection, So that the load generator itself
+    does not become the bottleneck.
+    """
+
+    def __init__(self, host: str, port: int, token: str | None = None):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer:
+            self.writer.close()
+            await self.writer.wait_closed()
+
+    async def request(self, method: str, path: str, data: dict | None = None) -> tuple[int, dict]:
+        body = json.dumps(data).encode() if data is not None else b""
+        headers = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+
+        self.writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        status_code = int(status_line.split()[1])
+
+        headers = dict()
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            payload = await self.read_chunked()
+        else:
+            content_length = int(headers.get("content-length", 0))
+            payload = await self.reader.readexactly(content_length) if content_length else b""
+
+        return status_code, json.loads(payload) if payload else {}
+
+    async def read_chunked(self) -> bytes:
+        # The responses without a Content-Length header (e.g. without the `CommonMiddleware`) are sent in chunks
+        chunks = list()
+        while size := int((await self.reader.readline()).split(b";")[0], 16):
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+        # Trailing CRLF of the last chunk
+        await self.reader.readline()
+        return b"".join(chunks)
+
+
+async def setup_data(host: str, port: int) -> tuple[str, str, str]:
+    """
+    Create a user & a note with a few revisions via the API, Returns the username, The access token and the note ID.
+    """
+
+    client = Client(host, port)
+    await client.connect()
+
+    username = f"bench_{uuid.uuid4().hex[:12]}"
+    _, response = await client.request("POST", "/api/v1/singup/", {"username": username, "password": "1234"})
+    client.token = response["data"]["access"]
+
+    _, response = await client.request("POST", "/api/v1/notes/create/", {"description": "Lorem Ipsum"})
+    note_id = response["data"]["id"]
+
+    for i in range(10):
+        await client.request("PUT", f"/api/v1/notes/{note_id}/", {"description": f"Lorem Ipsum {i}"})
+
+    await client.close()
+    return username, client.token, note_id
+
+
+def get_stats(latencies: list[float]) -> dict:
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {"p50_ms": quantiles[49] * 1000, "p99_ms": quantiles[98] * 1000}
+
+
+async def run_load(host: str, port: int, concurrency: int, total: int, logins: int = 0) -> dict:
+    username, token, note_id = await setup_data(host, port)
+    paths = (f"/api/v1/notes/{note_id}/", f"/api/v1/notes/version-history/{note_id}/")
+
+    latencies: list[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+
+        client = Client(host, port, token)
+        await client.connect()
+
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            status_code, _ = await client.request("GET", paths[remaining % len(paths)])
+            latencies.append(time.perf_counter() - start)
+
+            if status_code != 200:
+                errors += 1
+
+        await client.close()
+
+    login_latencies: list[float] = []
+    login_rejected = 0
+
+    async def login_worker():
+        nonlocal login_rejected
+
+        client = Client(host, port)
+        await client.connect()
+
+        while remaining > 0:
+            start = time.perf_counter()
+            status_code, _ = await client.request("POST", "/api/v1/login/", {"username": username, "password": "1234"})
+            login_latencies.append(time.perf_counter() - start)
+
+            if status_code == 429:
+                login_rejected += 1
+
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)), *(login_worker() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        **get_stats(latencies),
+        "logins": len(login_latencies),
+        "logins_rejected": login_rejected,
+        "login_p50_ms": get_stats(login_latencies)["p50_ms"] if login_latencies else 0.0,
+    }
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+
+    async def probe():
+        _, writer = await asyncio.open_connection(host, port)
+        writer.close()
+
+    while time.monotonic() < deadline:
+        try:
+            asyncio.run(probe())
+            return
+        except OSError:
+            time.sleep(0.2)
+
+    raise TimeoutError(f"Server did not start listening on {host}:{port}")
+
+
+@contextmanager
+def serve(app_dir: Path, workers: int, host: str, port: int, env: list[str]):
+    """
+    Run the ASGI application of the given checkout under gunicorn until the block exits, The environment is
+    given as a list of KEY=VALUE.
+    """
+
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "generic_notes.asgi:application",
+            "--workers", str(workers),
+            "--bind", f"{host}:{port}",
+            "--access-logfile", "/dev/null",
+        ],
+        cwd=app_dir,
+        env={
+            **os.environ,
+            "LOGLEVEL": "WARNING",
+            "WORKERS": str(workers),
+            **dict(variable.split("=", 1) for variable in env),
+        },
+    )
+
+    try:
+        wait_for_port(host, port)
+        yield server
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def benchmark(app_dir: Path, args, env: list[str]) -> dict:
+    with serve(app_dir, args.workers, args.host, args.port, env):
+        return asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests, args.logins))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--logins", type=int, default=0, help="Number of connections which keep logging in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--baseline", type=Path, help="Directory of another checkout to compare against")
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE environment of the current run")
+    parser.add_argument("--baseline-env", action="append", default=[], help="KEY=VALUE environment of the baseline run")
+    args = parser.parse_args()
+
+    results = {"current": benchmark(BASE_DIR, args, args.env)}
+    if args.baseline or args.baseline_env:
+        results["baseline"] = benchmark((args.baseline or BASE_DIR).resolve(), args, args.baseline_env)
+
+    print(f"workers={args.workers} concurrency={args.concurrency}")
+    for name, result in results.items():
+        print(
+            f"{name:>10}: {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.1f}ms  "
+            f"p99={result['p99_ms']:7.1f}ms  errors={result['errors']}/{result['requests']}"
+        )
+        if args.logins:
+            print(
+                f"{'':>10}  logins={result['logins']}  rejected={result['logins_rejected']}  "
+                f"login p50={result['login_p50_ms']:7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark of the connected clients which a single worker can push the note events to, See `api.events`.
+
+Starts the ASGI application under gunicorn with a single `UvicornWorker` (with the default `PostgresBroker`), Then
+for each step of `--clients` opens as many event streams which subscribe to the same note and updates the note
+`--updates` times. Reports for each step the time to open the streams, The memory of the worker, The latency of the
+updates while the streams are open and the time from an update until its event is received by the clients.
+
+    python benchmarks/note_events.py --clients 100 500 1000 2000 --updates 20
+
+Each client holds a socket in both the benchmark and the worker, Raise the open files limit (`ulimit -n`) for
+the larger steps.
+"""
+
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+from pathlib import Path
+
+from load import BASE_DIR, Client, serve, setup_data
+
+
+class EventStream:
+    """
+    Server-sent events of a single client, Over its own connection.
+    """
+
+    def __init__(self, host: str, port: int, token: str):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, note_id: str):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(
+            (
+                f"GET /api/v1/notes/events/?note_ids={note_id} HTTP/1.1\r\n"
+                f"Host: {self.host}\r\n"
+                f"Authorization: Bearer {self.token}\r\n\r\n"
+            ).encode()
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if int(status_line.split()[1]) != 200:
+            raise RuntimeError(f"Could not subscribe: {status_line!r}")
+
+        while await self.reader.readline() not in (b"\r\n", b""):
+            pass
+
+        # The comment which is sent once the client has subscribed
+        await self.read()
+
+    async def read(self) -> bytes:
+        # The stream is sent in chunks, Each chunk holds one or more events
+        size = int((await self.reader.readline()).split(b";")[0], 16)
+        chunk = await self.reader.readexactly(size)
+        await self.reader.readline()
+
+        return chunk
+
+    async def wait_for(self, marker: bytes) -> float:
+        while marker not in await self.read():
+            pass
+
+        return time.perf_counter()
+
+    def close(self):
+        self.writer.close()
+
+
+def get_worker_rss(server_pid: int) -> int:
+    """
+    Return the resident memory (in KiB) of the worker process of the given gunicorn master.
+    """
+
+    children = Path(f"/proc/{server_pid}/task/{server_pid}/children").read_text().split()
+    for line in Path(f"/proc/{children[0]}/status").read_text().splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1])
+
+    return 0
+
+
+def get_stats(values: list[float]) -> dict:
+    quantiles = statistics.quantiles(values, n=100) if len(values) > 1 else values * 99
+    return {"p50_ms": quantiles[49] * 1000, "p99_ms": quantiles[98] * 1000, "max_ms": max(values) * 1000}
+
+
+async def run_step(args, server_pid: int, token: str, note_id: str, clients: int) -> dict:
+    streams = [EventStream(args.host, args.port, token) for _ in range(clients)]
+
+    started = time.perf_counter()
+    # Connected in batches, So that the listen backlog of the worker does not overflow
+    for i in range(0, clients, 100):
+        await asyncio.gather(*(stream.connect(note_id) for stream in streams[i:i + 100]))
+    connect_time = time.perf_counter() - started
+    rss = get_worker_rss(server_pid)
+
+    writer = Client(args.host, args.port, token)
+    await writer.connect()
+
+    update_latencies: list[float] = []
+    delivery_latencies: list[float] = []
+    fanout_times: list[float] = []
+
+    try:
+        for i in range(args.updates):
+            waiters = [asyncio.ensure_future(stream.wait_for(b"event: note.updated")) for stream in streams]
+
+            start = time.perf_counter()
+            status_code, _ = await writer.request("PUT", f"/api/v1/notes/{note_id}/", {"description": f"Event {i}"})
+            update_latencies.append(time.perf_counter() - start)
+            if status_code != 200:
+                raise RuntimeError(f"Could not update the note: {status_code}")
+
+            received = await asyncio.wait_for(asyncio.gather(*waiters), timeout=60)
+            delivery_latencies.extend(at - start for at in received)
+            fanout_times.append(max(received) - start)
+    finally:
+        await writer.close()
+        for stream in streams:
+            stream.close()
+
+    return {
+        "clients": clients,
+        "connect_s": connect_time,
+        "rss_kib": rss,
+        "update": get_stats(update_latencies),
+        "delivery": get_stats(delivery_latencies),
+        "fanout": get_stats(fanout_times),
+    }
+
+
+async def run(args, server_pid: int) -> list[dict]:
+    _, token, note_id = await setup_data(args.host, args.port)
+
+    baseline_rss = get_worker_rss(server_pid)
+    results = list()
+
+    for clients in args.clients:
+        results.append(await run_step(args, server_pid, token, note_id, clients))
+        # Let the worker drop the closed streams before the next step
+        await asyncio.sleep(1)
+
+    for result in results:
+        result["rss_per_client_kib"] = (result["rss_kib"] - baseline_rss) / result["clients"]
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--updates", type=int, default=20, help="Number of updates of the note at each step")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE environment of the server")
+    args = parser.parse_args()
+
+    # Inherited by the server as well
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard_limit, hard_limit))
+
+    with serve(BASE_DIR, 1, args.host, args.port, args.env) as server:
+        results = asyncio.run(run(args, server.pid))
+
+    print(f"1 worker, open files limit={hard_limit}")
+    for result in results:
+        print(
+            f"clients={result['clients']:>6}: connect={result['connect_s']:6.2f}s "
+            f"rss={result['rss_kib'] / 1024:6.1f}MiB ({result['rss_per_client_kib']:5.1f}KiB/client) "
+            f"update p50={result['update']['p50_ms']:6.1f}ms p99={result['update']['p99_ms']:6.1f}ms "
+            f"delivery p50={result['delivery']['p50_ms']:6.1f}ms p99={result['delivery']['p99_ms']:6.1f}ms "
+            f"fan-out max={result['fanout']['max_ms']:6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmark of the note search.
+
+Seeds a corpus of notes spread over a number of users (once, The corpus is reused by the later runs) and reports
+the latency of the search queries which are run by `notes/search/`, i.e. The count & the first page of the
+results, For a few kinds of queries:
+
+    common     a frequent word, Which matches many notes of the user
+    rare       an infrequent word
+    phrase     two frequent words as a quoted phrase
+    substring  a part of a word, Which falls back to the substring match
+
+    python benchmarks/search.py --notes 1000000 --users 1000
+    python benchmarks/search.py --cleanup
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "generic_notes.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection  # noqa: E402
+
+from api import search  # noqa: E402
+from api.models import Note  # noqa: E402
+
+USERNAME_PREFIX = "search_bench_"
+
+
+def get_vocabulary(size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(random.choices(string.ascii_lowercase, k=random.randint(4, 10))))
+    return sorted(words)
+
+
+def seed(users: int, notes: int, vocabulary: list[str], batch_size: int = 10000):
+    # Zipf like distribution of the words, So that there are both frequent & infrequent words
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    created_users = User.objects.bulk_create(
+        [User(username=f"{USERNAME_PREFIX}{i}", password="!") for i in range(users)]
+    )
+    user_ids = [user.id for user in created_users]
+
+    for start in range(0, notes, batch_size):
+        Note.objects.bulk_create([
+            Note(
+                owner_id=user_ids[i % users],
+                description=" ".join(random.choices(vocabulary, weights=weights, k=random.randint(10, 60))),
+            )
+            for i in range(start, min(start + batch_size, notes))
+        ])
+        print(f"\rSeeded {min(start + batch_size, notes)}/{notes} notes", end="", flush=True)
+
+    print()
+
+    # Collect the statistics of the search vectors right away instead of waiting for the autovacuum, Otherwise
+    # the planner cannot tell the frequent words from the infrequent ones.
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE api_note")
+
+
+def measure(queryset, page_size: int) -> float:
+    start = time.perf_counter()
+    queryset.count()
+    list(queryset[:page_size])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries of each kind")
+    parser.add_argument("--page-size", type=int, default=settings.REST_FRAMEWORK["PAGE_SIZE"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded corpus and exit")
+    args = parser.parse_args()
+
+    users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    if args.cleanup:
+        users.delete()
+        return
+
+    random.seed(args.seed)
+    vocabulary = get_vocabulary(args.vocabulary)
+
+    if not users.exists():
+        seed(args.users, args.notes, vocabulary)
+
+    user_ids = list(users.values_list("id", flat=True))
+    queries = {
+        "common": lambda: random.choice(vocabulary[:10]),
+        "rare": lambda: random.choice(vocabulary[len(vocabulary) // 2:]),
+        "phrase": lambda: '"{} {}"'.format(*random.sample(vocabulary[:10], k=2)),
+        "substring": lambda: random.choice(vocabulary[:100])[1:4],
+    }
+
+    print(f"notes={Note.objects.filter(owner__in=users).count()} users={len(user_ids)}")
+    for name, get_query in queries.items():
+        latencies = []
+
+        for _ in range(args.queries):
+            user_id, query = random.choice(user_ids), get_query()
+
+            if name == "substring":
+                queryset = search.search_notes_by_substring(user_id, query)
+            else:
+                queryset = search.search_notes(user_id, query)
+
+            latencies.append(measure(queryset, args.page_size))
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        print(
+            f"{name:>10}: p50={quantiles[49] * 1000:7.2f}ms  p95={quantiles[94] * 1000:7.2f}ms  "
+            f"p99={quantiles[98] * 1000:7.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
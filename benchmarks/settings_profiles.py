@@ -0,0 +1,172 @@
+"""
+Benchmark of the default settings against the "api-only" settings profile (`generic_notes.settings_api`).
+
+Reports for each profile:
+
+    cold start   the time to import the ASGI application in a fresh interpreter, i.e. Django setup included
+    request      the in-process time of a note detail request which is served from the response cache,
+                 So that no query is run and the time is spent in the middleware, DRF & the view only
+
+Each measurement runs in its own interpreter, Since the settings can only be loaded once per process.
+
+    python benchmarks/settings_profiles.py --starts 20 --requests 5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    "default": ("generic_notes.settings", "generic_notes.asgi"),
+    "api-only": ("generic_notes.settings_api", "generic_notes.asgi_api"),
+}
+
+
+async def call(application, path: str, token: str) -> int:
+    """
+    Send a GET request directly to the ASGI application, Return the status code of the response.
+    """
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"127.0.0.1"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 12345),
+        "server": ("127.0.0.1", 8000),
+    }
+    status_code = None
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        # The client stays connected, Django cancels the wait for the disconnect once the response is sent
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await application(scope, receive, send)
+    return status_code
+
+
+def measure_requests(module: str, requests: int) -> dict:
+    """
+    Run in the interpreter of the profile, Return the latency of the cached note detail requests.
+    """
+
+    from importlib import import_module
+
+    application = import_module(module).application
+
+    from django.contrib.auth.models import User
+
+    from api.models import Note
+    from api.utils import get_auth_token
+
+    user = User.objects.create_user(username=f"profile_bench_{os.getpid()}", password="!")
+    note = Note.objects.create(owner=user, description="Lorem Ipsum")
+    token = get_auth_token(user)["access"]
+    path = f"/api/v1/notes/{note.id}/"
+
+    async def run() -> list[float]:
+        # Warm up the user & the response caches
+        assert await call(application, path, token) == 200
+
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await call(application, path, token)
+            latencies.append(time.perf_counter() - start)
+
+        return latencies
+
+    try:
+        latencies = asyncio.run(run())
+    finally:
+        user.delete()
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "mean_us": statistics.mean(latencies) * 1e6,
+        "p50_us": quantiles[49] * 1e6,
+        "p99_us": quantiles[98] * 1e6,
+    }
+
+
+def run_profile(settings_module: str, *args: str) -> dict:
+    """
+    Run the given python arguments in a fresh interpreter with the settings of the profile, Return the JSON which
+    is printed last.
+    """
+
+    output = subprocess.run(
+        [sys.executable, *args],
+        cwd=BASE_DIR,
+        env={**os.environ, "LOGLEVEL": "WARNING", "DJANGO_SETTINGS_MODULE": settings_module},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def measure_cold_start(settings_module: str, module: str, starts: int) -> dict:
+    code = (
+        "import json, time; start = time.perf_counter(); "
+        f"import {module}; "
+        "print(json.dumps({'seconds': time.perf_counter() - start}))"
+    )
+    timings = [run_profile(settings_module, "-c", code)["seconds"] for _ in range(starts)]
+
+    return {"median_ms": statistics.median(timings) * 1000, "min_ms": min(timings) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--starts", type=int, default=20, help="Number of cold starts of each profile")
+    parser.add_argument("--requests", type=int, default=5000, help="Number of requests of each profile")
+    parser.add_argument("--measure-requests", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child mode, Measures the requests in the interpreter of a profile
+    if args.measure_requests:
+        sys.path.insert(0, str(BASE_DIR))
+        print(json.dumps(measure_requests(args.measure_requests, args.requests)))
+        return
+
+    for name, (settings_module, module) in PROFILES.items():
+        cold_start = measure_cold_start(settings_module, module, args.starts)
+        request = run_profile(
+            settings_module, __file__, "--measure-requests", module, "--requests", str(args.requests)
+        )
+
+        print(
+            f"{name:>9}: cold start median={cold_start['median_ms']:7.1f}ms min={cold_start['min_ms']:7.1f}ms  "
+            f"request mean={request['mean_us']:7.1f}us p50={request['p50_us']:7.1f}us p99={request['p99_us']:7.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+"""
+Reproducible load benchmark of the notes API against stored baselines.
+
+Seeds a corpus of users, notes, note shares & deep version histories into the database (once, The corpus is reused
+by the later runs with the same parameters), Starts the ASGI application under gunicorn and drives a mix of the
+API operations with many concurrent keep-alive connections. Each connection is authenticated as a seeded user and
+picks its operations & notes from a seeded random generator, So each connection sends the same sequence of
+requests on every run.
+
+Reports the throughput, The p50/p95/p99 latency and the number of DB queries per request (read from the
+Prometheus metrics of the application, see `api.metrics`) for each operation:
+
+    python benchmarks/suite.py --scenario mixed
+
+The results can be stored as the baseline of the scenario (`benchmarks/baselines/<scenario>.json`), Later runs are
+compared against it and the process exits with 1 on a regression. The throughput & latency depend on the machine,
+So a baseline is only comparable with the runs on the same machine. The queries per request do not, They only
+vary slightly with the cache hits of the run.
+
+    python benchmarks/suite.py --scenario mixed --save-baseline
+    python benchmarks/suite.py --scenario mixed --tolerance 0.15
+
+The scenarios are the weights of the operations, See `SCENARIOS`. Pass `--cleanup` to delete the seeded corpus.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import urllib.request
+import uuid
+from hashlib import md5
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "generic_notes.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.contrib.auth.models import User  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from prometheus_client.parser import text_string_to_metric_families  # noqa: E402
+
+from api import history  # noqa: E402
+from api.models import Note, VersionHistory  # noqa: E402
+from api.utils import get_auth_token  # noqa: E402
+from load import Client, serve  # noqa: E402
+from version_history import WORDS, edit  # noqa: E402
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Allowed increase of the queries per request against the baseline
+QUERY_TOLERANCE = 0.1
+
+USERNAME_PREFIX = "suite_bench_"
+PASSWORD = "1234"
+
+# Weights of the operations of each scenario
+SCENARIOS = {
+    "read": {"detail": 50, "history": 25, "list": 15, "update": 5, "create": 3, "share": 2},
+    "write": {"update": 40, "create": 25, "detail": 20, "share": 10, "history": 5},
+    # The password hashing of a login or a signup costs as much CPU as hundreds of note reads, So they are rare
+    "mixed": {"detail": 35, "history": 15, "list": 10, "update": 20, "create": 10, "share": 8, "login": 1, "signup": 1},
+    "auth": {"login": 70, "signup": 30},
+}
+
+# The method & the URL name (i.e. The `view` label of the metrics) of each operation
+OPERATIONS = {
+    "signup": ("POST", "singup"),
+    "login": ("POST", "login"),
+    "create": ("POST", "create-note"),
+    "list": ("GET", "note-list"),
+    "detail": ("GET", "note-detail"),
+    "update": ("PUT", "note-detail"),
+    "share": ("POST", "share-note"),
+    "history": ("GET", "note-version-history"),
+}
+
+
+def get_description(rng: random.Random, size: int) -> str:
+    return " ".join(rng.choices(WORDS, k=size // 6))[:size]
+
+
+def seed(args):
+    """
+    Seed the corpus of the given parameters, See `get_corpus_params`.
+    """
+
+    rng = random.Random(args.seed)
+    # Hashing is slow by design, All the seeded users share the same password hash
+    password = make_password(PASSWORD)
+
+    users = User.objects.bulk_create(
+        [User(username=f"{get_corpus_prefix(args)}{i}", password=password) for i in range(args.users)]
+    )
+
+    for start in range(0, args.users, 50):
+        notes, shares, versions = [], [], []
+
+        for owner in users[start:start + 50]:
+            for _ in range(args.notes):
+                # A few of the notes have a deep version history, The rest only a few versions
+                depth = args.deep_versions if rng.random() < args.deep_ratio else rng.randint(0, args.versions)
+                shared_with = rng.sample(users, k=min(args.shares, len(users)))
+                shared_with = [user for user in shared_with if user.id != owner.id]
+
+                descriptions = [get_description(rng, args.size)]
+                for _ in range(depth):
+                    descriptions.append(edit(descriptions[-1], args.size))
+
+                note = Note(owner=owner, description=descriptions[-1], version=depth + 1)
+                notes.append(note)
+                shares.extend(Note.shared_with.through(note=note, user=user) for user in shared_with)
+
+                editors = [owner, *shared_with]
+                versions.extend(
+                    history.build_version(note, rng.choice(editors), old, new, sequence)
+                    for sequence, (old, new) in enumerate(zip(descriptions, descriptions[1:]), start=1)
+                )
+
+        with transaction.atomic():
+            Note.objects.bulk_create(notes)
+            Note.shared_with.through.objects.bulk_create(shares)
+            VersionHistory.objects.bulk_create(versions, batch_size=1000)
+
+        print(f"\rSeeded {min(start + 50, args.users)}/{args.users} users", end="", flush=True)
+
+    print()
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE api_note, api_note_shared_with, api_versionhistory, auth_user")
+
+
+def cleanup():
+    # Raw deletes, The ORM would fetch the whole corpus to cascade the deletes one model at a time
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE suite_users ON COMMIT DROP AS SELECT id FROM auth_user WHERE username LIKE %s",
+                       [f"{USERNAME_PREFIX}%"])
+        cursor.execute("CREATE TEMP TABLE suite_notes ON COMMIT DROP AS SELECT id FROM api_note WHERE owner_id IN "
+                       "(SELECT id FROM suite_users)")
+        cursor.execute("DELETE FROM api_versionhistory WHERE note_id IN (SELECT id FROM suite_notes) "
+                       "OR user_id IN (SELECT id FROM suite_users)")
+        cursor.execute("DELETE FROM api_note_shared_with WHERE note_id IN (SELECT id FROM suite_notes) "
+                       "OR user_id IN (SELECT id FROM suite_users)")
+        cursor.execute("DELETE FROM api_note WHERE id IN (SELECT id FROM suite_notes)")
+        cursor.execute("DELETE FROM auth_user WHERE id IN (SELECT id FROM suite_users)")
+
+
+def get_corpus_params(args) -> dict:
+    return {
+        name: getattr(args, name)
+        for name in ("users", "notes", "shares", "versions", "deep_versions", "deep_ratio", "size", "seed")
+    }
+
+
+def get_corpus_prefix(args) -> str:
+    # The parameters of the corpus are part of the usernames, So that a corpus of other parameters is not reused
+    params = md5(json.dumps(get_corpus_params(args), sort_keys=True).encode()).hexdigest()[:8]
+    return f"{USERNAME_PREFIX}{params}_"
+
+
+def load_corpus(args) -> dict:
+    """
+    Return the seeded users along with their tokens and the notes which are visible to each of them, The corpus is
+    seeded first if it is missing or has been seeded with other parameters.
+    """
+
+    users = User.objects.filter(username__startswith=get_corpus_prefix(args))
+    if users.count() != args.users:
+        cleanup()
+        seed(args)
+
+    users = list(users.order_by("id"))
+    owned, visible = {user.id: [] for user in users}, {user.id: [] for user in users}
+
+    for note_id, owner_id in Note.objects.filter(owner__in=users).values_list("id", "owner_id"):
+        owned[owner_id].append(str(note_id))
+        visible[owner_id].append(str(note_id))
+
+    for note_id, user_id in Note.shared_with.through.objects.filter(user__in=users).values_list("note_id", "user_id"):
+        visible[user_id].append(str(note_id))
+
+    return {
+        "users": [
+            {
+                "username": user.username,
+                "token": get_auth_token(user)["access"],
+                "owned": sorted(owned[user.id]),
+                "visible": sorted(visible[user.id]),
+            }
+            for user in users
+        ],
+    }
+
+
+def get_request(operation: str, user: dict, usernames: list[str], rng: random.Random, size: int) -> tuple:
+    """
+    Return the (path, data) of a request of the given operation on behalf of the given user.
+    """
+
+    if operation == "signup":
+        # A new username on every run, Since the users which signed up in the previous runs are kept
+        return "/api/v1/singup/", {"username": f"{USERNAME_PREFIX}signup_{uuid.uuid4().hex}", "password": PASSWORD}
+    if operation == "login":
+        return "/api/v1/login/", {"username": user["username"], "password": PASSWORD}
+    if operation == "create":
+        return "/api/v1/notes/create/", {"description": get_description(rng, size)}
+    if operation == "list":
+        return "/api/v1/notes/", None
+    if operation == "share":
+        others = [username for username in rng.sample(usernames, k=3) if username != user["username"]]
+        return "/api/v1/notes/share/", {"note_id": rng.choice(user["owned"]), "usernames": json.dumps(others)}
+
+    note_id = rng.choice(user["visible"])
+    if operation == "history":
+        return f"/api/v1/notes/version-history/{note_id}/", None
+    if operation == "update":
+        return f"/api/v1/notes/{note_id}/", {"description": get_description(rng, size)}
+    return f"/api/v1/notes/{note_id}/", None
+
+
+def scrape_queries(host: str, port: int) -> dict:
+    """
+    Return the number of the requests & the DB queries so far, Keyed by the (view, method) of the metrics.
+    """
+
+    request = urllib.request.Request(f"http://{host}:{port}/metrics")
+    if settings.METRICS_TOKEN:
+        request.add_header("Authorization", f"Bearer {settings.METRICS_TOKEN}")
+
+    with urllib.request.urlopen(request) as response:
+        content = response.read().decode()
+
+    counts = dict()
+    for family in text_string_to_metric_families(content):
+        if family.name not in ("http_requests", "db_queries"):
+            continue
+
+        for sample in family.samples:
+            if not sample.name.endswith("_total"):
+                continue
+
+            key = (sample.labels["view"], sample.labels["method"])
+            requests, queries = counts.get(key, (0, 0))
+
+            if family.name == "http_requests":
+                counts[key] = (requests + sample.value, queries)
+            else:
+                counts[key] = (requests, queries + sample.value)
+
+    return counts
+
+
+async def run_scenario(args, corpus: dict) -> dict:
+    weights = SCENARIOS[args.scenario]
+    operations, operation_weights = list(weights), list(weights.values())
+    usernames = [user["username"] for user in corpus["users"]]
+
+    latencies = {operation: [] for operation in operations}
+    errors = {operation: 0 for operation in operations}
+    remaining = args.requests
+
+    async def worker(index: int):
+        nonlocal remaining
+
+        rng = random.Random(args.seed * 1000 + index)
+        user = corpus["users"][index % len(corpus["users"])]
+
+        client = Client(args.host, args.port, user["token"])
+        await client.connect()
+
+        while remaining > 0:
+            remaining -= 1
+
+            operation = rng.choices(operations, weights=operation_weights)[0]
+            method = OPERATIONS[operation][0]
+            path, data = get_request(operation, user, usernames, rng, args.size)
+
+            start = time.perf_counter()
+            status_code, _ = await client.request(method, path, data)
+            latencies[operation].append(time.perf_counter() - start)
+
+            if status_code >= 400:
+                errors[operation] += 1
+
+        await client.close()
+
+    before = scrape_queries(args.host, args.port)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(index) for index in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    after = scrape_queries(args.host, args.port)
+
+    def get_queries_per_request(operation: str) -> float | None:
+        method, view = OPERATIONS[operation]
+        requests_before, queries_before = before.get((view, method), (0, 0))
+        requests_after, queries_after = after.get((view, method), (0, 0))
+
+        requests = requests_after - requests_before
+        return (queries_after - queries_before) / requests if requests else None
+
+    all_latencies = [latency for operation in operations for latency in latencies[operation]]
+    results = {"total": {"requests": len(all_latencies), "rps": len(all_latencies) / elapsed,
+                         "errors": sum(errors.values()), **get_percentiles(all_latencies)}}
+
+    for operation in operations:
+        results[operation] = {
+            "requests": len(latencies[operation]),
+            "errors": errors[operation],
+            **get_percentiles(latencies[operation]),
+            "queries_per_request": get_queries_per_request(operation),
+        }
+
+    return results
+
+
+def get_percentiles(latencies: list[float]) -> dict:
+    if len(latencies) < 2:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": quantiles[49] * 1000, "p95_ms": quantiles[94] * 1000, "p99_ms": quantiles[98] * 1000}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """
+    Return the regressions of the results against the baseline.
+    """
+
+    regressions = list()
+
+    if results["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['total']['rps']:.1f} -> {results['total']['rps']:.1f} req/s")
+
+    for operation, result in results.items():
+        expected = baseline.get(operation)
+        if expected is None:
+            continue
+
+        if result["p95_ms"] and expected["p95_ms"] and result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{operation} p95 {expected['p95_ms']:.1f} -> {result['p95_ms']:.1f}ms")
+
+        queries, expected_queries = result.get("queries_per_request"), expected.get("queries_per_request")
+        # The queries only vary with the cache hits of the run, So a query more than the baseline is a regression
+        if queries is not None and expected_queries is not None and queries > expected_queries + QUERY_TOLERANCE:
+            regressions.append(f"{operation} queries/request {expected_queries:.2f} -> {queries:.2f}")
+
+    return regressions
+
+
+def print_results(args, results: dict):
+    print(f"scenario={args.scenario} workers={args.workers} concurrency={args.concurrency}")
+    print(f"{'total':>8}: {results['total']['rps']:8.1f} req/s  errors={results['total']['errors']}"
+          f"/{results['total']['requests']}")
+
+    for operation, result in results.items():
+        if operation == "total" or not result["requests"]:
+            continue
+
+        queries = result["queries_per_request"]
+        print(
+            f"{operation:>8}: n={result['requests']:<6} p50={result['p50_ms'] or 0:7.1f}ms  "
+            f"p95={result['p95_ms'] or 0:7.1f}ms  p99={result['p99_ms'] or 0:7.1f}ms  "
+            f"queries/req={'-' if queries is None else f'{queries:.2f}'}  errors={result['errors']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, default="mixed")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE environment of the application")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown against the baseline")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the seeded corpus and exit")
+
+    corpus = parser.add_argument_group("corpus")
+    corpus.add_argument("--users", type=int, default=200)
+    corpus.add_argument("--notes", type=int, default=10, help="Number of notes per user")
+    corpus.add_argument("--shares", type=int, default=3, help="Number of users each note is shared with")
+    corpus.add_argument("--versions", type=int, default=5, help="Maximum number of versions of a note")
+    corpus.add_argument("--deep-versions", type=int, default=200, help="Number of versions of a deep note")
+    corpus.add_argument("--deep-ratio", type=float, default=0.05, help="Fraction of the notes which are deep")
+    corpus.add_argument("--size", type=int, default=500, help="Approximate size of the note description")
+    args = parser.parse_args()
+
+    if args.cleanup:
+        cleanup()
+        return
+
+    corpus = load_corpus(args)
+
+    with serve(BASE_DIR, args.workers, args.host, args.port, args.env):
+        results = asyncio.run(run_scenario(args, corpus))
+
+    print_results(args, results)
+
+    baseline_path = BASELINE_DIR / f"{args.scenario}.json"
+    config = {name: getattr(args, name) for name in ("workers", "concurrency", "requests", "env")}
+    config["corpus"] = get_corpus_params(args)
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"Saved the baseline to {baseline_path.relative_to(BASE_DIR)}")
+        return
+
+    if not baseline_path.exists():
+        return
+
+    baseline = json.loads(baseline_path.read_text())
+    if baseline["config"] != config:
+        print(f"The baseline has been recorded with another configuration: {baseline['config']}")
+        return
+
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the compact version history format.
+
+Simulates editing sessions of notes (small insertions, deletions & rewrites of words) and reports the
+stored bytes per edit of the full old/new description copies against the snapshot + delta format,
+Along with the latency of rebuilding a page of version history records from the stored deltas.
+
+    python benchmarks/version_history.py --edits 1000 --size 1500
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import django
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "generic_notes.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+from api import delta, history  # noqa: E402
+
+WORDS = "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore".split()
+
+
+def edit(description: str, size: int) -> str:
+    words = description.split(" ")
+    position = random.randrange(len(words) + 1)
+    action = random.random()
+
+    if action < 0.6 or len(description) < size // 2:
+        words[position:position] = random.choices(WORDS, k=random.randint(1, 5))
+    elif action < 0.8:
+        del words[position:position + random.randint(1, 5)]
+    else:
+        words[position:position + 1] = [random.choice(WORDS)]
+
+    return " ".join(words)[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edits", type=int, default=1000)
+    parser.add_argument("--size", type=int, default=1500, help="Approximate size of the note description")
+    parser.add_argument("--page-size", type=int, default=settings.REST_FRAMEWORK["PAGE_SIZE"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    interval = settings.VERSION_HISTORY_SNAPSHOT_INTERVAL
+
+    descriptions = [" ".join(random.choices(WORDS, k=args.size // 6))[:args.size]]
+    for _ in range(args.edits):
+        descriptions.append(edit(descriptions[-1], args.size))
+
+    full_bytes = 0
+    chain = []
+
+    for sequence, (old, new) in enumerate(zip(descriptions, descriptions[1:]), start=1):
+        full_bytes += len(old.encode()) + len(new.encode())
+        snapshot = delta.compress(old) if (sequence - 1) % interval == 0 else None
+        chain.append((sequence, snapshot, delta.encode_delta(old, new)))
+
+    compact_bytes = sum(len(change) + len(snapshot or b"") for _, snapshot, change in chain)
+
+    # Rebuild random pages the same way the API does, Replaying from the closest snapshot
+    latencies = []
+    for _ in range(200):
+        last = random.randint(args.page_size, args.edits)
+        first = last - args.page_size + 1
+        start_index = ((first - 1) // interval) * interval
+
+        started = time.perf_counter()
+        versions = history.replay_chain(chain[start_index:last])
+        latencies.append(time.perf_counter() - started)
+
+        assert versions[last][1] == descriptions[last]
+
+    print(f"edits={args.edits} description~{args.size} chars snapshot_interval={interval}")
+    print(f"full copies : {full_bytes / args.edits:8.1f} bytes/edit")
+    print(f"delta format: {compact_bytes / args.edits:8.1f} bytes/edit ({full_bytes / compact_bytes:.1f}x smaller)")
+    print(
+        f"rebuild page of {args.page_size}: p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"max={max(latencies) * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
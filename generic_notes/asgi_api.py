@@ -0,0 +1,13 @@
+"""
+ASGI entry point of the "api-only" deployment profile, See `generic_notes.settings_api`.
+
+    gunicorn generic_notes.asgi_api:application
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "generic_notes.settings_api")
+
+application = get_asgi_application()
@@ -0,0 +1,23 @@
+"""
+PostgreSQL backend which returns the closed connections to a per-process pool instead of closing them.
+
+The pool is configured via the `POOL` key of the database settings, See `ConnectionPool` for the options.
+"""
+
+from django.db.backends.postgresql import base
+
+from generic_notes.db.postgresql.creation import DatabaseCreation
+from generic_notes.db.postgresql.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(conn_params, self.settings_dict.get("POOL", {}))
+        return self.pool.getconn(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+
+    def _close(self):
+        if self.connection is not None:
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection)
@@ -0,0 +1,10 @@
+from django.db.backends.postgresql import creation
+
+from generic_notes.db.postgresql.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # The pooled connections to the test database must be closed before it can be dropped
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Bounded pool of database connections which is shared by all the threads of a process.
+
+    At most `max_size` connections are open at the same time, A checkout waits up to `timeout` seconds for a
+    connection to be returned once the pool is exhausted. A connection which has been idle for more than
+    `check_after` seconds is health checked before being handed out, And connections older than `max_lifetime`
+    seconds are closed instead of being reused.
+    """
+
+    def __init__(self, max_size: int, timeout: float = 30, check_after: float = 30, max_lifetime: float = 3600):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_lifetime = max_lifetime
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._created_at = dict()
+
+    def getconn(self, connect: Callable[[], Any]):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(f"Could not get a database connection from the pool within {self.timeout} seconds")
+
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, returned_at = self._idle.pop()
+
+                if self._is_usable(connection, returned_at):
+                    return connection
+
+                self._close(connection)
+
+            connection = connect()
+            self._created_at[id(connection)] = time.monotonic()
+            return connection
+
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection):
+        try:
+            if connection.closed or self._is_expired(connection):
+                self._close(connection)
+                return
+
+            status = connection.info.transaction_status
+            if status in (extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_INERROR):
+                connection.rollback()
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                # The connection is either lost or in the middle of a query
+                self._close(connection)
+                return
+
+            with self._lock:
+                self._idle.append((connection, time.monotonic()))
+
+        except Exception:
+            logger.exception("Discarding the database connection which could not be returned to the pool")
+            self._close(connection)
+
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """
+        Close all the idle connections of the pool, The checked out connections are closed once they are returned.
+        """
+
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _is_expired(self, connection) -> bool:
+        created_at = self._created_at.get(id(connection), 0)
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def _is_usable(self, connection, returned_at: float) -> bool:
+        if connection.closed or self._is_expired(connection):
+            return False
+
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+            # Do not leave the health check transaction open when the connection is not in autocommit mode
+            if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+
+            return True
+        except Exception:
+            return False
+
+    def _close(self, connection):
+        self._created_at.pop(id(connection), None)
+
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pools: dict[str, ConnectionPool] = dict()
+_pools_lock = threading.Lock()
+
+
+def get_pool(conn_params: dict, options: dict) -> ConnectionPool:
+    # A separate pool is kept per set of connection parameters, e.g. the test runner connects to the
+    # "postgres" database along with the main database.
+    key = repr(sorted(conn_params.items()))
+
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(**options)
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
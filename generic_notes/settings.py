@@ -1,6 +1,7 @@
 import os
 import datetime
 import logging
+import multiprocessing
 from pathlib import Path
 
 from django.utils.log import DEFAULT_LOGGING
@@ -25,12 +26,15 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     "api",
     "rest_framework",
 ]
 
 MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.PrometheusMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -59,18 +63,82 @@ TEMPLATES = [
 ]
 
 # Database
+# Each gunicorn worker keeps its own pool of connections, The pool size is derived from the number of workers
+# and the connections the application may open in total. So that the total stays under the `max_connections`
+# of the Postgres server (minus the connections reserved for the admin & maintenance tasks) as the workers scale.
+WORKERS = int(os.getenv("WORKERS", multiprocessing.cpu_count() * 2))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 90))
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "true").lower() == "true"
+
 DATABASES = {
     "default": {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'generic_notes.db.postgresql' if DB_POOL_ENABLED else 'django.db.backends.postgresql',
         'NAME': os.getenv("DB_NAME"),
         'USER': os.getenv("DB_USER"),
         'PASSWORD': os.getenv("DB_PASSWORD"),
         'HOST': os.getenv("DB_HOST"),
-        'PORT': "5432"
+        'PORT': "5432",
+        # With the pool enabled, The connections are returned to the pool at the end of each request.
+        # Otherwise the connections are persisted on the thread for the given number of seconds.
+        'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", 0 if DB_POOL_ENABLED else 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL': {
+            'max_size': max(1, DB_MAX_CONNECTIONS // WORKERS),
+            'timeout': float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            'check_after': float(os.getenv("DB_POOL_CHECK_AFTER", 30)),
+            'max_lifetime': float(os.getenv("DB_POOL_MAX_LIFETIME", 3600)),
+        },
     }
 }
 
 
+# Cache
+# The note access cache is kept in the process memory by default, Set the backend & location to a shared
+# cache (e.g. redis) to share it between the workers.
+NOTE_ACCESS_CACHE_BACKEND = os.getenv("NOTE_ACCESS_CACHE_BACKEND", "api.cache.LocMemCache")
+# The responses are not cached by default, Since a cached response is only dropped by the process which writes the
+# note. Set a shared cache (e.g. redis) to enable it along with a shared note access cache, The process memory
+# (`api.cache.LocMemCache`) is only allowed with a single worker (see `api.checks`).
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "api.cache.DummyCache")
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "api.cache.LocMemCache")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "note-access": {
+        "BACKEND": NOTE_ACCESS_CACHE_BACKEND,
+        "LOCATION": os.getenv("NOTE_ACCESS_CACHE_LOCATION", "note-access"),
+        "TIMEOUT": int(os.getenv("NOTE_ACCESS_CACHE_TIMEOUT", 60)),
+        "KEY_PREFIX": "note-access",
+    },
+    # Rendered note detail & version history responses, See `api.views.base.NoteResponseCacheMixin`
+    "responses": {
+        "BACKEND": RESPONSE_CACHE_BACKEND,
+        "LOCATION": os.getenv("RESPONSE_CACHE_LOCATION", "responses"),
+        "TIMEOUT": int(os.getenv("RESPONSE_CACHE_TIMEOUT", 300)),
+        "KEY_PREFIX": "responses",
+    },
+    # Auth state of the users, See `api.authentication.StatelessJWTAuthentication`. The timeout is the longest
+    # time which a deactivated user is still accepted by a worker whose cache is not shared.
+    "users": {
+        "BACKEND": USER_CACHE_BACKEND,
+        "LOCATION": os.getenv("USER_CACHE_LOCATION", "users"),
+        "TIMEOUT": int(os.getenv("USER_CACHE_TIMEOUT", 60)),
+        "KEY_PREFIX": "users",
+    },
+}
+
+if NOTE_ACCESS_CACHE_BACKEND == "api.cache.LocMemCache":
+    CACHES["note-access"]["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("NOTE_ACCESS_CACHE_MAX_ENTRIES", 10000))}
+
+if RESPONSE_CACHE_BACKEND == "api.cache.LocMemCache":
+    CACHES["responses"]["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 5000))}
+
+if USER_CACHE_BACKEND == "api.cache.LocMemCache":
+    CACHES["users"]["OPTIONS"] = {"MAX_ENTRIES": int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))}
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -97,16 +165,21 @@ USE_I18N = True
 
 USE_TZ = True
 
+# Authenticate the JWT requests without loading the user from the DB on every request,
+# See `api.authentication.StatelessJWTAuthentication`
+JWT_STATELESS_AUTHENTICATION = os.getenv("JWT_STATELESS_AUTHENTICATION", "true").lower() == "true"
+
 # Django Rest Framework
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.SessionAuthentication",
+        "api.authentication.StatelessJWTAuthentication" if JWT_STATELESS_AUTHENTICATION
+        else "api.authentication.JWTAuthentication",
+        "api.authentication.SessionAuthentication",
     ),
     "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
-    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
+    "DEFAULT_RENDERER_CLASSES": ("api.renderers.JSONRenderer",),
+    "DEFAULT_PAGINATION_CLASS": "api.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10
 }
 
@@ -136,6 +209,71 @@ SIMPLE_JWT = {
 }
 
 
+# Version history
+# Number of versions after which a full snapshot of the description is stored along with the delta
+VERSION_HISTORY_SNAPSHOT_INTERVAL = int(os.getenv("VERSION_HISTORY_SNAPSHOT_INTERVAL", 20))
+# Edits of a note by the same user within this many seconds of the previous one update the latest version instead
+# of creating a new one, So that a burst of autosaves is recorded as a single version. Disabled with 0.
+VERSION_HISTORY_COALESCE_WINDOW = float(os.getenv("VERSION_HISTORY_COALESCE_WINDOW", 0))
+# Write an outbox record on each update instead of the version history record, Which is written later in batches by
+# the `process_history_outbox` command or the in-process worker (see `api.outbox`). Drain the outbox before turning
+# it off, Since the pending records would get their sequences after the versions which are written directly.
+VERSION_HISTORY_WRITE_BEHIND = os.getenv("VERSION_HISTORY_WRITE_BEHIND", "false").lower() == "true"
+# Run the outbox consumer in a background thread of each gunicorn worker, Only one of them writes at a time
+VERSION_HISTORY_OUTBOX_WORKER = os.getenv("VERSION_HISTORY_OUTBOX_WORKER", "false").lower() == "true"
+# Number of outbox records which are written per transaction
+VERSION_HISTORY_OUTBOX_BATCH_SIZE = int(os.getenv("VERSION_HISTORY_OUTBOX_BATCH_SIZE", 500))
+# Seconds to wait before polling the outbox again, Once it is empty
+VERSION_HISTORY_OUTBOX_INTERVAL = float(os.getenv("VERSION_HISTORY_OUTBOX_INTERVAL", 1))
+
+
+# Incremental sync, See `api.sync`
+# Days for which the removals of the notes are kept, A client which has not synced for longer must resync in full.
+# The removals are pruned by the command `prune_note_removals`.
+NOTE_SYNC_RETENTION_DAYS = int(os.getenv("NOTE_SYNC_RETENTION_DAYS", 30))
+
+
+# Note events, See `api.events`
+# Broker which delivers the events to the subscriptions of every worker process, Either `api.events.PostgresBroker`
+# or `api.events.InMemoryBroker` (only the subscriptions of the publishing process)
+NOTE_EVENTS_BROKER = os.getenv("NOTE_EVENTS_BROKER", "api.events.PostgresBroker")
+# Maximum number of notes which a client can subscribe to at once
+NOTE_EVENTS_MAX_NOTES = int(os.getenv("NOTE_EVENTS_MAX_NOTES", 1000))
+# Maximum number of events which are pending for a slow client, It is told to resync once it falls further behind
+NOTE_EVENTS_MAX_PENDING = int(os.getenv("NOTE_EVENTS_MAX_PENDING", 100))
+# Seconds without any event after which a heartbeat is sent to the client
+NOTE_EVENTS_HEARTBEAT = float(os.getenv("NOTE_EVENTS_HEARTBEAT", 15))
+
+
+# Password hashing
+# Number of threads which hash & verify the passwords, Per worker process
+PASSWORD_HASHER_WORKERS = int(os.getenv("PASSWORD_HASHER_WORKERS", 2))
+# Maximum number of hashing jobs which can be queued or running at once, Any request beyond that gets a 429
+PASSWORD_HASHER_MAX_PENDING = int(os.getenv("PASSWORD_HASHER_MAX_PENDING", 32))
+
+
+# Bulk notes
+# Maximum number of notes which can be sent in a single bulk request
+NOTE_BULK_MAX_SIZE = int(os.getenv("NOTE_BULK_MAX_SIZE", 10000))
+# Number of notes which are written per transaction
+NOTE_BULK_CHUNK_SIZE = int(os.getenv("NOTE_BULK_CHUNK_SIZE", 500))
+
+# Number of rows which are fetched at once from the server side cursor while exporting the notes
+NOTE_EXPORT_CHUNK_SIZE = int(os.getenv("NOTE_EXPORT_CHUNK_SIZE", 2000))
+
+
+# Request metrics, See `api.middleware.RequestMetricsMiddleware`
+# Fraction of the requests whose query count, DB time, serialization time & response size are logged
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", 0.01))
+# Requests which take longer are logged as a warning, Along with their slowest queries if they are sampled
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", 1000))
+SLOW_REQUEST_QUERIES = int(os.getenv("SLOW_REQUEST_QUERIES", 5))
+
+# Prometheus metrics, See `api.metrics`
+# Bearer token which must be sent to scrape the metrics, The metrics are public if it is not set
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
 # Logging
 LOGGING_CONFIG = None
 LOGLEVEL = os.environ.get('LOGLEVEL', 'INFO').upper()
@@ -0,0 +1,41 @@
+"""
+Settings of the "api-only" deployment profile, See `generic_notes.asgi_api`.
+
+The JSON API is authenticated via JWT only, So the apps & middleware which back the sessions, CSRF, messages,
+admin and static files are left out. This keeps both the startup (fewer apps to import & check) and each
+request (fewer middleware to run through) as short as possible. Everything else is the same as the default
+settings, Which are still used by `manage.py` (e.g. to run the migrations of all the apps).
+"""
+
+from generic_notes.settings import *  # noqa: F401, F403
+from generic_notes.settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.postgres",
+
+    "api",
+    "rest_framework",
+]
+
+# Each middleware of the `MiddlewareMixin` kind costs a hop to the thread sensitive executor on an async request,
+# Hence the `CommonMiddleware` is left out as well i.e. The URLs without a trailing slash are not redirected and
+# the responses are streamed without a Content-Length header.
+MIDDLEWARE = [
+    "api.middleware.RequestMetricsMiddleware",
+    "api.middleware.PrometheusMetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+]
+
+# Only JSON is rendered, There are no templates to load
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_AUTHENTICATION_CLASSES": tuple(
+        auth_class
+        for auth_class in REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"]
+        if auth_class != "api.authentication.SessionAuthentication"
+    ),
+}
@@ -1,5 +1,8 @@
 from django.urls import path, include
 
+from api.views.metrics import metrics
+
 urlpatterns = [
     path("api/v1/", include("api.urls")),
+    path("metrics", metrics, name="metrics"),
 ]
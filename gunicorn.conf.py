@@ -1,9 +1,44 @@
 import os
 import multiprocessing
+import shutil
+import tempfile
 
 PORT = os.getenv("PORT", "8000")
 
 bind = f"0.0.0.0:{PORT}"
 worker_class = "generic_notes.workers.UvicornWorker"
-workers = multiprocessing.cpu_count() * 2
+workers = int(os.getenv("WORKERS", multiprocessing.cpu_count() * 2))
 accesslog = "-"
+
+# The workers write their Prometheus metrics to this directory, So that they can be aggregated (see `api.metrics`).
+# The variable is inherited by the workers, Each master gets its own directory unless it is set explicitly.
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), f"generic-notes-metrics-{os.getpid()}")
+)
+
+
+def on_starting(server):
+    # Drop the metrics of a previous run
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR)
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    # Consume the version history outbox in the background of each worker, See `api.outbox`
+    if settings.VERSION_HISTORY_OUTBOX_WORKER:
+        from api.outbox import OutboxWorker
+
+        OutboxWorker().start()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # The gauges of a dead worker are not counted anymore, Its counters & histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
@@ -11,3 +11,15 @@ INVALID_USER_IDS = "Invalid username preasent. Please make sure the username pas
 CURRENT_USERNAME_ERROR = "You cannot pass your own username in the usernames array."
 SHARE_NOTE_SUCCESS = "Note is shared with the given users successfully."
 NOTE_PERMISSION_ERROR = "You cannot access this note."
+INVALID_BULK_NOTES = "notes should be an array of at most {max_size} notes."
+BULK_SAVE_SUCCESS = "Notes are saved successfully, Please check the errors of each note if any."
+PASSWORD_HASHER_SATURATED = "Too many login attempts are being processed right now. Please try again shortly."
+NOTE_VERSION_MISMATCH = "The note has been modified in the meantime. Please fetch the latest version and try again."
+INVALID_USERNAMES = "usernames should be a non empty array of usernames."
+INVALID_SHARE_PERMISSION = "permission should be either read or write."
+UNSHARE_NOTE_SUCCESS = "Note is unshared from the given users successfully."
+INVALID_SYNC_CURSOR = "Invalid sync cursor is passed. Please sync again without the cursor."
+SYNC_CURSOR_EXPIRED = "The sync cursor has expired, A full resync is required. Please sync again without the cursor."
+INVALID_NOTE_IDS = "note_ids should be a comma separated list of at most {max_size} note IDs."
+INVALID_NOTE_PATCH = "ops should be an edit script i.e. An array of integers (copy or skip that many characters) & strings (insert them)."
+NOTE_PATCH_CONFLICT = "The patch does not apply to the description of the note. Please fetch the latest version and try again."